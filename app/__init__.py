@@ -1,6 +1,8 @@
+import threading
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from werkzeug.utils import import_string
 from config import DevelopmentConfig
 
 # Initialize extensions
@@ -12,19 +14,29 @@ def create_app(config_class=DevelopmentConfig):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
-    # Initialize extensions
-    db.init_app(app)
+    # Initialize extensions (engine pooling and SQLite pragmas: see app/database.py)
+    from app.database import init_database
+    init_database(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'  # Redirect to login if not authenticated
     login_manager.login_message = 'Please log in to access this page.'
     
+    # Password hashing policy and its thread pool; see app/passwords.py
+    from app.passwords import init_passwords
+    init_passwords(app)
+    
+    # Pub/sub used to wake chat listeners when a message is sent
+    app.extensions['chat_broker'] = import_string(app.config['CHAT_BROKER'])()
+    # Open chat streams per worker process; see mentorship.chat_stream
+    app.extensions['chat_streams'] = threading.BoundedSemaphore(app.config['CHAT_MAX_STREAMS'])
+    
+    # Cache for rarely-changing statistics; see app/cache.py
+    app.extensions['cache'] = import_string(app.config['CACHE_BACKEND']).from_app(app)
+    
     with app.app_context():
         # Import models
         from app import models
         
-        # Create database tables
-        db.create_all()
-        
         # Register blueprints (route groups)
         from app.routes import auth_bp, main_bp, courses_bp, mentorship_bp, dashboard_bp, admin_bp
         app.register_blueprint(auth_bp)
@@ -34,4 +46,32 @@ def create_app(config_class=DevelopmentConfig):
         app.register_blueprint(dashboard_bp)
         app.register_blueprint(admin_bp)
     
+    # current_user from a per-worker identity cache instead of a query per request
+    from app.identity import init_identity
+    init_identity(app)
+    
+    # Fingerprinted CSS bundles served from app/static/dist
+    from app.assets import init_assets
+    init_assets(app)
+    
+    # Schema changes are applied by "flask db upgrade"; startup only checks the version
+    from app.migrations import check_schema
+    check_schema(app)
+    
+    # Full-text search index, kept in step with course, module and mentor writes
+    from app.search import init_search
+    init_search(app)
+    
+    # Catalog facet counts, kept in step with course writes
+    from app.facets import init_facets
+    init_facets(app)
+    
+    # Request/SQL timings for /admin/metrics (no-op unless PROFILER_ENABLED)
+    from app.profiler import init_profiler
+    init_profiler(app)
+    
+    # Maintenance commands (flask <command>)
+    from app.cli import register_commands
+    register_commands(app)
+    
     return app
\ No newline at end of file
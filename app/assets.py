@@ -0,0 +1,278 @@
+"""Prebuilt, fingerprinted static assets.
+
+``flask build-assets`` compiles the Tailwind stylesheet from app/static_src
+(using the Tailwind v3 CLI, so only classes the templates use are emitted)
+and cuts Font Awesome down to the icons the templates mention. Each output
+is written to app/static/dist under a content-hash name
+(``app.3f9c2e1a7b4d.css``) with gzip and, if the ``brotli`` module is
+installed, brotli copies next to it. ``manifest.json`` maps logical names to
+the current files.
+
+At runtime ``asset_url('app.css')`` gives the fingerprinted URL, and
+``/assets/<file>`` serves it with a one-year immutable cache lifetime,
+choosing the smallest encoding the browser accepts. Until a build exists
+``asset_url`` returns None and base.html falls back to the CDN scripts.
+"""
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import mimetypes
+import os
+import re
+import shlex
+import subprocess
+import tempfile
+from flask import current_app, request, send_from_directory, url_for
+from werkzeug.utils import safe_join
+
+MANIFEST = 'manifest.json'
+
+# Content-Encoding -> file suffix, preferred first
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Fonts are already compressed
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+_ICON_CLASS = re.compile(r'\bfa-[a-z0-9]+(?:-[a-z0-9]+)*|\bfa[srb]?\b(?!-)')
+_GLYPH_SELECTOR = re.compile(r'^\.fa-([a-z0-9-]+)::?before$')
+_GLYPH_CONTENT = re.compile(r'content:\s*"\\([0-9a-f]+)"')
+_FONT_URL = re.compile(r'url\("\.\./webfonts/([\w-]+)\.woff2"\)')
+
+# Font Awesome stylesheet -> classes that need it
+ICON_STYLES = {
+    'solid.css': {'fa', 'fas', 'fa-solid'},
+    'regular.css': {'far', 'fa-regular'},
+    'brands.css': {'fab', 'fa-brands'},
+}
+
+
+def dist_dir(app):
+    return os.path.join(app.static_folder, 'dist')
+
+
+def load_manifest(app):
+    """Logical name -> fingerprinted file name, or {} before the first build"""
+    try:
+        with open(os.path.join(dist_dir(app), MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def init_assets(app):
+    """Serve built assets and expose asset_url to templates"""
+    app.extensions['assets'] = load_manifest(app)
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.add_template_global(asset_url)
+
+
+def asset_url(name):
+    """URL of the current build of name, or None if assets have not been built"""
+    filename = current_app.extensions['assets'].get(name)
+    return url_for('asset', filename=filename) if filename else None
+
+
+def serve_asset(filename):
+    """Send a built file, precompressed when the browser accepts it"""
+    directory = dist_dir(current_app)
+    mimetype = mimetypes.guess_type(filename)[0]
+    max_age = current_app.config['ASSET_MAX_AGE']
+
+    for encoding, suffix in ENCODINGS:
+        path = safe_join(directory, filename + suffix)
+        if request.accept_encodings[encoding] and path and os.path.isfile(path):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype, max_age=max_age)
+            response.content_encoding = encoding
+            break
+    else:
+        response = send_from_directory(directory, filename, max_age=max_age)
+
+    # File names change with their content, so a copy never needs revalidating
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+# ---- Build ----
+
+def _fingerprinted(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _write(directory, name, data):
+    """Write data under its fingerprinted name plus compressed copies; returns the file name"""
+    filename = _fingerprinted(name, data)
+    path = os.path.join(directory, filename)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if filename.endswith(COMPRESSIBLE):
+        # mtime=0 keeps the .gz byte-identical across builds
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if importlib.util.find_spec('brotli'):
+            import brotli
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+    return filename
+
+
+def minify_css(css):
+    """Drop comments (except /*! license banners */) and insignificant whitespace"""
+    css = re.sub(r'/\*(?!!).*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+
+def compile_tailwind(app):
+    """Minified CSS for every Tailwind class used in the templates"""
+    source = os.path.join(app.root_path, 'static_src')
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'app.css')
+        subprocess.run(
+            shlex.split(app.config['TAILWIND_CLI']) + [
+                '-c', os.path.join(source, 'tailwind.config.js'),
+                '-i', os.path.join(source, 'app.css'),
+                '-o', output, '--minify',
+            ],
+            check=True, capture_output=True
+        )
+        with open(output, 'rb') as f:
+            return f.read()
+
+
+def used_icon_classes(app):
+    """Every fa / fa-* class that appears in a template (including inline scripts)"""
+    classes = set()
+    for directory, _dirs, files in os.walk(os.path.join(app.root_path, app.template_folder)):
+        for name in files:
+            if name.endswith('.html'):
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    classes.update(_ICON_CLASS.findall(f.read()))
+    return classes
+
+
+def fontawesome_dir(app):
+    """Font Awesome Free 6 distribution (css/ and webfonts/)"""
+    if app.config['FONTAWESOME_DIR']:
+        return app.config['FONTAWESOME_DIR']
+    spec = importlib.util.find_spec('fontawesomefree')
+    if spec is None:
+        raise RuntimeError('Set FONTAWESOME_DIR or install the fontawesomefree package')
+    return os.path.join(os.path.dirname(spec.origin), 'static', 'fontawesomefree')
+
+
+def _css_blocks(css):
+    """Top-level (prelude, body) pairs; nested blocks (@media, @keyframes) stay in their body"""
+    blocks, depth, start, prelude = [], 0, 0, ''
+    for i, char in enumerate(css):
+        if char == '{':
+            if depth == 0:
+                prelude, start = css[start:i].strip(), i + 1
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                blocks.append((prelude, css[start:i]))
+                start = i + 1
+    return blocks
+
+
+def _subset_font(path, codepoints):
+    """woff2 bytes of path cut down to codepoints (the whole font without fontTools)"""
+    if not (importlib.util.find_spec('fontTools') and importlib.util.find_spec('brotli')):
+        with open(path, 'rb') as f:
+            return f.read()
+    from fontTools import subset
+
+    options = subset.Options()
+    options.flavor = 'woff2'
+    font = subset.load_font(path, options)
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(unicodes=codepoints)
+    subsetter.subset(font)
+    output = io.BytesIO()
+    subset.save_font(font, output, options)
+    return output.getvalue()
+
+
+def build_icon_subset(app, directory):
+    """Write the icon stylesheet and its fonts into directory; returns the stylesheet's bytes"""
+    source = fontawesome_dir(app)
+    classes = used_icon_classes(app)
+    icons = {name[3:] for name in classes if name.startswith('fa-')}
+
+    sheets = ['fontawesome.css'] + [sheet for sheet, needs in ICON_STYLES.items() if classes & needs]
+    css = ''.join(open(os.path.join(source, 'css', sheet), encoding='utf-8').read() for sheet in sheets)
+    banner = re.match(r'\s*(/\*!.*?\*/)', css, flags=re.S)
+
+    rules, codepoints = [], set()
+    for prelude, body in _css_blocks(re.sub(r'/\*.*?\*/', '', css, flags=re.S)):
+        selectors = [s.strip() for s in prelude.split(',')]
+        glyphs = [_GLYPH_SELECTOR.match(s) for s in selectors]
+        if selectors and all(glyphs):
+            # An icon rule: keep only the names the templates use
+            selectors = [s for s, glyph in zip(selectors, glyphs) if glyph.group(1) in icons]
+            if not selectors:
+                continue
+            codepoints.update(int(code, 16) for code in _GLYPH_CONTENT.findall(body))
+        rules.append([', '.join(selectors), body])
+
+    fonts = {}
+    for rule in rules:
+        if rule[0] == '@font-face':
+            match = _FONT_URL.search(rule[1])
+            if match:
+                name = match.group(1)
+                if name not in fonts:
+                    data = _subset_font(os.path.join(source, 'webfonts', f'{name}.woff2'), codepoints)
+                    fonts[name] = _write(directory, f'{name}.woff2', data)
+                # Every browser we support reads woff2; drop the ttf fallback
+                rule[1] = re.sub(r'src:[^;]*;', f'src: url("{fonts[name]}") format("woff2");', rule[1])
+
+    output = ''.join(f'{prelude}{{{body}}}' for prelude, body in rules)
+    return ((banner.group(1) + '\n' if banner else '') + minify_css(output)).encode()
+
+
+def build_assets(app, echo=print):
+    """Build every asset into app/static/dist and switch the manifest to it"""
+    directory = dist_dir(app)
+    os.makedirs(directory, exist_ok=True)
+    previous = load_manifest(app)
+
+    manifest = {}
+    echo('Compiling Tailwind CSS...')
+    manifest['app.css'] = _write(directory, 'app.css', compile_tailwind(app))
+    echo('Building icon subset...')
+    manifest['icons.css'] = _write(directory, 'icons.css', build_icon_subset(app, directory))
+
+    tmp = os.path.join(directory, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+    # Pages rendered before the deploy may still link the previous build
+    keep = {MANIFEST} | _referenced(directory, manifest) | _referenced(directory, previous)
+    for name in os.listdir(directory):
+        original = name[:-3] if name.endswith(tuple(suffix for _encoding, suffix in ENCODINGS)) else name
+        if original not in keep:
+            os.remove(os.path.join(directory, name))
+    return manifest
+
+
+def _referenced(directory, manifest):
+    """Files a manifest's stylesheets need, including the fonts they load"""
+    names = set()
+    for filename in manifest.values():
+        names.add(filename)
+        try:
+            with open(os.path.join(directory, filename), encoding='utf-8') as f:
+                names.update(re.findall(r'url\("([\w.-]+)"\)', f.read()))
+        except FileNotFoundError:
+            pass
+    return names
@@ -0,0 +1,193 @@
+"""Application cache for rarely-changing, expensive values.
+
+Two backends share one small interface (``get``/``set``/``delete``/``clear``):
+
+* ``MemoryCache`` keeps entries in the worker process. It is the fastest, but
+  each gunicorn worker has its own copy, so an invalidation only reaches the
+  worker that handled the write; the others catch up when the TTL expires.
+* ``SQLiteCache`` keeps entries in a SQLite file that every worker on the
+  host shares, so invalidations take effect everywhere at once.
+
+Both expire entries after a TTL and evict the least recently used entries
+beyond ``CACHE_MAX_ENTRIES``. Values must be JSON-serialisable.
+
+Cached values are grouped by what they are derived from. Code that changes
+users, courses or enrollments calls ``invalidate('users')`` (etc.) after
+committing, which drops every key that depends on that kind of record.
+Families of keys that cannot be listed up front (one per URL, say) live in a
+namespace instead; invalidating it switches the namespace to a new generation
+so the old keys are never read again and age out.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+# Record kind -> cache keys computed from it
+DEPENDENCIES = {
+    'users': (
+        'main:index:stats', 'admin:dashboard:stats', 'mentorship:browse:count',
+        'admin:users:count:all', 'admin:users:count:student', 'admin:users:count:mentor', 'admin:users:count:admin',
+    ),
+    'courses': ('main:index:stats', 'main:index:featured', 'admin:dashboard:stats', 'admin:courses:count'),
+    'enrollments': ('admin:dashboard:stats',),
+}
+
+# Record kind -> namespaces dropped as a whole
+NAMESPACES = {
+    'courses': ('catalog',),
+}
+
+# Generation markers outlive any entry written under them
+GENERATION_TTL = 24 * 60 * 60
+
+
+class MemoryCache:
+    """Per-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # key -> (expires_at, value), oldest use first
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_app(cls, app):
+        return cls(app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_DEFAULT_TTL'])
+
+    def get(self, key):
+        """Cached value for key, or None if missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """LRU cache with per-entry expiry stored in a SQLite file shared by workers"""
+
+    def __init__(self, path, max_entries=1024, default_ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_cache_used_at ON cache (used_at)')
+
+    @classmethod
+    def from_app(cls, app):
+        path = app.config['CACHE_SQLITE_PATH'] or os.path.join(app.instance_path, 'cache.sqlite3')
+        return cls(path, app.config['CACHE_MAX_ENTRIES'], app.config['CACHE_DEFAULT_TTL'])
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections are not shareable
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, now))
+            return None
+        conn.execute('UPDATE cache SET used_at = ? WHERE key = ?', (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at, used_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), expires_at, now)
+        )
+        # Drop expired entries, then the least recently used beyond the limit
+        conn.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+        conn.execute('''
+            DELETE FROM cache WHERE key IN (
+                SELECT key FROM cache ORDER BY used_at DESC LIMIT -1 OFFSET ?
+            )
+        ''', (self.max_entries,))
+
+    def delete(self, *keys):
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            self._connect().execute(f'DELETE FROM cache WHERE key IN ({placeholders})', keys)
+
+    def clear(self):
+        self._connect().execute('DELETE FROM cache')
+
+
+def get_cache():
+    """The configured cache for the current app"""
+    return current_app.extensions['cache']
+
+
+def cached(key, compute, ttl=None):
+    """Return the cached value for key, computing and storing it on a miss"""
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, ttl)
+    return value
+
+
+def namespace_key(namespace, key):
+    """Key for key inside namespace, at the namespace's current generation"""
+    cache = get_cache()
+    marker = f'{namespace}:generation'
+    generation = cache.get(marker)
+    if generation is None:
+        generation = time.time_ns()
+        cache.set(marker, generation, GENERATION_TTL)
+    return f'{namespace}:{generation}:{key}'
+
+
+def invalidate(*kinds):
+    """Drop cached values derived from the given record kinds ('users', 'courses', ...)"""
+    keys = {key for kind in kinds for key in DEPENDENCIES.get(kind, ())}
+    keys |= {f'{namespace}:generation' for kind in kinds for namespace in NAMESPACES.get(kind, ())}
+    get_cache().delete(*keys)
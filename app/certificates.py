@@ -0,0 +1,260 @@
+import hashlib
+import io
+import os
+import tempfile
+import zipfile
+from collections import deque
+from io import BytesIO
+from flask import current_app
+from app.jobs import job_handler, enqueue, requeue
+from app.models import Certificate
+from app.processes import process_pool
+
+# Bump whenever the certificate layout changes; cached PDFs are keyed on it,
+# so every certificate re-renders on its next download
+TEMPLATE_VERSION = 1
+
+def certificate_context(cert):
+    """Plain values needed to draw a certificate"""
+    return {
+        'code': cert.certificate_code,
+        'student_name': cert.student.full_name or cert.student.username,
+        'course_title': cert.course.title,
+        'category': cert.course.category,
+        'duration_weeks': cert.course.duration_weeks,
+        'instructor': cert.course.instructor or 'SmartFarm',
+        'issued_on': cert.issued_at.strftime('%b %d, %Y'),
+    }
+
+def render_certificate_pdf(context):
+    """Draw a certificate and return the PDF bytes"""
+    # ReportLab (and the Pillow it pulls in) is imported on first use, so
+    # workers that never render a certificate do not load it
+    from reportlab.pdfgen import canvas
+    from reportlab.lib import colors
+
+    # Create PDF in memory
+    pdf_buffer = BytesIO()
+
+    # Create canvas (letter size, landscape)
+    pdf_canvas = canvas.Canvas(pdf_buffer, pagesize=(11*72, 8.5*72))
+
+    # Set background color (light gold)
+    pdf_canvas.setFillColor(colors.HexColor('#fef3c7'))
+    pdf_canvas.rect(0, 0, 11*72, 8.5*72, fill=1, stroke=0)
+
+    # Set border
+    pdf_canvas.setStrokeColor(colors.HexColor('#d4af37'))
+    pdf_canvas.setLineWidth(3)
+    pdf_canvas.rect(20, 20, 11*72-40, 8.5*72-40)
+
+    # Title
+    pdf_canvas.setFont("Helvetica-Bold", 48)
+    pdf_canvas.setFillColor(colors.HexColor('#92400e'))
+    pdf_canvas.drawCentredString(11*72/2, 7.5*72, "Certificate of Completion")
+
+    # Subtitle
+    pdf_canvas.setFont("Helvetica", 16)
+    pdf_canvas.setFillColor(colors.HexColor('#b45309'))
+    pdf_canvas.drawCentredString(11*72/2, 7*72, "SmartFarm Training Hub")
+
+    # "This certifies that"
+    pdf_canvas.setFont("Helvetica", 12)
+    pdf_canvas.setFillColor(colors.HexColor('#78350f'))
+    pdf_canvas.drawCentredString(11*72/2, 5.5*72, "This is to certify that")
+
+    # Student name
+    pdf_canvas.setFont("Helvetica-Bold", 36)
+    pdf_canvas.setFillColor(colors.HexColor('#92400e'))
+    pdf_canvas.drawCentredString(11*72/2, 4.8*72, context['student_name'])
+
+    # "has successfully completed"
+    pdf_canvas.setFont("Helvetica", 12)
+    pdf_canvas.setFillColor(colors.HexColor('#78350f'))
+    pdf_canvas.drawCentredString(11*72/2, 4.2*72, "has successfully completed the course")
+
+    # Course title
+    pdf_canvas.setFont("Helvetica-Bold", 18)
+    pdf_canvas.setFillColor(colors.HexColor('#b45309'))
+    pdf_canvas.drawCentredString(11*72/2, 3.6*72, context['course_title'])
+
+    # Course details
+    pdf_canvas.setFont("Helvetica", 10)
+    pdf_canvas.setFillColor(colors.HexColor('#78350f'))
+    pdf_canvas.drawCentredString(11*72/2, 3.2*72, f"Category: {context['category']}")
+    pdf_canvas.drawCentredString(11*72/2, 2.9*72, f"Duration: {context['duration_weeks']} weeks")
+    pdf_canvas.drawCentredString(11*72/2, 2.6*72, f"Instructor: {context['instructor']}")
+
+    # Footer
+    pdf_canvas.setFont("Helvetica", 9)
+    pdf_canvas.setFillColor(colors.HexColor('#92400e'))
+
+    # Left signature
+    pdf_canvas.drawString(0.5*72, 1.2*72, "_________________")
+    pdf_canvas.drawString(0.5*72, 0.8*72, "SmartFarm Director")
+
+    # Center certificate code
+    pdf_canvas.drawCentredString(11*72/2, 1.2*72, context['code'])
+    pdf_canvas.drawCentredString(11*72/2, 0.8*72, "Certificate Code")
+
+    # Right date
+    pdf_canvas.drawRightString(10.5*72, 1.2*72, context['issued_on'])
+    pdf_canvas.drawRightString(10.5*72, 0.8*72, "Date Issued")
+
+    # Save PDF
+    pdf_canvas.save()
+
+    return pdf_buffer.getvalue()
+
+def cache_key(cert_code):
+    """Content address of a certificate: its code plus the template version"""
+    return hashlib.sha256(f'{cert_code}:v{TEMPLATE_VERSION}'.encode()).hexdigest()
+
+def cache_dir():
+    """Directory holding rendered certificates"""
+    return current_app.config['CERTIFICATE_CACHE_DIR'] or os.path.join(current_app.instance_path, 'certificates')
+
+def cache_path(cert_code):
+    """Where the rendered PDF for cert_code lives (it may not exist yet)"""
+    key = cache_key(cert_code)
+    # Two-character fan-out keeps directories small
+    return os.path.join(cache_dir(), key[:2], f'{key}.pdf')
+
+def store_certificate_pdf(cert_code, pdf_bytes):
+    """Write PDF bytes into the cache atomically and return the path"""
+    path = cache_path(cert_code)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Concurrent renders of the same certificate each write a temp file and
+    # rename it into place, so readers never see a partial PDF
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(pdf_bytes)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def certificate_pdf_path(cert):
+    """Path of the cached PDF for a certificate, rendering it on first use"""
+    path = cache_path(cert.certificate_code)
+    if not os.path.exists(path):
+        store_certificate_pdf(cert.certificate_code, render_certificate_pdf(certificate_context(cert)))
+    return path
+
+def prune_cache(current_codes):
+    """Delete cached PDFs that no longer match a certificate at this template version"""
+    keep = {f'{cache_key(code)}.pdf' for code in current_codes}
+    removed = 0
+    for root, _dirs, files in os.walk(cache_dir()):
+        for name in files:
+            if name not in keep:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+@job_handler('render_certificate')
+def render_certificate_job(payload):
+    """Job: render a certificate into the cache"""
+    cert = Certificate.query.filter_by(certificate_code=payload['certificate_code']).first()
+    if cert is None:
+        raise LookupError(f"Certificate {payload['certificate_code']} not found")
+    certificate_pdf_path(cert)
+    return {'certificate_code': cert.certificate_code}
+
+def queue_certificate_render(cert, user_id=None):
+    """Queue a background render of cert unless one is already pending.
+
+    The caller commits. Returns the job, which is None when the PDF is
+    already cached.
+    """
+    if os.path.exists(cache_path(cert.certificate_code)):
+        return None
+
+    job = enqueue(
+        'render_certificate',
+        {'certificate_code': cert.certificate_code},
+        idempotency_key=f'certificate:{cache_key(cert.certificate_code)}',
+        user_id=user_id
+    )
+    # A finished job whose file has since gone (or a failed one) runs again
+    if job.status in ('done', 'failed'):
+        requeue(job)
+    return job
+
+class _ZipStream(io.RawIOBase):
+    """Write-only sink that lets a generator hand zipfile output out in pieces"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _render_batch(contexts):
+    """Render several certificates in one pool task to cut IPC overhead"""
+    return [render_certificate_pdf(context) for context in contexts]
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _rendered_pdfs(contexts, processes, batch_size=16):
+    """Yield (context, pdf bytes) in order, rendering cache misses in a process pool.
+
+    At most processes * 2 batches are in flight, so memory stays flat however
+    many certificates there are.
+    """
+    with process_pool(processes) as pool:
+        pending = deque()
+        for batch in _batches(contexts, batch_size):
+            misses = [c for c in batch if not os.path.exists(cache_path(c['code']))]
+            future = pool.submit(_render_batch, misses) if misses else None
+            pending.append((batch, misses, future))
+
+            while len(pending) > processes * 2:
+                yield from _collect(*pending.popleft())
+        while pending:
+            yield from _collect(*pending.popleft())
+
+def _collect(batch, misses, future):
+    rendered = {}
+    if future is not None:
+        for context, pdf_bytes in zip(misses, future.result()):
+            # Keep the render so the student's own download is served from cache
+            store_certificate_pdf(context['code'], pdf_bytes)
+            rendered[context['code']] = pdf_bytes
+
+    for context in batch:
+        pdf_bytes = rendered.get(context['code'])
+        if pdf_bytes is None:
+            with open(cache_path(context['code']), 'rb') as pdf_file:
+                pdf_bytes = pdf_file.read()
+        yield context, pdf_bytes
+
+def export_certificates_zip(contexts, processes):
+    """Generate a ZIP archive of certificate PDFs chunk by chunk"""
+    sink = _ZipStream()
+    # PDFs are already compressed, so store them as-is
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for context, pdf_bytes in _rendered_pdfs(contexts, processes):
+            archive.writestr(f"SmartFarm_Certificate_{context['code']}.pdf", pdf_bytes)
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,126 @@
+import time
+import click
+from flask.cli import with_appcontext
+from app import db
+
+@click.group('db')
+def db_command():
+    """Schema migrations"""
+
+@db_command.command('upgrade')
+@click.option('--to', 'target', default=None, type=int, help='Stop after this version (defaults to the latest).')
+@with_appcontext
+def db_upgrade_command(target):
+    """Apply pending migrations"""
+    from app.migrations import upgrade
+
+    applied = upgrade(target, echo=click.echo)
+    click.echo(f'Applied {len(applied)} migrations.' if applied else 'Database is up to date.')
+
+@db_command.command('status')
+@with_appcontext
+def db_status_command():
+    """List migrations and whether each has been applied"""
+    from app.migrations import status
+
+    for version, name, applied_at in status():
+        click.echo(f"{name:<40} {applied_at.strftime('%Y-%m-%d %H:%M') if applied_at else 'pending'}")
+
+@click.command('prune-certificate-cache')
+@with_appcontext
+def prune_certificate_cache_command():
+    """Remove cached certificate PDFs from older template versions"""
+    from app.certificates import prune_cache
+    from app.models import Certificate
+
+    codes = [code for (code,) in db.session.query(Certificate.certificate_code)]
+    removed = prune_cache(codes)
+    click.echo(f'Removed {removed} stale certificate files.')
+
+@click.command('run-jobs')
+@click.option('--workers', default=None, type=int, help='Worker threads (defaults to JOB_WORKERS).')
+@with_appcontext
+def run_jobs_command(workers):
+    """Run background job workers in the foreground"""
+    from flask import current_app
+    from app.jobs import WorkerPool
+
+    app = current_app._get_current_object()
+    size = workers or max(app.config['JOB_WORKERS'], 1)
+    pool = WorkerPool(app, size, app.config['JOB_POLL_INTERVAL'])
+    pool.start()
+    click.echo(f'Running {size} job workers. Press Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop(timeout=10)
+
+@click.command('rebuild-course-stats')
+@with_appcontext
+def rebuild_course_stats_command():
+    """Recompute every course's module, enrollment and completion counters"""
+    from app.course_stats import rebuild_course_stats
+
+    rebuilt = rebuild_course_stats()
+    click.echo(f'Rebuilt stats for {rebuilt} courses.')
+
+@click.command('rebuild-course-facets')
+@with_appcontext
+def rebuild_course_facets_command():
+    """Recount published courses per category and level"""
+    from app.facets import rebuild_course_facets
+
+    facets = rebuild_course_facets()
+    click.echo(f'Rebuilt {facets} course facets.')
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Re-index all courses, modules and mentors for search"""
+    from app.search import rebuild_search_index
+
+    indexed = rebuild_search_index()
+    click.echo(f'Indexed {indexed} records.')
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Build the fingerprinted CSS bundle and icon subset into app/static/dist"""
+    from flask import current_app
+    from app.assets import build_assets
+
+    manifest = build_assets(current_app._get_current_object(), echo=click.echo)
+    for name, filename in manifest.items():
+        click.echo(f'{name} -> {filename}')
+
+@click.command('import-users')
+@click.argument('source', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None, help='Defaults to the file extension.')
+@click.option('--errors', 'report', type=click.File('w', encoding='utf-8'), default='-', help='Where to write rejected rows (default: stdout).')
+@click.option('--processes', default=None, type=int, help='Hashing processes (defaults to IMPORT_HASH_PROCESSES).')
+@with_appcontext
+def import_users_command(source, fmt, report, processes):
+    """Create users and their enrollments from a CSV or JSON Lines file"""
+    from app.user_import import import_users
+
+    fmt = fmt or ('jsonl' if source.name.endswith(('.jsonl', '.ndjson')) else 'csv')
+    started = time.perf_counter()
+
+    def progress(totals):
+        click.echo(f"{totals['rows']} rows: {totals['created']} created, {totals['failed']} failed", err=True)
+
+    totals = import_users(source, fmt, report, processes=processes, progress=progress)
+    click.echo(f"Imported {totals['created']} users and {totals['enrollments']} enrollments "
+               f"({totals['failed']} rows rejected) in {time.perf_counter() - started:.1f}s.", err=True)
+
+def register_commands(app):
+    """Attach maintenance commands to the flask CLI"""
+    app.cli.add_command(db_command)
+    app.cli.add_command(prune_certificate_cache_command)
+    app.cli.add_command(run_jobs_command)
+    app.cli.add_command(rebuild_course_stats_command)
+    app.cli.add_command(rebuild_course_facets_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(import_users_command)
@@ -0,0 +1,74 @@
+from sqlalchemy import case, func
+from app import db
+from app.models import Course, CourseModule, CourseEnrollment, CourseStats, insert_ignore
+
+def bump_course_stats(course_id, **deltas):
+    """Add deltas to a course's counters inside the caller's transaction.
+
+    e.g. bump_course_stats(course.id, enrolled_count=1)
+    """
+    insert_ignore(CourseStats, course_id=course_id)
+    CourseStats.query.filter_by(course_id=course_id).update(
+        {getattr(CourseStats, name): getattr(CourseStats, name) + delta for name, delta in deltas.items()},
+        synchronize_session=False
+    )
+
+def course_module_count(course_id):
+    """Number of modules in a course, read from the stats row"""
+    module_count = db.session.query(CourseStats.module_count).filter_by(course_id=course_id).scalar()
+    if not module_count:
+        # Course predates the stats table, or its row was created by an
+        # enrollment before modules were counted; the caller commits the rebuild
+        rebuild_course_stats([course_id], commit=False)
+        module_count = db.session.query(CourseStats.module_count).filter_by(course_id=course_id).scalar()
+    return module_count or 0
+
+def rebuild_course_stats(course_ids=None, commit=True):
+    """Recompute stats rows from the source tables (all courses by default).
+
+    With commit=False the rows are only flushed, leaving the caller's
+    transaction open.
+    """
+    modules = db.session.query(
+        CourseModule.course_id, func.count(CourseModule.id)
+    ).group_by(CourseModule.course_id)
+    enrollments = db.session.query(
+        CourseEnrollment.course_id,
+        func.count(CourseEnrollment.id),
+        func.sum(case((CourseEnrollment.is_completed.is_(True), 1), else_=0)),
+        func.coalesce(func.sum(CourseEnrollment.progress_percentage), 0.0)
+    ).group_by(CourseEnrollment.course_id)
+    courses = db.session.query(Course.id)
+
+    if course_ids is not None:
+        modules = modules.filter(CourseModule.course_id.in_(course_ids))
+        enrollments = enrollments.filter(CourseEnrollment.course_id.in_(course_ids))
+        courses = courses.filter(Course.id.in_(course_ids))
+
+    module_counts = dict(modules.all())
+    enrollment_counts = {row[0]: row[1:] for row in enrollments.all()}
+
+    rebuilt = 0
+    for (course_id,) in courses.all():
+        enrolled, completed, progress_total = enrollment_counts.get(course_id, (0, 0, 0.0))
+        insert_ignore(CourseStats, course_id=course_id)
+        CourseStats.query.filter_by(course_id=course_id).update({
+            CourseStats.module_count: module_counts.get(course_id, 0),
+            CourseStats.enrolled_count: enrolled,
+            CourseStats.completed_count: completed or 0,
+            CourseStats.progress_total: progress_total or 0.0,
+        }, synchronize_session=False)
+        rebuilt += 1
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return rebuilt
+
+def enrollment_totals():
+    """Site-wide enrollment and completion counts summed from the stats rows"""
+    enrolled, completed = db.session.query(
+        func.coalesce(func.sum(CourseStats.enrolled_count), 0),
+        func.coalesce(func.sum(CourseStats.completed_count), 0)
+    ).one()
+    return {'enrollments': enrolled, 'completions': completed}
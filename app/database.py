@@ -0,0 +1,87 @@
+"""Engine settings for SQLite and server databases.
+
+SQLite (the default) is tuned so several gunicorn workers can write without
+"database is locked" errors:
+
+* WAL journal: readers never block the writer and the writer never blocks
+  readers; only writers queue for the lock.
+* busy_timeout: a writer that finds the lock held waits for it instead of
+  failing straight away.
+* synchronous=NORMAL: with WAL, commits no longer fsync (a power cut can lose
+  the last few commits, never corrupt the file).
+* mmap_size: reads come straight from the page cache without copying.
+
+Connections are pooled per worker so the pragmas run once per connection
+rather than on every checkout. Postgres, MySQL and other server databases get
+a QueuePool sized by the DB_POOL_* settings, with stale connections recycled
+and checked before use.
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+
+def _is_sqlite_file(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database URL"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if not config['DB_TUNING'] or (url.get_backend_name() == 'sqlite' and not _is_sqlite_file(url)):
+        # In-memory SQLite keeps Flask-SQLAlchemy's single shared connection
+        return {}
+
+    options = {
+        'poolclass': QueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if _is_sqlite_file(url):
+        # Threads of a gthread worker take turns with pooled connections
+        options['connect_args'] = {'check_same_thread': False}
+    else:
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+        options['pool_pre_ping'] = True
+    return options
+
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection"""
+    pragmas = []
+    if config['SQLITE_JOURNAL_MODE']:
+        pragmas.append(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+    if config['SQLITE_BUSY_TIMEOUT_MS'] is not None:
+        pragmas.append(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    if config['SQLITE_SYNCHRONOUS']:
+        pragmas.append(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+    if config['SQLITE_MMAP_SIZE']:
+        pragmas.append(f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}")
+    return pragmas
+
+
+def init_database(app):
+    """Initialise the SQLAlchemy extension with the engine settings for this database"""
+    from app import db
+
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+
+    if app.config['DB_TUNING']:
+        pragmas = sqlite_pragmas(app.config)
+        with app.app_context():
+            for engine in db.engines.values():
+                if _is_sqlite_file(engine.url):
+                    event.listen(engine, 'connect', _pragma_listener(pragmas))
+
+
+def _pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+    return set_pragmas
@@ -0,0 +1,127 @@
+"""Facet counts for the course catalog.
+
+``course_facets`` holds the number of published courses for every
+(category, level) pair. A flush hook adjusts it whenever a course is
+published, unpublished, recategorised, re-levelled or deleted, inside the
+same transaction as the change. Facet queries then read a table with one row
+per pair instead of grouping the courses table, so they cost the same however
+large the catalog grows. ``flask rebuild-course-facets`` recounts from
+scratch (e.g. after bulk SQL imports that bypass the ORM).
+"""
+from collections import Counter
+from sqlalchemy import event, func
+from app import db
+from app.models import Course, CourseFacet, insert_ignore
+
+LEVELS = ('beginner', 'intermediate', 'advanced')
+
+
+def _facet(published, category, level):
+    """(category, level) a course counts towards, or None if it is not listed"""
+    if not published or not category or not level:
+        return None
+    return category, level
+
+
+def _before_flush(session, flush_context, instances):
+    # Read what changed courses count towards now, before the flush overwrites it.
+    # (The ORM only knows old values for attributes that were loaded.)
+    changed = [obj for obj in session.dirty if isinstance(obj, Course) and session.is_modified(obj)]
+    changed += [obj for obj in session.deleted if isinstance(obj, Course)]
+    ids = [obj.id for obj in changed if obj.id is not None]
+    if not ids:
+        return
+    table = Course.__table__
+    rows = session.connection().execute(
+        table.select().with_only_columns(table.c.id, table.c.is_published, table.c.category, table.c.level)
+        .where(table.c.id.in_(ids))
+    )
+    session.info['course_facets_before'] = {row.id: _facet(row.is_published, row.category, row.level) for row in rows}
+
+
+def _after_flush(session, flush_context):
+    before = session.info.pop('course_facets_before', {})
+    deltas = Counter()
+    for obj in session.new:
+        if isinstance(obj, Course):
+            after = _facet(obj.is_published, obj.category, obj.level)
+            if after:
+                deltas[after] += 1
+    for obj in session.dirty:
+        if isinstance(obj, Course) and obj.id in before:
+            after = _facet(obj.is_published, obj.category, obj.level)
+            if before[obj.id] != after:
+                if before[obj.id]:
+                    deltas[before[obj.id]] -= 1
+                if after:
+                    deltas[after] += 1
+    for obj in session.deleted:
+        if isinstance(obj, Course) and before.get(obj.id):
+            deltas[before[obj.id]] -= 1
+
+    if not any(deltas.values()):
+        return
+    connection = session.connection()
+    for (category, level), delta in deltas.items():
+        if delta:
+            insert_ignore(CourseFacet, _connection=connection, category=category, level=level, course_count=0)
+            connection.execute(
+                CourseFacet.__table__.update()
+                .where(CourseFacet.category == category, CourseFacet.level == level)
+                .values(course_count=CourseFacet.course_count + delta)
+            )
+
+
+def init_facets(app):
+    """Keep facet counts up to date on course writes"""
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+
+
+def rebuild_course_facets():
+    """Recount every facet from the courses table; returns the number of facets"""
+    rows = db.session.query(
+        Course.category, Course.level, func.count(Course.id)
+    ).filter(
+        Course.is_published.is_(True), Course.category.isnot(None), Course.level.isnot(None)
+    ).group_by(Course.category, Course.level).all()
+
+    CourseFacet.query.delete()
+    for category, level, count in rows:
+        db.session.add(CourseFacet(category=category, level=level, course_count=count))
+    db.session.commit()
+    return len(rows)
+
+
+def facet_counts(category=None, level=None):
+    """Counts for the catalog sidebar under the current filter.
+
+    Each facet is counted with the other facet's filter applied, so the
+    numbers say how many courses picking that value would show. Returns
+    {'category': [(value, count), ...], 'level': [...], 'total': n}.
+    """
+    # Read as stored: migration 0005 and "flask rebuild-course-facets" fill
+    # the table, and the flush hooks keep it current
+    rows = db.session.query(CourseFacet.category, CourseFacet.level, CourseFacet.course_count).filter(
+        CourseFacet.course_count > 0
+    ).all()
+
+    categories = Counter()
+    levels = Counter()
+    total = 0
+    for row_category, row_level, count in rows:
+        if not level or row_level == level:
+            categories[row_category] += count
+        if not category or row_category == category:
+            levels[row_level] += count
+        if (not category or row_category == category) and (not level or row_level == level):
+            total += count
+
+    # Known levels first in teaching order, then anything else alphabetically
+    ordered_levels = [l for l in LEVELS if l in levels] + sorted(l for l in levels if l not in LEVELS)
+    return {
+        'category': sorted(categories.items()),
+        'level': [(value, levels[value]) for value in ordered_levels],
+        'total': total,
+    }
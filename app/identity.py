@@ -0,0 +1,117 @@
+"""Cached identities for logged-in users.
+
+Flask-Login calls the user loader on every authenticated request, chat polls
+included. Instead of loading the whole user row each time, the loader returns
+a ``SessionUser``: a plain snapshot of the columns routes and templates read
+(``id``, ``role``, ``theme``, ...), without the password hash and not
+attached to the database session. Snapshots are kept per worker for
+``USER_CACHE_TTL`` seconds.
+
+Every user row carries an ``identity_version``. A session hook bumps it in
+the same UPDATE whenever a flush changes a User, and drops that user's
+snapshot in the worker doing the write. Other workers re-read the stamp with
+one primary-key query at most every ``USER_CACHE_RECHECK`` seconds per
+identity, and reload a snapshot whose version is older; requests in between
+make no users query at all. So profile edits, role changes and
+deactivations apply at once in the worker that made them and within
+``USER_CACHE_RECHECK`` seconds everywhere else. Bulk ``query.update()``
+calls on users bypass the hook and must call ``forget_user`` in the same
+transaction.
+
+Routes that change the current user load the row first:
+``User.query.get(current_user.id)``.
+
+Each lookup sends the ``user_cache_lookup`` signal with ``result`` set to
+'hit', 'miss' or 'stale'; the profiler counts them for /admin/metrics.
+"""
+import time
+from flask import current_app
+from flask.signals import Namespace
+from flask_login import UserMixin
+from sqlalchemy import event
+from app import db, login_manager
+from app.cache import MemoryCache
+from app.models import User
+
+_signals = Namespace()
+user_cache_lookup = _signals.signal('user-cache-lookup')
+
+# Columns copied into the snapshot
+FIELDS = ('id', 'username', 'email', 'full_name', 'profile_picture', 'bio', 'role',
+          'expertise', 'is_active', 'theme', 'created_at')
+
+
+class SessionUser(UserMixin):
+    """Read-only snapshot of a User for current_user"""
+
+    # Replaces UserMixin's always-True property with the stored column
+    is_active = True
+
+    def __init__(self, user, version):
+        for field in FIELDS:
+            setattr(self, field, getattr(user, field))
+        self.version = version
+        self.checked_at = time.monotonic()
+
+    def __repr__(self):
+        return f'<SessionUser {self.username}>'
+
+
+def _current(identity):
+    """Whether identity still matches its row, re-reading the stamp once per USER_CACHE_RECHECK"""
+    now = time.monotonic()
+    if now - identity.checked_at < current_app.config['USER_CACHE_RECHECK']:
+        return True
+    version = db.session.query(User.identity_version).filter(User.id == identity.id).scalar()
+    if version != identity.version:
+        return False
+    identity.checked_at = now
+    return True
+
+
+def load_user(user_id):
+    """Flask-Login user loader: the cached identity for user_id, or None"""
+    user_id = int(user_id)
+    identities = current_app.extensions['user_identities']
+    identity = identities.get(user_id)
+    if identity is not None and _current(identity):
+        user_cache_lookup.send(current_app._get_current_object(), result='hit')
+        return identity
+    user_cache_lookup.send(current_app._get_current_object(), result='stale' if identity else 'miss')
+
+    user = User.query.get(user_id)
+    if user is None:
+        identities.delete(user_id)
+        return None
+    identity = SessionUser(user, user.identity_version)
+    identities.set(user_id, identity)
+    return identity
+
+
+def forget_user(*user_ids):
+    """Make identities of user_ids reload in every worker once the caller commits"""
+    if user_ids:
+        User.query.filter(User.id.in_(user_ids)).update(
+            {User.identity_version: User.identity_version + 1}, synchronize_session=False
+        )
+    current_app.extensions['user_identities'].delete(*user_ids)
+
+
+def _before_flush(session, flush_context, instances):
+    # Part of the same UPDATE as the change, so no worker can see one without the other
+    changed = []
+    for obj in session.dirty:
+        if isinstance(obj, User) and session.is_modified(obj):
+            obj.identity_version = User.identity_version + 1
+            changed.append(obj.id)
+    if changed:
+        # This worker reloads at once instead of at its next recheck
+        current_app.extensions['user_identities'].delete(*changed)
+
+
+def init_identity(app):
+    """Load current_user from the identity cache"""
+    app.extensions['user_identities'] = MemoryCache(app.config['USER_CACHE_MAX_ENTRIES'], app.config['USER_CACHE_TTL'])
+    login_manager.user_loader(load_user)
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
@@ -0,0 +1,224 @@
+"""Database-backed background job queue.
+
+Jobs are rows in the ``jobs`` table, so they survive restarts and are shared
+by every gunicorn worker without an external broker. Each process runs a
+small pool of threads that claim runnable jobs with a conditional UPDATE, so
+two workers never run the same job at once. A claimed job holds a lease;
+if its worker dies, the job is picked up again once the lease expires.
+Each claim bumps ``attempts``, which then identifies the lease: a worker
+only records its outcome while the job is still running under the attempt
+it claimed, so one that overran its lease cannot overwrite the new owner.
+"""
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import Job, insert_ignore
+
+logger = logging.getLogger(__name__)
+
+# kind -> callable(payload dict) returning a JSON-serialisable result
+_handlers = {}
+
+# Id and attempt of the job the current worker thread is running
+_running = threading.local()
+
+def job_handler(kind):
+    """Register a function as the handler for a job kind"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+def enqueue(kind, payload=None, idempotency_key=None, user_id=None, max_attempts=3):
+    """Add a job to the current transaction and return it.
+
+    The job becomes visible to workers when the caller commits. With an
+    idempotency_key, enqueueing again returns the existing job instead of
+    adding a second one.
+    """
+    values = {
+        'kind': kind,
+        'payload': json.dumps(payload or {}),
+        'user_id': user_id,
+        'max_attempts': max_attempts,
+    }
+    if idempotency_key is None:
+        job = Job(**values)
+        db.session.add(job)
+        db.session.flush()
+        return job
+
+    insert_ignore(Job, idempotency_key=idempotency_key, **values)
+    return Job.query.filter_by(idempotency_key=idempotency_key).first()
+
+def requeue(job):
+    """Run a finished or failed job again from a clean slate"""
+    job.status = 'queued'
+    job.attempts = 0
+    job.error = None
+    job.result = None
+    job.run_after = datetime.utcnow()
+    job.locked_until = None
+
+def keep_alive(progress=None):
+    """Extend the running job's lease inside the caller's transaction.
+
+    Handlers that may outlive JOB_LEASE_SECONDS call this between steps so
+    another worker does not take the job over while it is still running.
+    progress, if given, is stored as the job's result so far for status polls.
+    """
+    job_id = getattr(_running, 'job_id', None)
+    if job_id is None:
+        return
+    lease = timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    values = {Job.locked_until: datetime.utcnow() + lease}
+    if progress is not None:
+        values[Job.result] = json.dumps(progress)
+    _leased(job_id, _running.attempt).update(values, synchronize_session=False)
+
+def _leased(job_id, attempt):
+    """Query for the job while it still runs under the lease taken for attempt"""
+    return Job.query.filter_by(id=job_id, status='running', attempts=attempt)
+
+def serialize_job(job):
+    """JSON payload for job status polling"""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': json.loads(job.result) if job.result else None,
+        'error': job.error,
+    }
+
+def _runnable(now):
+    return (
+        ((Job.status == 'queued') & (Job.run_after <= now)) |
+        ((Job.status == 'running') & (Job.locked_until < now))
+    )
+
+def _claim(candidates=None):
+    """Take the lease on the oldest runnable job (among candidates, if given), or return None"""
+    now = datetime.utcnow()
+    runnable = _runnable(now)
+    if candidates is None:
+        candidates = [job_id for (job_id,) in db.session.query(Job.id).filter(runnable).order_by(Job.id).limit(5)]
+        db.session.commit()
+
+    lease = timedelta(seconds=current_app.config['JOB_LEASE_SECONDS'])
+    for job_id in candidates:
+        # Repeat the runnable check in the UPDATE so only one worker wins
+        claimed = Job.query.filter(Job.id == job_id, runnable).update({
+            Job.status: 'running',
+            Job.attempts: Job.attempts + 1,
+            Job.locked_until: now + lease,
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return Job.query.get(job_id)
+    return None
+
+def run_next():
+    """Claim and run one job. Returns False if nothing was runnable."""
+    return _run(_claim())
+
+def run_job(job_id):
+    """Claim and run one particular job on this thread (for JOB_WORKERS = 0).
+
+    Returns False if the job was not runnable, e.g. a worker already has it.
+    """
+    return _run(_claim([job_id]))
+
+def _run(job):
+    if job is None:
+        return False
+
+    job_id, kind, attempt = job.id, job.kind, job.attempts
+    try:
+        if attempt > job.max_attempts:
+            raise RuntimeError('Lease expired too many times')
+        handler = _handlers.get(kind)
+        if handler is None:
+            raise LookupError(f'No handler registered for job kind {kind!r}')
+        _running.job_id, _running.attempt = job_id, attempt
+        result = handler(json.loads(job.payload) if job.payload else {})
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}'
+        values = {Job.error: error, Job.locked_until: None}
+        if attempt >= job.max_attempts:
+            values[Job.status] = 'failed'
+        else:
+            # Exponential backoff: base, 2 * base, 4 * base, ...
+            delay = current_app.config['JOB_RETRY_BACKOFF'] * 2 ** (attempt - 1)
+            values.update({Job.status: 'queued', Job.run_after: datetime.utcnow() + timedelta(seconds=delay)})
+        recorded = _leased(job_id, attempt).update(values, synchronize_session=False)
+        db.session.commit()
+        if recorded:
+            logger.warning('Job %s (%s) attempt %s failed: %s', job_id, kind, attempt, error)
+        else:
+            logger.warning('Job %s (%s) attempt %s failed after losing its lease: %s', job_id, kind, attempt, error)
+        return True
+    finally:
+        _running.job_id = None
+
+    recorded = _leased(job_id, attempt).update({
+        Job.status: 'done',
+        Job.result: json.dumps(result) if result is not None else None,
+        Job.error: None,
+        Job.locked_until: None,
+    }, synchronize_session=False)
+    # The handler's own writes are committed either way; only the outcome is dropped
+    db.session.commit()
+    if not recorded:
+        logger.warning('Job %s (%s) attempt %s finished after losing its lease; result not recorded',
+                       job_id, kind, attempt)
+    return True
+
+class WorkerPool:
+    """Threads that run queued jobs inside one process"""
+
+    def __init__(self, app, size, poll_interval):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            ran = False
+            with self.app.app_context():
+                try:
+                    ran = run_next()
+                except Exception:
+                    logger.exception('Job worker error')
+                finally:
+                    db.session.remove()
+            if not ran:
+                self._stop.wait(self.poll_interval)
+
+def start_workers(app, size=None):
+    """Start the job worker pool for this process (once)"""
+    size = app.config['JOB_WORKERS'] if size is None else size
+    if size <= 0 or 'job_workers' in app.extensions:
+        return app.extensions.get('job_workers')
+
+    pool = WorkerPool(app, size, app.config['JOB_POLL_INTERVAL'])
+    pool.start()
+    app.extensions['job_workers'] = pool
+    return pool
@@ -0,0 +1,11 @@
+"""Create any missing tables from the models.
+
+Databases created before migrations existed were built with create_all, so
+this only adds tables introduced since; later migrations bring the existing
+tables up to date.
+"""
+from app import db
+
+
+def upgrade(echo):
+    db.create_all()
@@ -0,0 +1,78 @@
+"""Link messages to conversations and count unread messages.
+
+Adds messages.conversation_id, creates one conversation per pair of users
+who have exchanged messages, fills the column in id ranges so a large table
+is not locked in one transaction, then seeds the unread counters.
+"""
+from sqlalchemy import Column, Index, Integer, MetaData, Table, inspect, text
+from app import db
+from app.migrations import create_index
+
+BATCH_SIZE = 10000
+
+# Canonical (lower id, higher id) pair for a message row
+PAIR_LOW = 'CASE WHEN sender_id < recipient_id THEN sender_id ELSE recipient_id END'
+PAIR_HIGH = 'CASE WHEN sender_id < recipient_id THEN recipient_id ELSE sender_id END'
+
+# The indexes as of this version, on a table holding only their columns
+messages = Table('messages', MetaData(), *(Column(name, Integer) for name in ('id', 'conversation_id', 'recipient_id', 'is_read')))
+INDEXES = [
+    Index('ix_messages_conversation_id_id', messages.c.conversation_id, messages.c.id),
+    Index('ix_messages_recipient_id_is_read', messages.c.recipient_id, messages.c.is_read),
+]
+
+
+def upgrade(echo):
+    columns = [c['name'] for c in inspect(db.engine).get_columns('messages')]
+    if 'conversation_id' not in columns:
+        echo('Adding messages.conversation_id...')
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE messages ADD COLUMN conversation_id INTEGER REFERENCES conversations (id)'))
+
+    echo('Creating conversations...')
+    with db.engine.begin() as conn:
+        conn.execute(text(f'''
+            INSERT INTO conversations (user_low_id, user_high_id, created_at)
+            SELECT pairs.low, pairs.high, MIN(pairs.created_at)
+            FROM (
+                SELECT {PAIR_LOW} AS low, {PAIR_HIGH} AS high, created_at
+                FROM messages WHERE conversation_id IS NULL
+            ) AS pairs
+            WHERE NOT EXISTS (
+                SELECT 1 FROM conversations c
+                WHERE c.user_low_id = pairs.low AND c.user_high_id = pairs.high
+            )
+            GROUP BY pairs.low, pairs.high
+        '''))
+
+    # Update in id ranges so a large table is not locked in one transaction
+    with db.engine.connect() as conn:
+        max_id = conn.execute(text('SELECT MAX(id) FROM messages')).scalar() or 0
+    updated = 0
+    for start in range(0, max_id, BATCH_SIZE):
+        with db.engine.begin() as conn:
+            result = conn.execute(text(f'''
+                UPDATE messages SET conversation_id = (
+                    SELECT c.id FROM conversations c
+                    WHERE c.user_low_id = {PAIR_LOW} AND c.user_high_id = {PAIR_HIGH}
+                )
+                WHERE conversation_id IS NULL AND id > :start AND id <= :end
+            '''), {'start': start, 'end': start + BATCH_SIZE})
+            updated += result.rowcount
+    echo(f'Backfilled {updated} messages.')
+
+    echo('Counting unread messages...')
+    with db.engine.begin() as conn:
+        conn.execute(text('''
+            INSERT INTO conversation_members (conversation_id, user_id, unread_count)
+            SELECT m.conversation_id, m.recipient_id, SUM(CASE WHEN m.is_read THEN 0 ELSE 1 END)
+            FROM messages m
+            WHERE m.conversation_id IS NOT NULL AND NOT EXISTS (
+                SELECT 1 FROM conversation_members cm
+                WHERE cm.conversation_id = m.conversation_id AND cm.user_id = m.recipient_id
+            )
+            GROUP BY m.conversation_id, m.recipient_id
+        '''))
+
+    for index in INDEXES:
+        create_index(index, echo)
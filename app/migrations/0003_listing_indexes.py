@@ -0,0 +1,19 @@
+"""Index the filter and sort keys of the paginated user and course lists."""
+from sqlalchemy import Column, Index, MetaData, String, Table
+from app.migrations import create_index
+
+# The indexes as of this version, on tables holding only their columns
+metadata = MetaData()
+users = Table('users', metadata, *(Column(name, String) for name in ('id', 'role')))
+courses = Table('courses', metadata, *(Column(name, String) for name in ('id', 'is_published', 'category', 'level')))
+INDEXES = [
+    Index('ix_users_role_id', users.c.role, users.c.id),
+    Index('ix_courses_published_category_id', courses.c.is_published, courses.c.category, courses.c.id),
+    Index('ix_courses_published_level_id', courses.c.is_published, courses.c.level, courses.c.id),
+]
+
+
+def upgrade(echo):
+    for index in INDEXES:
+        echo(f'Creating {index.name}...')
+        create_index(index, echo)
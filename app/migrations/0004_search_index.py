@@ -0,0 +1,48 @@
+"""Create the full-text search tables and index existing records.
+
+Reads the source tables with Core selects of the columns they had at this
+version, so later model changes cannot break the upgrade.
+"""
+from sqlalchemy import column, select, table, text
+from app import db
+
+# FTS table -> (source table, title column, body columns, extra filter)
+SOURCES = {
+    'course_search': (table('courses', column('id'), column('title'), column('description'),
+                            column('category'), column('instructor')),
+                      'title', ('description', 'category', 'instructor'), None),
+    'module_search': (table('course_modules', column('id'), column('title'), column('description'),
+                            column('content')),
+                      'title', ('description', 'content'), None),
+    'mentor_search': (table('users', column('id'), column('username'), column('full_name'),
+                            column('expertise'), column('bio'), column('role')),
+                      None, ('expertise', 'bio'), ('role', 'mentor')),
+}
+
+
+def upgrade(echo):
+    if db.engine.dialect.name != 'sqlite':
+        echo('Full-text index not supported on this database; search uses LIKE.')
+        return
+
+    indexed = 0
+    with db.engine.begin() as conn:
+        for fts_table, (source, title, body, only) in SOURCES.items():
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+                f"title, body, tokenize='porter unicode61', prefix='2 3')"
+            ))
+            conn.execute(text(f'DELETE FROM {fts_table}'))
+            query = select(source)
+            if only:
+                query = query.where(source.c[only[0]] == only[1])
+            rows = []
+            for row in conn.execute(query):
+                # Mentors are titled by their full name, falling back to the username
+                row_title = row._mapping[title] if title else (row._mapping['full_name'] or row._mapping['username'])
+                rows.append({'id': row._mapping['id'], 'title': row_title,
+                             'body': ' '.join(filter(None, [row._mapping[name] for name in body]))})
+            if rows:
+                conn.execute(text(f'INSERT INTO {fts_table} (rowid, title, body) VALUES (:id, :title, :body)'), rows)
+            indexed += len(rows)
+    echo(f'Indexed {indexed} records.')
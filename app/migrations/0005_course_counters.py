@@ -0,0 +1,53 @@
+"""Fill the per-course stats and catalog facet tables from existing data.
+
+The tables below name only the columns this migration reads and writes,
+as they were at this version; it does not import the models.
+"""
+from sqlalchemy import case, column, func, select, table
+from app import db
+
+courses = table('courses', column('id'), column('category'), column('level'), column('is_published'))
+modules = table('course_modules', column('id'), column('course_id'))
+enrollments = table('course_enrollments', column('id'), column('course_id'), column('is_completed'),
+                    column('progress_percentage'))
+course_stats = table('course_stats', column('course_id'), column('module_count'), column('enrolled_count'),
+                     column('completed_count'), column('progress_total'))
+course_facets = table('course_facets', column('category'), column('level'), column('course_count'))
+
+
+def upgrade(echo):
+    with db.engine.begin() as conn:
+        module_counts = dict(conn.execute(
+            select(modules.c.course_id, func.count(modules.c.id)).group_by(modules.c.course_id)
+        ).all())
+        enrollment_counts = {row[0]: row[1:] for row in conn.execute(
+            select(
+                enrollments.c.course_id,
+                func.count(enrollments.c.id),
+                func.sum(case((enrollments.c.is_completed.is_(True), 1), else_=0)),
+                func.coalesce(func.sum(enrollments.c.progress_percentage), 0.0),
+            ).group_by(enrollments.c.course_id)
+        )}
+        stats = []
+        for (course_id,) in conn.execute(select(courses.c.id)):
+            enrolled, completed, progress_total = enrollment_counts.get(course_id, (0, 0, 0.0))
+            stats.append({'course_id': course_id, 'module_count': module_counts.get(course_id, 0),
+                          'enrolled_count': enrolled, 'completed_count': completed or 0,
+                          'progress_total': progress_total or 0.0})
+        conn.execute(course_stats.delete())
+        if stats:
+            conn.execute(course_stats.insert(), stats)
+    echo(f'Rebuilt stats for {len(stats)} courses.')
+
+    with db.engine.begin() as conn:
+        facets = [{'category': category, 'level': level, 'course_count': count}
+                  for category, level, count in conn.execute(
+                      select(courses.c.category, courses.c.level, func.count(courses.c.id)).where(
+                          courses.c.is_published.is_(True), courses.c.category.isnot(None),
+                          courses.c.level.isnot(None)
+                      ).group_by(courses.c.category, courses.c.level)
+                  )]
+        conn.execute(course_facets.delete())
+        if facets:
+            conn.execute(course_facets.insert(), facets)
+    echo(f'Rebuilt {len(facets)} course facets.')
@@ -0,0 +1,11 @@
+"""Add users.identity_version, the stamp cached identities are checked against."""
+from sqlalchemy import inspect, text
+from app import db
+
+
+def upgrade(echo):
+    columns = [c['name'] for c in inspect(db.engine).get_columns('users')]
+    if 'identity_version' not in columns:
+        echo('Adding users.identity_version...')
+        with db.engine.begin() as conn:
+            conn.execute(text('ALTER TABLE users ADD COLUMN identity_version INTEGER NOT NULL DEFAULT 0'))
@@ -0,0 +1,165 @@
+"""Versioned schema migrations.
+
+Each migration is a module in this package named ``NNNN_description.py``
+with a docstring and an ``upgrade(echo)`` function. ``flask db upgrade``
+runs the ones not yet recorded in ``schema_migrations``, in order, and
+records each as it finishes; ``flask db status`` lists them.
+
+Migration 0001 creates any missing tables from the current models, so a new
+database gets the latest tables straight away and later migrations find
+their columns and indexes already there. Every migration must therefore be
+safe to run against a schema that already has its change (check first,
+CREATE ... IF NOT EXISTS). Only 0001 may use the models: later migrations
+describe the tables they touch themselves (``table()``/``column()`` or raw
+SQL), so a column added to a model afterwards cannot break them.
+
+App startup does not touch the schema; ``check_schema`` reads the applied
+version once and by default refuses to start when migrations are pending.
+Deploys run ``flask db upgrade`` first; gunicorn_config.py also upgrades
+once in the master before any worker starts.
+"""
+import importlib
+import logging
+import os
+import pkgutil
+import re
+from datetime import datetime
+import click
+from sqlalchemy import exc, func, select, text
+from app import db
+
+logger = logging.getLogger(__name__)
+
+_MODULE_NAME = re.compile(r'^(\d{4})_(\w+)$')
+
+
+class SchemaOutOfDate(RuntimeError):
+    """The database has migrations pending"""
+
+
+def _discover():
+    # Only file names are read here; modules are imported when they run
+    found = []
+    for module in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        match = _MODULE_NAME.match(module.name)
+        if match:
+            found.append((int(match.group(1)), module.name))
+    return sorted(found)
+
+
+def latest_version():
+    """Version of the newest migration in the package (0 if there are none)"""
+    migrations = _discover()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version():
+    """Newest migration applied to the database, or 0 for an unmigrated database"""
+    from app.models import SchemaMigration
+
+    table = SchemaMigration.__table__
+    try:
+        with db.engine.connect() as connection:
+            return connection.execute(select(func.max(table.c.version))).scalar() or 0
+    except (exc.OperationalError, exc.ProgrammingError):
+        # No schema_migrations table yet
+        return 0
+
+
+def status():
+    """[(version, module name, applied_at or None), ...] for every migration"""
+    from app.models import SchemaMigration
+
+    applied = {}
+    if current_version():
+        applied = {row.version: row.applied_at for row in SchemaMigration.query.all()}
+    return [(version, name, applied.get(version)) for version, name in _discover()]
+
+
+def upgrade(target=None, echo=None):
+    """Apply pending migrations up to target (default: all); returns the versions applied"""
+    from app.models import SchemaMigration
+
+    echo = echo or logger.info
+    SchemaMigration.__table__.create(bind=db.engine, checkfirst=True)
+    done = {version for (version,) in db.session.query(SchemaMigration.version)}
+    db.session.commit()
+
+    applied = []
+    for version, name in _discover():
+        if version in done or (target is not None and version > target):
+            continue
+        module = importlib.import_module(f'{__name__}.{name}')
+        echo(f'Applying {name}: {module.__doc__.strip().splitlines()[0]}')
+        module.upgrade(echo)
+        db.session.commit()
+        db.session.add(SchemaMigration(version=version, name=name, applied_at=datetime.utcnow()))
+        db.session.commit()
+        applied.append(version)
+    return applied
+
+
+def create_upgraded_app(config_class=None):
+    """create_app() with pending migrations applied first.
+
+    For entry points that own the database: ``python run.py``, seed.py and
+    gunicorn's on_starting hook. The schema check is skipped while the app
+    is created, since upgrading is the next step.
+    """
+    from app import create_app
+    from config import DevelopmentConfig
+
+    config_class = config_class or DevelopmentConfig
+    app = create_app(type(config_class.__name__, (config_class,), {'SCHEMA_CHECK': 'off'}))
+    app.config['SCHEMA_CHECK'] = config_class.SCHEMA_CHECK
+    with app.app_context():
+        upgrade()
+    return app
+
+
+def check_schema(app):
+    """Compare the database's schema version with the code's at startup.
+
+    SCHEMA_CHECK 'error' (the default) refuses to start, 'warn' logs pending migrations
+    and 'off' skips the check. flask commands (``flask db upgrade`` itself
+    among them) only ever warn.
+    """
+    mode = app.config['SCHEMA_CHECK']
+    if mode == 'off':
+        return
+    with app.app_context():
+        current, latest = current_version(), latest_version()
+    if current >= latest:
+        return
+    message = f'Database schema is at version {current}, code expects {latest}; run "flask db upgrade"'
+    if mode == 'error' and click.get_current_context(silent=True) is None:
+        raise SchemaOutOfDate(message)
+    app.logger.warning(message)
+
+
+def create_index(index, echo=None):
+    """Create index if it does not exist, without blocking writes where the database allows.
+
+    Postgres builds it CONCURRENTLY (outside a transaction), dropping an
+    invalid index left behind by an interrupted build first. SQLite has no
+    online build: writers wait while the index is built.
+    """
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        index.create(bind=engine, checkfirst=True)
+        return
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        invalid = connection.execute(text(
+            'SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE c.relname = :name AND NOT i.indisvalid'
+        ), {'name': index.name}).first()
+        if invalid:
+            if echo:
+                echo(f'Dropping invalid index {index.name}')
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {index.name}'))
+        columns = ', '.join(column.name for column in index.columns)
+        unique = 'UNIQUE ' if index.unique else ''
+        connection.execute(text(
+            f'CREATE {unique}INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table.name} ({columns})'
+        ))
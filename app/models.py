@@ -1,17 +1,32 @@
-from app import db, login_manager
+from app import db
 from flask_login import UserMixin
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 
-@login_manager.user_loader
-def load_user(user_id):
-    """Load user by ID for Flask-Login"""
-    return User.query.get(int(user_id))
+def insert_ignore(model, _connection=None, **values):
+    """INSERT a row, silently skipping it if it violates a unique constraint.
+
+    Runs on the session unless _connection is given (e.g. inside flush hooks).
+    """
+    executor = _connection if _connection is not None else db.session
+    dialect = (_connection.engine if _connection is not None else db.session.get_bind()).dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        statement = insert(model.__table__).values(**values).on_conflict_do_nothing()
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        statement = insert(model.__table__).values(**values).on_conflict_do_nothing()
+    else:
+        statement = model.__table__.insert().values(**values).prefix_with('IGNORE')
+    return executor.execute(statement)
 
 # ============ USER MODEL ============
 class User(UserMixin, db.Model):
     """User model for students, mentors, and admins"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Keyset pagination of users by role (admin list, mentor browse)
+        db.Index('ix_users_role_id', 'role', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -25,6 +40,8 @@ class User(UserMixin, db.Model):
     is_active = db.Column(db.Boolean, default=True)
     theme = db.Column(db.String(10), default='light')  # 'light' or 'dark'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped on every change so cached identities can tell they are stale (app/identity.py)
+    identity_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     # Relationships
     courses_enrolled = db.relationship('CourseEnrollment', backref='student', lazy=True, foreign_keys='CourseEnrollment.student_id')
@@ -33,13 +50,20 @@ class User(UserMixin, db.Model):
     messages_sent = db.relationship('Message', backref='sender', lazy=True, foreign_keys='Message.sender_id')
     messages_received = db.relationship('Message', backref='recipient', lazy=True, foreign_keys='Message.recipient_id')
     
-    def set_password(self, password):
-        """Hash and set password"""
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, method=None):
+        """Hash and set password (under PASSWORD_HASH_METHOD unless method is given)"""
+        from app.passwords import get_hasher
+        self.password_hash = get_hasher().hash(password, method)
     
     def check_password(self, password):
-        """Check if provided password matches hash"""
-        return check_password_hash(self.password_hash, password)
+        """Check if provided password matches hash, upgrading a hash made under an older policy"""
+        from app.passwords import get_hasher
+        hasher = get_hasher()
+        if not hasher.verify(self.password_hash, password):
+            return False
+        if hasher.needs_rehash(self.password_hash):
+            self.password_hash = hasher.hash(password)
+        return True
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -48,6 +72,11 @@ class User(UserMixin, db.Model):
 class Course(db.Model):
     """Course model for agriculture training"""
     __tablename__ = 'courses'
+    __table_args__ = (
+        # Keyset pagination of the published catalog, filtered by category or level
+        db.Index('ix_courses_published_category_id', 'is_published', 'category', 'id'),
+        db.Index('ix_courses_published_level_id', 'is_published', 'level', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -69,6 +98,46 @@ class Course(db.Model):
     def __repr__(self):
         return f'<Course {self.title}>'
 
+# ============ COURSE STATS MODEL ============
+class CourseStats(db.Model):
+    """Denormalized per-course counters, updated in the same transaction as
+    module creation, enrollment and completion (see app.course_stats)"""
+    __tablename__ = 'course_stats'
+    
+    course_id = db.Column(db.Integer, db.ForeignKey('courses.id'), primary_key=True)
+    module_count = db.Column(db.Integer, default=0, nullable=False)
+    enrolled_count = db.Column(db.Integer, default=0, nullable=False)
+    completed_count = db.Column(db.Integer, default=0, nullable=False)
+    progress_total = db.Column(db.Float, default=0.0, nullable=False)  # Sum of enrollment progress_percentage
+    
+    # Relationships
+    course = db.relationship('Course', backref=db.backref('stats', uselist=False, cascade='all, delete-orphan'))
+    
+    @property
+    def average_progress(self):
+        return self.progress_total / self.enrolled_count if self.enrolled_count else 0.0
+    
+    @property
+    def completion_rate(self):
+        return self.completed_count * 100.0 / self.enrolled_count if self.enrolled_count else 0.0
+    
+    def __repr__(self):
+        return f'<CourseStats course={self.course_id} modules={self.module_count} enrolled={self.enrolled_count}>'
+
+# ============ COURSE FACET MODEL ============
+class CourseFacet(db.Model):
+    """Number of published courses per (category, level), kept current on
+    every course write so catalog facet counts never scan courses
+    (see app.facets)"""
+    __tablename__ = 'course_facets'
+    
+    category = db.Column(db.String(100), primary_key=True)
+    level = db.Column(db.String(20), primary_key=True)
+    course_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    def __repr__(self):
+        return f'<CourseFacet {self.category}/{self.level}={self.course_count}>'
+
 # ============ COURSE MODULE MODEL ============
 class CourseModule(db.Model):
     """Individual modules/lessons within a course"""
@@ -105,6 +174,23 @@ class CourseEnrollment(db.Model):
     def __repr__(self):
         return f'<CourseEnrollment student={self.student_id} course={self.course_id}>'
 
+# ============ MODULE COMPLETION MODEL ============
+class ModuleCompletion(db.Model):
+    """Which modules a student has completed within an enrollment"""
+    __tablename__ = 'module_completions'
+    __table_args__ = (
+        # One row per module, so repeated clicks cannot inflate progress
+        db.UniqueConstraint('enrollment_id', 'module_id', name='uq_module_completions_enrollment_module'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    enrollment_id = db.Column(db.Integer, db.ForeignKey('course_enrollments.id'), nullable=False)
+    module_id = db.Column(db.Integer, db.ForeignKey('course_modules.id'), nullable=False)
+    completed_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ModuleCompletion enrollment={self.enrollment_id} module={self.module_id}>'
+
 # ============ MENTORSHIP REQUEST MODEL ============
 class MentorshipRequest(db.Model):
     """Handle mentorship requests from students to mentors"""
@@ -121,12 +207,65 @@ class MentorshipRequest(db.Model):
     def __repr__(self):
         return f'<MentorshipRequest student={self.student_id} mentor={self.mentor_id} status={self.status}>'
 
+# ============ CONVERSATION MODEL ============
+class Conversation(db.Model):
+    """Chat thread between two users, stored with the lower user id first"""
+    __tablename__ = 'conversations'
+    __table_args__ = (
+        db.UniqueConstraint('user_low_id', 'user_high_id', name='uq_conversations_users'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_low_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_high_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @classmethod
+    def between(cls, user_a, user_b, create=False):
+        """Conversation between two user ids, optionally creating it"""
+        low, high = sorted((user_a, user_b))
+        conversation = cls.query.filter_by(user_low_id=low, user_high_id=high).first()
+        if conversation is None and create:
+            # Two first messages can race here, so let the unique constraint decide
+            insert_ignore(cls, user_low_id=low, user_high_id=high, created_at=datetime.utcnow())
+            conversation = cls.query.filter_by(user_low_id=low, user_high_id=high).first()
+        return conversation
+    
+    def __repr__(self):
+        return f'<Conversation {self.user_low_id}-{self.user_high_id}>'
+
+# ============ CONVERSATION MEMBER MODEL ============
+class ConversationMember(db.Model):
+    """Per-user unread counter and read position within a conversation"""
+    __tablename__ = 'conversation_members'
+    __table_args__ = (
+        db.UniqueConstraint('conversation_id', 'user_id', name='uq_conversation_members_user'),
+        # Navbar total: SUM(unread_count) for one user
+        db.Index('ix_conversation_members_user_id', 'user_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    unread_count = db.Column(db.Integer, default=0, nullable=False)
+    last_read_message_id = db.Column(db.Integer, nullable=True)  # Read receipt for the other participant
+    
+    def __repr__(self):
+        return f'<ConversationMember conversation={self.conversation_id} user={self.user_id} unread={self.unread_count}>'
+
 # ============ MESSAGE MODEL ============
 class Message(db.Model):
     """Messages between student and mentor"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        # History pages and streaming seek on (conversation_id, id)
+        db.Index('ix_messages_conversation_id_id', 'conversation_id', 'id'),
+        # Unread lookups for a recipient
+        db.Index('ix_messages_recipient_id_is_read', 'recipient_id', 'is_read'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversations.id'), nullable=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     recipient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -152,4 +291,44 @@ class Certificate(db.Model):
     course = db.relationship('Course', backref='certificates')
     
     def __repr__(self):
-        return f'<Certificate student={self.student_id} course={self.course_id}>'
\ No newline at end of file
+        return f'<Certificate student={self.student_id} course={self.course_id}>'
+
+
+# ============ JOB MODEL ============
+class Job(db.Model):
+    """Background work item, run by the app.jobs worker pool"""
+    __tablename__ = 'jobs'
+    __table_args__ = (
+        # Workers look for the oldest runnable job
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # Name of the registered handler
+    payload = db.Column(db.Text, nullable=True)  # JSON format
+    idempotency_key = db.Column(db.String(200), unique=True, nullable=True)  # Enqueueing the same key twice returns the first job
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Who may poll the job status
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'done', 'failed'
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    result = db.Column(db.Text, nullable=True)  # JSON format
+    error = db.Column(db.Text, nullable=True)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime, nullable=True)  # Lease; a crashed worker's job is retried once it expires
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.kind} {self.status}>'
+
+# ============ SCHEMA MIGRATION MODEL ============
+class SchemaMigration(db.Model):
+    """A migration from app/migrations that has been applied to this database"""
+    __tablename__ = 'schema_migrations'
+    
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100), nullable=False)
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<SchemaMigration {self.version} {self.name}>'
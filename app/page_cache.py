@@ -0,0 +1,78 @@
+"""Whole-response caching for public pages.
+
+Pages are stored in the application cache (see app/cache.py) under a
+namespace, so ``invalidate('courses')`` purges every cached catalog page at
+once.
+"""
+import functools
+import hashlib
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+from flask import current_app, request, session, make_response
+from flask_login import current_user
+from app.cache import get_cache, namespace_key
+
+
+def _page_key():
+    # Same page whatever order the query arguments come in
+    args = sorted(request.args.items(multi=True))
+    return f'page:{request.path}?{urlencode(args)}'
+
+
+def _cached_response(entry):
+    response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+    return _with_validators(response, entry)
+
+
+def _with_validators(response, entry):
+    response.set_etag(entry['etag'])
+    if entry['last_modified'] is not None:
+        response.last_modified = datetime.fromtimestamp(entry['last_modified'], timezone.utc)
+    # Browsers must revalidate, and shared caches must not hand this to a logged-in user
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+
+def cache_page(namespace, last_modified=None):
+    """Cache a view's HTML for anonymous GET requests.
+
+    last_modified(**view_args) returns the naive UTC datetime the page was
+    last changed, used for the Last-Modified header. It is only called when
+    the page is rendered, not on cache hits.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def decorated(*args, **kwargs):
+            # Logged-in pages vary per user, and pending flash messages are per visitor
+            if request.method != 'GET' or current_user.is_authenticated or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            cache = get_cache()
+            key = namespace_key(namespace, _page_key())
+            entry = cache.get(key)
+            if entry is not None:
+                response = _cached_response(entry)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            # Redirects, errors and anything that touched the session are not shared
+            if response.status_code != 200 or session.modified:
+                return response
+
+            changed = last_modified(**kwargs) if last_modified else None
+            body = response.get_data(as_text=True)
+            entry = {
+                'body': body,
+                'mimetype': response.mimetype,
+                'etag': hashlib.sha1(body.encode()).hexdigest(),
+                'last_modified': changed.replace(tzinfo=timezone.utc).timestamp() if changed else None,
+            }
+            cache.set(key, entry, current_app.config['PAGE_CACHE_TTL'])
+            response = _with_validators(response, entry)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return decorated
+    return decorator
+
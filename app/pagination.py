@@ -0,0 +1,157 @@
+"""Keyset (seek) pagination with opaque cursors.
+
+Instead of OFFSET, each page asks for rows strictly after (or before) the
+sort key of the last (or first) row the client saw, so page 1,000 costs the
+same as page 1 when an index covers the filter and sort columns. Cursors are
+URL-safe base64 JSON and should be treated as opaque by clients.
+
+No COUNT(*) is run; callers pass a total they already have (or a cached
+estimate), or None to leave it out.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+# Integers a database driver can bind (SQLite and Postgres BIGINT)
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class Page:
+    """One page of results plus the cursors to its neighbours"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    def as_dict(self, serialize):
+        """JSON body: serialized items plus paging fields"""
+        return {
+            'items': [serialize(item) for item in self.items],
+            'next_cursor': self.next_cursor,
+            'prev_cursor': self.prev_cursor,
+            'total': self.total,
+        }
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value, column):
+    """Cursor value for a sort column; raises ValueError if it cannot belong to it"""
+    if value is None:
+        return None
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        expected = None
+    if expected is datetime:
+        if not (isinstance(value, dict) and isinstance(value.get('dt'), str)):
+            raise ValueError('expected a datetime')
+        return datetime.fromisoformat(value['dt'])
+    if isinstance(value, (dict, list)) or isinstance(value, bool) and expected is not bool:
+        raise ValueError('expected a scalar')
+    if isinstance(value, int) and not INT64_MIN <= value <= INT64_MAX:
+        raise ValueError('integer out of range')
+    if expected is float and isinstance(value, int):
+        return float(value)
+    if expected is not None and not isinstance(value, expected):
+        raise ValueError(f'expected {expected.__name__}')
+    return value
+
+
+def encode_cursor(payload):
+    data = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Payload of a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(data)
+    except (binascii.Error, ValueError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def _seek(sort_keys, values, forward):
+    """Rows strictly after values in sort order (or strictly before if not forward)"""
+    clauses = []
+    for i, (column, descending) in enumerate(sort_keys):
+        ties = [sort_keys[j][0] == values[j] for j in range(i)]
+        after = (column < values[i]) if descending else (column > values[i])
+        before = (column > values[i]) if descending else (column < values[i])
+        clauses.append(and_(*ties, after if forward else before))
+    return or_(*clauses)
+
+
+def keyset_page(query, sort_keys, cursor=None, per_page=20, total=None):
+    """Fetch one page of query ordered by sort_keys.
+
+    sort_keys is a list of (column, descending) pairs whose last entry is
+    unique (normally the primary key) so every row has a distinct position.
+    """
+    payload = decode_cursor(cursor) or {}
+    backward = 'before' in payload
+    values = payload.get('before') if backward else payload.get('after')
+    try:
+        if not isinstance(values, list) or len(values) != len(sort_keys):
+            raise ValueError('wrong number of values')
+        values = [_decode_value(value, column) for value, (column, _descending) in zip(values, sort_keys)]
+    except (TypeError, ValueError):
+        # Tampered or stale cursors start from the first page
+        backward, values = False, None
+
+    if values is not None:
+        query = query.filter(_seek(sort_keys, values, forward=not backward))
+    # Walking backwards reads the previous rows in reverse and flips them afterwards
+    order = [(column.asc() if descending == backward else column.desc()) for column, descending in sort_keys]
+    rows = query.order_by(None).order_by(*order).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+
+    def key(row):
+        return [_encode_value(getattr(row, column.key)) for column, _descending in sort_keys]
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if more or backward:
+            next_cursor = encode_cursor({'after': key(rows[-1])})
+        if (more and backward) or (values is not None and not backward):
+            prev_cursor = encode_cursor({'before': key(rows[0])})
+    return Page(rows, next_cursor, prev_cursor, total)
+
+
+def offset_page(query, cursor=None, per_page=20, total=None):
+    """Cursor pagination over an ordering with no usable seek key (e.g. search rank)"""
+    payload = decode_cursor(cursor) or {}
+    offset = payload.get('offset', 0)
+    if not isinstance(offset, int) or isinstance(offset, bool) or not 0 <= offset <= INT64_MAX - per_page:
+        offset = 0
+
+    rows = query.offset(offset).limit(per_page + 1).all()
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor({'offset': offset + per_page}) if more else None
+    prev_cursor = encode_cursor({'offset': max(offset - per_page, 0)}) if offset else None
+    return Page(rows, next_cursor, prev_cursor, total)
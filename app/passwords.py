@@ -0,0 +1,100 @@
+"""Password hashing policy.
+
+``PASSWORD_HASH_METHOD`` picks the algorithm and cost in Werkzeug's notation
+(``scrypt:32768:8:1``, ``pbkdf2:sha256:600000``). New passwords are hashed
+with it. When a user signs in with a hash made under an older policy,
+``User.check_password`` rehashes the password with the current one, so a
+policy change rolls out as people log in; the login route commits it.
+
+Hashing is deliberately slow and runs in C without holding the GIL, so it is
+done on a small per-process thread pool (``PASSWORD_HASH_WORKERS`` threads).
+During a login spike at most that many hashes run at once per worker and
+the remaining cores keep serving other requests. Each login still holds its
+request thread while it waits, so only ``PASSWORD_HASH_MAX_WAITING`` more
+may queue; by default that is sized from ``WEB_THREADS`` so logins never
+take the threads pages need. A login that cannot get a slot within
+``PASSWORD_HASH_QUEUE_TIMEOUT`` seconds (none, by default) raises
+``HashingBusy`` and gets a "try again" response instead of piling up.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+
+class HashingBusy(RuntimeError):
+    """Every hashing slot stayed busy for PASSWORD_HASH_QUEUE_TIMEOUT seconds"""
+
+
+def normalize_method(method):
+    """Method with Werkzeug's defaults filled in, as it is written into a hash"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        defaults = ['32768', '8', '1']
+    elif name == 'pbkdf2':
+        defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+    else:
+        raise ValueError(f'Unsupported password hash method: {method}')
+    return ':'.join([name] + args + defaults[len(args):])
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on a bounded thread pool"""
+
+    def __init__(self, method, salt_length=16, workers=1, max_waiting=0, queue_timeout=0):
+        self.method = normalize_method(method)
+        self.salt_length = salt_length
+        self.queue_timeout = queue_timeout
+        # workers=0 hashes on the request thread (tests, scripts)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='password-hash') if workers else None
+        self._slots = threading.BoundedSemaphore(workers + max_waiting) if workers else None
+
+    @classmethod
+    def from_app(cls, app):
+        config = app.config
+        workers = config['PASSWORD_HASH_WORKERS']
+        max_waiting = config['PASSWORD_HASH_MAX_WAITING']
+        if max_waiting is None:
+            # Request threads left once hashing logins, chat streams and a couple of pages have theirs
+            max_waiting = max(0, config['WEB_THREADS'] - workers - config['CHAT_MAX_STREAMS'] - 2)
+        return cls(
+            config['PASSWORD_HASH_METHOD'],
+            config['PASSWORD_SALT_LENGTH'],
+            workers,
+            max_waiting,
+            config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+        )
+
+    def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusy('Too many password checks in progress')
+        try:
+            return self._executor.submit(func, *args).result()
+        finally:
+            self._slots.release()
+
+    def hash(self, password, method=None):
+        """Hash password under the policy (or an explicit method)"""
+        return self._run(generate_password_hash, password, method or self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """True if pwhash was made with a different algorithm or cost than the policy"""
+        return pwhash.split('$', 1)[0] != self.method
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def get_hasher():
+    return current_app.extensions['password_hasher']
+
+
+def init_passwords(app):
+    """Create the app's password hasher from its config"""
+    app.extensions['password_hasher'] = PasswordHasher.from_app(app)
@@ -0,0 +1,16 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(max_workers):
+    """Process pool that is safe to start from a threaded worker.
+
+    Gunicorn workers run request, job, stream and hashing threads, so a plain
+    fork can copy a lock another thread holds (logging, imports, SQLite) into
+    the child, where nothing will ever release it. Children come from a
+    forkserver (spawn where that is unavailable) instead, so tasks must be
+    top-level functions taking plain, picklable data.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
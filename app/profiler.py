@@ -0,0 +1,214 @@
+"""Opt-in per-endpoint request profiling.
+
+When ``PROFILER_ENABLED`` is set, SQLAlchemy engine events time every
+statement, Flask request hooks time every request and the template signals
+time rendering. Totals are kept per endpoint in memory and shown at
+``/admin/metrics`` (and as Prometheus text at ``/admin/metrics/prometheus``).
+
+The identity cache (app/identity.py) reports each user lookup through the
+``user_cache_lookup`` signal; the profiler counts hits, misses and stale
+entries alongside the request totals.
+
+When it is disabled nothing is hooked up at all, so there is no per-request
+or per-query cost. Numbers are per worker process; each gunicorn worker
+reports its own.
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from flask import g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from app import db
+from app.identity import user_cache_lookup
+
+# Outcomes reported by the identity cache
+USER_CACHE_RESULTS = ('hit', 'miss', 'stale')
+
+logger = logging.getLogger(__name__)
+
+
+class EndpointStats:
+    """Running totals for one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.request_time = 0.0
+        self.max_request_time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def as_dict(self):
+        per_request = self.requests or 1
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'request_seconds': self.request_time,
+            'max_request_seconds': self.max_request_time,
+            'avg_request_ms': self.request_time / per_request * 1000,
+            'queries': self.queries,
+            'avg_queries': self.queries / per_request,
+            'sql_seconds': self.sql_time,
+            'avg_sql_ms': self.sql_time / per_request * 1000,
+            'template_seconds': self.template_time,
+            'avg_template_ms': self.template_time / per_request * 1000,
+        }
+
+
+class Profiler:
+    """Collects request, SQL and template timings for one app"""
+
+    def __init__(self, slow_query_ms=100, keep_slowest=20):
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.keep_slowest = keep_slowest
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        # Min-heap of (seconds, tiebreak, statement, endpoint) holding the slowest statements
+        self._slowest = []
+        self._counter = itertools.count()
+        self._user_cache = dict.fromkeys(USER_CACHE_RESULTS, 0)
+
+    def init_app(self, app):
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        user_cache_lookup.connect(self._user_cache_lookup, app)
+
+    # Request hooks
+
+    def _before_request(self):
+        g._profile = {'start': time.perf_counter(), 'queries': 0, 'sql': 0.0, 'templates': 0.0, 'render_start': []}
+
+    def _teardown_request(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return
+        elapsed = time.perf_counter() - profile['start']
+        endpoint = request.endpoint or '<unmatched>'
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.errors += exc is not None
+            stats.request_time += elapsed
+            stats.max_request_time = max(stats.max_request_time, elapsed)
+            stats.queries += profile['queries']
+            stats.sql_time += profile['sql']
+            stats.template_time += profile['templates']
+
+    # Template signals
+
+    def _before_render(self, sender, template, context, **extra):
+        profile = g.get('_profile')
+        if profile is not None:
+            profile['render_start'].append(time.perf_counter())
+
+    def _after_render(self, sender, template, context, **extra):
+        profile = g.get('_profile')
+        if profile is not None and profile['render_start']:
+            profile['templates'] += time.perf_counter() - profile['render_start'].pop()
+
+    # Identity cache signal
+
+    def _user_cache_lookup(self, sender, result, **extra):
+        with self._lock:
+            self._user_cache[result] += 1
+
+    # Engine events
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_profile_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_profile_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+
+        endpoint = None
+        if has_request_context():
+            endpoint = request.endpoint
+            profile = g.get('_profile')
+            if profile is not None:
+                profile['queries'] += 1
+                profile['sql'] += elapsed
+
+        if elapsed >= self.slow_query_seconds:
+            logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, endpoint or 'background', statement)
+
+        entry = (elapsed, next(self._counter), statement, endpoint or '<background>')
+        with self._lock:
+            if len(self._slowest) < self.keep_slowest:
+                heapq.heappush(self._slowest, entry)
+            elif elapsed > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    # Reporting
+
+    def snapshot(self):
+        """Per-endpoint totals and the slowest statements seen so far"""
+        with self._lock:
+            endpoints = {name: stats.as_dict() for name, stats in self._endpoints.items()}
+            slowest = sorted(self._slowest, reverse=True)
+            user_cache = dict(self._user_cache)
+        lookups = sum(user_cache.values())
+        user_cache['hit_rate'] = user_cache['hit'] / lookups if lookups else None
+        return {
+            'endpoints': dict(sorted(endpoints.items(), key=lambda item: -item[1]['request_seconds'])),
+            'slowest_queries': [
+                {'ms': seconds * 1000, 'endpoint': endpoint, 'statement': statement}
+                for seconds, _n, statement, endpoint in slowest
+            ],
+            'user_cache': user_cache,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._slowest.clear()
+            self._user_cache = dict.fromkeys(USER_CACHE_RESULTS, 0)
+
+    def prometheus(self):
+        """Totals in the Prometheus text exposition format"""
+        metrics = [
+            ('smartfarm_requests_total', 'counter', 'Requests handled', 'requests'),
+            ('smartfarm_request_errors_total', 'counter', 'Requests that raised an exception', 'errors'),
+            ('smartfarm_request_seconds_total', 'counter', 'Time spent handling requests', 'request_seconds'),
+            ('smartfarm_request_seconds_max', 'gauge', 'Slowest request seen', 'max_request_seconds'),
+            ('smartfarm_sql_queries_total', 'counter', 'SQL statements executed', 'queries'),
+            ('smartfarm_sql_seconds_total', 'counter', 'Time spent in SQL statements', 'sql_seconds'),
+            ('smartfarm_template_seconds_total', 'counter', 'Time spent rendering templates', 'template_seconds'),
+        ]
+        snapshot = self.snapshot()
+        endpoints = snapshot['endpoints']
+        lines = []
+        for name, kind, help_text, key in metrics:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for endpoint, values in endpoints.items():
+                label = endpoint.replace('\\', '\\\\').replace('"', '\\"')
+                lines.append(f'{name}{{endpoint="{label}"}} {values[key]}')
+        lines.append('# HELP smartfarm_user_cache_lookups_total Session user lookups by identity cache result')
+        lines.append('# TYPE smartfarm_user_cache_lookups_total counter')
+        for result in USER_CACHE_RESULTS:
+            lines.append(f'smartfarm_user_cache_lookups_total{{result="{result}"}} {snapshot["user_cache"][result]}')
+        return '\n'.join(lines) + '\n'
+
+
+def init_profiler(app):
+    """Attach a profiler to app if PROFILER_ENABLED is set; returns it or None"""
+    if not app.config['PROFILER_ENABLED']:
+        return None
+    profiler = Profiler(app.config['PROFILER_SLOW_QUERY_MS'], app.config['PROFILER_KEEP_SLOWEST'])
+    profiler.init_app(app)
+    app.extensions['profiler'] = profiler
+    return profiler
@@ -0,0 +1,47 @@
+import threading
+
+
+class LocalBroker:
+    """In-process publish/subscribe used to wake waiting chat listeners.
+
+    Each channel carries a version counter. Publishers bump it, listeners block
+    until it moves past the version they last saw. Only listeners in the same
+    worker process are woken, so callers must still re-check the database after
+    a timeout to pick up messages written by other workers.
+
+    Any object with the same ``publish``/``version``/``wait`` methods can be
+    configured instead through ``CHAT_BROKER``.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions = {}
+
+    def publish(self, channel):
+        """Notify every listener waiting on channel"""
+        with self._condition:
+            self._versions[channel] = self._versions.get(channel, 0) + 1
+            self._condition.notify_all()
+
+    def version(self, channel):
+        """Current version of channel"""
+        with self._condition:
+            return self._versions.get(channel, 0)
+
+    def wait(self, channel, seen_version, timeout):
+        """Block until channel moves past seen_version or timeout expires.
+
+        Returns the channel version at wake-up.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._versions.get(channel, 0) != seen_version,
+                timeout
+            )
+            return self._versions.get(channel, 0)
+
+
+def conversation_channel(user_a, user_b):
+    """Channel name shared by both participants of a conversation"""
+    low, high = sorted((user_a, user_b))
+    return f'chat:{low}:{high}'
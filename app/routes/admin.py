@@ -1,12 +1,26 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context, send_file, abort
 from flask_login import login_required, current_user
 from functools import wraps
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import User, Course, CourseModule
+from app.models import User, Course, CourseModule, Certificate, CourseStats, Job
+from app.certificates import certificate_context, export_certificates_zip
+from app.course_stats import bump_course_stats, enrollment_totals
+from app.cache import cached, invalidate
+from app.jobs import enqueue, run_job, serialize_job
+from app.user_import import import_dir, report_path
+from app.pagination import keyset_page
+from datetime import datetime, timedelta
+import hmac
+import json
+import os
 import uuid
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Roles with a cached user count on the users page
+USER_ROLES = ('student', 'mentor', 'admin')
+
 # Admin check decorator
 def admin_required(f):
     @wraps(f)
@@ -22,19 +36,9 @@ def admin_required(f):
 @admin_required
 def dashboard():
     """Admin dashboard"""
-    users_count = User.query.count()
-    courses_count = Course.query.count()
-    students_count = User.query.filter_by(role='student').count()
-    mentors_count = User.query.filter_by(role='mentor').count()
-    
-    stats = {
-        'total_users': users_count,
-        'total_courses': courses_count,
-        'total_students': students_count,
-        'total_mentors': mentors_count,
-    }
+    stats = cached('admin:dashboard:stats', _dashboard_stats)
     
-    recent_courses = Course.query.order_by(Course.created_at.desc()).limit(5).all()
+    recent_courses = Course.query.options(joinedload(Course.stats)).order_by(Course.created_at.desc()).limit(5).all()
     recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
     
     return render_template('admin/dashboard.html',
@@ -42,13 +46,36 @@ def dashboard():
                          recent_courses=recent_courses,
                          recent_users=recent_users)
 
+def _dashboard_stats():
+    totals = enrollment_totals()
+    return {
+        'total_users': User.query.count(),
+        'total_courses': Course.query.count(),
+        'total_students': User.query.filter_by(role='student').count(),
+        'total_mentors': User.query.filter_by(role='mentor').count(),
+        'total_enrollments': totals['enrollments'],
+        'total_completions': totals['completions'],
+    }
+
 @admin_bp.route('/courses')
 @login_required
 @admin_required
 def manage_courses():
     """Manage courses"""
-    page = request.args.get('page', 1, type=int)
-    courses = Course.query.paginate(page=page, per_page=20)
+    cursor = request.args.get('cursor')
+    total = cached('admin:courses:count', lambda: Course.query.count())
+    courses = keyset_page(Course.query.options(joinedload(Course.stats)), [(Course.id, False)],
+                          cursor, per_page=20, total=total)
+    
+    if request.args.get('format') == 'json':
+        return jsonify(courses.as_dict(lambda course: {
+            'id': course.id,
+            'title': course.title,
+            'category': course.category,
+            'level': course.level,
+            'is_published': course.is_published,
+            'enrolled': course.stats.enrolled_count if course.stats else 0,
+        }))
     
     return render_template('admin/courses.html', courses=courses)
 
@@ -82,7 +109,9 @@ def create_course():
         )
         
         db.session.add(course)
+        db.session.add(CourseStats(course=course))
         db.session.commit()
+        invalidate('courses')
         
         flash(f'Course "{title}" created successfully!', 'success')
         return redirect(url_for('admin.edit_course', course_id=course.id))
@@ -107,6 +136,7 @@ def edit_course(course_id):
         course.is_published = 'is_published' in request.form
         
         db.session.commit()
+        invalidate('courses')
         flash('Course updated successfully!', 'success')
         return redirect(url_for('admin.manage_courses'))
     
@@ -140,7 +170,11 @@ def manage_modules(course_id):
         )
         
         db.session.add(module)
+        bump_course_stats(course_id, module_count=1)
+        # The course page lists its modules, so it changes too
+        course.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate('courses')
         
         flash('Module added successfully!', 'success')
         return redirect(url_for('admin.manage_modules', course_id=course_id))
@@ -152,12 +186,24 @@ def manage_modules(course_id):
 @admin_required
 def manage_users():
     """Manage users"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     role = request.args.get('role', None)
     query = User.query
     if role:
         query = query.filter_by(role=role)
-    users = query.paginate(page=page, per_page=20)
+    # Counts are cached; the list pages by id so deep pages stay cheap
+    total = cached(f'admin:users:count:{role or "all"}', query.count) if not role or role in USER_ROLES else None
+    users = keyset_page(query, [(User.id, False)], cursor, per_page=20, total=total)
+    
+    if request.args.get('format') == 'json':
+        return jsonify(users.as_dict(lambda user: {
+            'id': user.id,
+            'username': user.username,
+            'email': user.email,
+            'role': user.role,
+            'is_active': user.is_active,
+        }))
+    
     return render_template('admin/users.html', users=users, selected_role=role)
 
 @admin_bp.route('/mentors')
@@ -165,11 +211,11 @@ def manage_users():
 @admin_required
 def manage_mentors():
     """Manage mentors"""
-    page = request.args.get('page', 1, type=int)
-    mentors = User.query.filter_by(role='mentor').paginate(page=page, per_page=20)
+    cursor = request.args.get('cursor')
+    mentors = keyset_page(User.query.filter_by(role='mentor'), [(User.id, False)], cursor, per_page=20)
     return render_template('admin/mentors.html', mentors=mentors)
 
-@admin_bp.route('/users/int:user_id/toggle', methods=['POST'])
+@admin_bp.route('/users/<int:user_id>/toggle', methods=['POST'])
 @login_required
 @admin_required
 def toggle_user(user_id):
@@ -177,6 +223,136 @@ def toggle_user(user_id):
     user = User.query.get_or_404(user_id)
     user.is_active = not user.is_active
     db.session.commit()
+    invalidate('users')
     status = 'activated' if user.is_active else 'deactivated'
     flash(f'User {user.username} has been {status}.', 'success')
-    return redirect(url_for('admin.manage_users'))
\ No newline at end of file
+    return redirect(url_for('admin.manage_users'))
+
+@admin_bp.route('/users/import', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_users():
+    """Create users, and enroll them in courses, from a CSV or JSON Lines file"""
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            flash('Choose a CSV or JSON Lines file to import.', 'danger')
+            return redirect(url_for('admin.import_users'))
+        
+        fmt = 'jsonl' if upload.filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+        os.makedirs(import_dir(), exist_ok=True)
+        path = os.path.join(import_dir(), f'{uuid.uuid4().hex}.{fmt}')
+        upload.save(path)
+        
+        # Large files take minutes, so the import runs as a job; a failed run is not retried
+        job = enqueue('import_users', {'path': path, 'format': fmt}, user_id=current_user.id, max_attempts=1)
+        db.session.commit()
+        if current_app.config['JOB_WORKERS'] == 0:
+            run_job(job.id)
+        return redirect(url_for('admin.import_status', job_id=job.id))
+    
+    return render_template('admin/import_users.html', job=None)
+
+def _import_job(job_id):
+    job = Job.query.get_or_404(job_id)
+    if job.kind != 'import_users':
+        abort(404)
+    return job
+
+@admin_bp.route('/users/import/<int:job_id>')
+@login_required
+@admin_required
+def import_status(job_id):
+    """Progress and outcome of a bulk import"""
+    job = serialize_job(_import_job(job_id))
+    
+    if request.args.get('format') == 'json':
+        return jsonify(job)
+    
+    return render_template('admin/import_users.html', job=job)
+
+@admin_bp.route('/users/import/<int:job_id>/errors.csv')
+@login_required
+@admin_required
+def import_errors(job_id):
+    """Rows of an import that were rejected, with the reason for each"""
+    job = _import_job(job_id)
+    path = report_path(json.loads(job.payload)['path'])
+    if not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype='text/csv', as_attachment=True, download_name=f'import-{job_id}-errors.csv')
+
+@admin_bp.route('/certificates/export')
+@login_required
+@admin_required
+def export_certificates():
+    """Download certificates for a course or cohort as one streamed ZIP"""
+    course_id = request.args.get('course_id', type=int)
+    issued_from = request.args.get('issued_from')  # YYYY-MM-DD, inclusive
+    issued_to = request.args.get('issued_to')  # YYYY-MM-DD, inclusive
+    
+    query = Certificate.query.options(
+        joinedload(Certificate.student),
+        joinedload(Certificate.course)
+    ).order_by(Certificate.id)
+    
+    if course_id:
+        query = query.filter(Certificate.course_id == course_id)
+    try:
+        if issued_from:
+            query = query.filter(Certificate.issued_at >= datetime.strptime(issued_from, '%Y-%m-%d'))
+        if issued_to:
+            query = query.filter(Certificate.issued_at < datetime.strptime(issued_to, '%Y-%m-%d') + timedelta(days=1))
+    except ValueError:
+        flash('Dates must be in YYYY-MM-DD format.', 'danger')
+        return redirect(url_for('admin.manage_courses'))
+    
+    # Rows are fetched in batches and rendered as the archive streams out
+    contexts = (certificate_context(cert) for cert in query.yield_per(200))
+    chunks = export_certificates_zip(contexts, current_app.config['CERTIFICATE_EXPORT_PROCESSES'])
+    
+    filename = f'SmartFarm_Certificates_course-{course_id}.zip' if course_id else 'SmartFarm_Certificates.zip'
+    return Response(stream_with_context(chunks),
+                    mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@admin_bp.route('/metrics')
+@login_required
+@admin_required
+def metrics():
+    """Per-endpoint request, SQL and template timings"""
+    profiler = current_app.extensions.get('profiler')
+    snapshot = profiler.snapshot() if profiler else None
+    
+    if request.args.get('format') == 'json':
+        if snapshot is None:
+            return jsonify({'error': 'Profiling is disabled'}), 404
+        return jsonify(snapshot)
+    
+    return render_template('admin/metrics.html', snapshot=snapshot)
+
+@admin_bp.route('/metrics/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_metrics():
+    """Clear collected timings"""
+    profiler = current_app.extensions.get('profiler')
+    if profiler:
+        profiler.reset()
+        flash('Metrics reset.', 'success')
+    return redirect(url_for('admin.metrics'))
+
+@admin_bp.route('/metrics/prometheus')
+def metrics_prometheus():
+    """Timings in Prometheus text format, for admins or a scraper holding METRICS_TOKEN"""
+    token = current_app.config['METRICS_TOKEN']
+    auth = request.headers.get('Authorization', '')
+    has_token = token and hmac.compare_digest(auth, f'Bearer {token}')
+    is_admin = current_user.is_authenticated and current_user.role == 'admin'
+    if not (has_token or is_admin):
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    
+    profiler = current_app.extensions.get('profiler')
+    if profiler is None:
+        return Response('# Profiling is disabled\n', status=404, mimetype='text/plain')
+    return Response(profiler.prometheus(), mimetype='text/plain; version=0.0.4')
@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, current_user
 from app import db
 from app.models import User
+from app.cache import invalidate
+from app.passwords import HashingBusy
 from datetime import datetime
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
@@ -39,10 +41,15 @@ def register():
         
         # Create new user
         user = User(username=username, email=email, full_name=full_name, role=role)
-        user.set_password(password)
+        try:
+            user.set_password(password)
+        except HashingBusy:
+            flash('A lot of people are signing up right now. Please try again in a moment.', 'warning')
+            return render_template('auth/register.html'), 503
         
         db.session.add(user)
         db.session.commit()
+        invalidate('users')
         
         flash('Account created successfully! Please log in.', 'success')
         return redirect(url_for('auth.login'))
@@ -66,7 +73,15 @@ def login():
         
         user = User.query.filter_by(username=username).first()
         
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except HashingBusy:
+            flash('A lot of people are signing in right now. Please try again in a moment.', 'warning')
+            return render_template('auth/login.html'), 503
+        
+        if valid:
+            # Saves the hash if check_password upgraded it to the current policy
+            db.session.commit()
             login_user(user, remember=bool(remember_me))
             flash(f'Welcome back, {user.full_name or user.username}!', 'success')
             
@@ -1,15 +1,31 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime
+from sqlalchemy.orm import joinedload
 from app import db
-from app.models import Course, CourseModule, CourseEnrollment
+from app.models import Course, CourseModule, CourseEnrollment, ModuleCompletion, insert_ignore
+from app.course_stats import bump_course_stats, course_module_count
+from app.cache import invalidate
+from app.page_cache import cache_page
+from app.facets import facet_counts
+from app.pagination import keyset_page
+import logging
+
+logger = logging.getLogger(__name__)
 
 courses_bp = Blueprint('courses', __name__, url_prefix='/courses')
 
+def _catalog_last_modified():
+    return db.session.query(db.func.max(Course.updated_at)).filter(Course.is_published.is_(True)).scalar()
+
+def _course_last_modified(course_id):
+    return db.session.query(Course.updated_at).filter_by(id=course_id).scalar()
+
 @courses_bp.route('/')
+@cache_page('catalog', last_modified=_catalog_last_modified)
 def browse():
     """Browse all courses"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     category = request.args.get('category', None)
     level = request.args.get('level', None)
     
@@ -20,19 +36,36 @@ def browse():
     if level:
         query = query.filter_by(level=level)
     
-    courses = query.paginate(page=page, per_page=12)
-    
-    # Get unique categories and levels for filters
-    all_categories = db.session.query(Course.category).distinct().all()
-    categories = [c[0] for c in all_categories if c[0]]
+    # The facet table already knows how many courses match, so no COUNT is run
+    facets = facet_counts(category, level)
+    courses = keyset_page(query.options(joinedload(Course.stats)), [(Course.id, False)],
+                          cursor, per_page=12, total=facets['total'])
+    
+    if request.args.get('format') == 'json':
+        body = courses.as_dict(lambda course: {
+            'id': course.id,
+            'title': course.title,
+            'category': course.category,
+            'level': course.level,
+            'duration_weeks': course.duration_weeks,
+            'url': url_for('courses.view_course', course_id=course.id),
+        })
+        body['facets'] = {
+            'category': [{'value': value, 'count': count, 'selected': value == category}
+                         for value, count in facets['category']],
+            'level': [{'value': value, 'count': count, 'selected': value == level}
+                      for value, count in facets['level']],
+        }
+        return jsonify(body)
     
     return render_template('courses/browse.html',
                          courses=courses,
-                         categories=categories,
+                         facets=facets,
                          selected_category=category,
                          selected_level=level)
 
 @courses_bp.route('/<int:course_id>')
+@cache_page('catalog', last_modified=_course_last_modified)
 def view_course(course_id):
     """View course details"""
     course = Course.query.get_or_404(course_id)
@@ -83,7 +116,9 @@ def enroll(course_id):
         course_id=course_id
     )
     db.session.add(enrollment)
+    bump_course_stats(course_id, enrolled_count=1)
     db.session.commit()
+    invalidate('enrollments')
     
     flash(f'Successfully enrolled in {course.title}!', 'success')
     return redirect(url_for('courses.view_course', course_id=course_id))
@@ -108,11 +143,16 @@ def view_module(course_id, module_id):
     # Get all modules in order
     modules = CourseModule.query.filter_by(course_id=course_id).order_by(CourseModule.order).all()
     
+    completed_module_ids = {module_id for (module_id,) in db.session.query(ModuleCompletion.module_id).filter_by(
+        enrollment_id=enrollment.id
+    )}
+    
     return render_template('courses/module.html',
                          course=course,
                          module=module,
                          modules=modules,
-                         enrollment=enrollment)
+                         enrollment=enrollment,
+                         completed_module_ids=completed_module_ids)
 
 @courses_bp.route('/<int:course_id>/module/<int:module_id>/complete', methods=['POST'])
 @login_required
@@ -127,27 +167,48 @@ def complete_module(course_id, module_id):
         if not enrollment:
             return jsonify({'error': 'Not enrolled'}), 403
         
-        course = Course.query.get_or_404(course_id)
-        total_modules = CourseModule.query.filter_by(course_id=course_id).count()
+        module = CourseModule.query.filter_by(id=module_id, course_id=course_id).first()
+        if not module:
+            return jsonify({'error': 'Module not found'}), 404
         
-        # Update progress only once per module
-        if enrollment.modules_completed < total_modules:
-            enrollment.modules_completed += 1
+        total_modules = course_module_count(course_id)
         
-        # Calculate progress percentage
-        enrollment.progress_percentage = (enrollment.modules_completed / total_modules) * 100
+        # Record the module once; repeated or concurrent clicks are no-ops
+        insert_ignore(ModuleCompletion, enrollment_id=enrollment.id, module_id=module_id,
+                      completed_at=datetime.utcnow())
         
-        # Check if course is completed
-        course_completed = False
-        certificate_earned = False
+        # Lock the enrollment row first so concurrent completions for it run one
+        # at a time; the count below then sees every completion committed before it
+        old_progress, was_completed, certificate_earned = db.session.query(
+            CourseEnrollment.progress_percentage,
+            CourseEnrollment.is_completed,
+            CourseEnrollment.certificate_earned
+        ).filter(CourseEnrollment.id == enrollment.id).with_for_update().one()
+        modules_completed = db.session.query(db.func.count(ModuleCompletion.id)).filter(
+            ModuleCompletion.enrollment_id == enrollment.id
+        ).scalar()
         
-        if enrollment.modules_completed >= total_modules:
-            enrollment.is_completed = True
-            enrollment.certificate_earned = True
-            enrollment.completed_at = datetime.utcnow()
-            course_completed = True
+        # Progress is derived from the completion rows, which only ever grow
+        old_progress = old_progress or 0.0
+        progress = min(modules_completed * 100.0 / total_modules, 100.0)
+        just_completed = modules_completed >= total_modules and not was_completed
+        changes = {}
+        if progress != old_progress:
+            changes.update({CourseEnrollment.modules_completed: modules_completed,
+                            CourseEnrollment.progress_percentage: progress})
+        if just_completed:
+            # Only the request that flips is_completed issues the certificate
+            changes.update({CourseEnrollment.is_completed: True,
+                            CourseEnrollment.certificate_earned: True,
+                            CourseEnrollment.completed_at: datetime.utcnow()})
             certificate_earned = True
-            
+        if changes:
+            CourseEnrollment.query.filter_by(id=enrollment.id).update(changes, synchronize_session=False)
+            bump_course_stats(course_id,
+                              progress_total=progress - old_progress,
+                              completed_count=1 if just_completed else 0)
+        
+        if just_completed:
             # Create certificate
             from app.models import Certificate
             import uuid
@@ -165,20 +226,27 @@ def complete_module(course_id, module_id):
                     certificate_code=cert_code
                 )
                 db.session.add(certificate)
+                
+                # Render the PDF in the background so the first download is instant
+                from app.certificates import queue_certificate_render
+                queue_certificate_render(certificate, user_id=current_user.id)
         
         db.session.commit()
+        if just_completed:
+            invalidate('enrollments')
         
+        course_completed = was_completed or just_completed
         message = 'Course Completed! Certificate Generated! 🎉' if course_completed else 'Module marked complete!'
         
         return jsonify({
             'success': True,
-            'progress': enrollment.progress_percentage,
-            'completed': enrollment.is_completed,
+            'progress': progress,
+            'completed': course_completed,
             'certificate_earned': certificate_earned,
             'message': message
         })
     
     except Exception as e:
         db.session.rollback()
-        print(f"Error: {str(e)}")
-        return jsonify({'error': f'Error: {str(e)}'}), 500
\ No newline at end of file
+        logger.exception('Error completing module %s of course %s', module_id, course_id)
+        return jsonify({'error': f'Error: {str(e)}'}), 500
@@ -11,14 +11,14 @@
 # from reportlab.lib.units import inch
 # from reportlab.pdfgen import canvas
 # from flask import send_file
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, current_app
 from flask_login import login_required, current_user
 from app import db
 from app.models import User, CourseEnrollment, Course, MentorshipRequest
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
+from sqlalchemy.orm import joinedload
+from app.certificates import certificate_pdf_path, cache_key, queue_certificate_render
+from app.jobs import serialize_job
+from app.passwords import HashingBusy
 from datetime import datetime
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
@@ -28,14 +28,20 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 def index():
     """User dashboard"""
     # Get enrolled courses
-    enrollments = CourseEnrollment.query.filter_by(student_id=current_user.id).all()
+    enrollments = CourseEnrollment.query.options(
+        joinedload(CourseEnrollment.course)
+    ).filter_by(student_id=current_user.id).all()
     courses = [enrollment.course for enrollment in enrollments]
     
-    # Get mentorship info
+    # Get mentorship info, with the other participant loaded in the same query
     if current_user.role == 'student':
-        mentorships = MentorshipRequest.query.filter_by(student_id=current_user.id).all()
+        mentorships = MentorshipRequest.query.options(
+            joinedload(MentorshipRequest.mentor)
+        ).filter_by(student_id=current_user.id).all()
     else:
-        mentorships = MentorshipRequest.query.filter_by(mentor_id=current_user.id).all()
+        mentorships = MentorshipRequest.query.options(
+            joinedload(MentorshipRequest.requester)
+        ).filter_by(mentor_id=current_user.id).all()
     
     stats = {
         'courses_enrolled': len(enrollments),
@@ -60,11 +66,12 @@ def profile():
 def edit_profile():
     """Edit user profile"""
     if request.method == 'POST':
-        current_user.full_name = request.form.get('full_name')
-        current_user.bio = request.form.get('bio')
+        user = User.query.get(current_user.id)
+        user.full_name = request.form.get('full_name')
+        user.bio = request.form.get('bio')
         
-        if current_user.role == 'mentor':
-            current_user.expertise = request.form.get('expertise')
+        if user.role == 'mentor':
+            user.expertise = request.form.get('expertise')
         
         db.session.commit()
         flash('Profile updated successfully!', 'success')
@@ -85,7 +92,7 @@ def set_theme(theme):
     if theme not in ['light', 'dark']:
         return jsonify({'error': 'Invalid theme'}), 400
     
-    current_user.theme = theme
+    User.query.get(current_user.id).theme = theme
     db.session.commit()
     
     return jsonify({'success': True, 'theme': theme})
@@ -99,15 +106,20 @@ def change_password():
         new_password = request.form.get('new_password')
         confirm_password = request.form.get('confirm_password')
         
-        if not current_user.check_password(old_password):
-            flash('Old password is incorrect.', 'danger')
-            return redirect(url_for('dashboard.change_password'))
-        
-        if new_password != confirm_password:
-            flash('New passwords do not match.', 'danger')
-            return redirect(url_for('dashboard.change_password'))
-        
-        current_user.set_password(new_password)
+        user = User.query.get(current_user.id)
+        try:
+            if not user.check_password(old_password):
+                flash('Old password is incorrect.', 'danger')
+                return redirect(url_for('dashboard.change_password'))
+            
+            if new_password != confirm_password:
+                flash('New passwords do not match.', 'danger')
+                return redirect(url_for('dashboard.change_password'))
+            
+            user.set_password(new_password)
+        except HashingBusy:
+            flash('The server is busy checking passwords. Please try again in a moment.', 'warning')
+            return render_template('dashboard/change_password.html'), 503
         db.session.commit()
         
         flash('Password changed successfully!', 'success')
@@ -121,7 +133,9 @@ def certificates():
     """View earned certificates"""
     from app.models import Certificate
     
-    certificates = Certificate.query.filter_by(student_id=current_user.id).all()
+    certificates = Certificate.query.options(
+        joinedload(Certificate.course)
+    ).filter_by(student_id=current_user.id).all()
     
     return render_template('dashboard/certificates.html', certificates=certificates)
 
@@ -137,85 +151,66 @@ def download_certificate(cert_code):
         flash('Certificate not found.', 'danger')
         return redirect(url_for('dashboard.certificates'))
     
-    # Create PDF in memory
-    pdf_buffer = BytesIO()
-    
-    # Create canvas (letter size, landscape)
-    pdf_canvas = canvas.Canvas(pdf_buffer, pagesize=(11*72, 8.5*72))
-    
-    # Set background color (light gold)
-    pdf_canvas.setFillColor(colors.HexColor('#fef3c7'))
-    pdf_canvas.rect(0, 0, 11*72, 8.5*72, fill=1, stroke=0)
-    
-    # Set border
-    pdf_canvas.setStrokeColor(colors.HexColor('#d4af37'))
-    pdf_canvas.setLineWidth(3)
-    pdf_canvas.rect(20, 20, 11*72-40, 8.5*72-40)
-    
-    # Title
-    pdf_canvas.setFont("Helvetica-Bold", 48)
-    pdf_canvas.setFillColor(colors.HexColor('#92400e'))
-    pdf_canvas.drawCentredString(11*72/2, 7.5*72, "Certificate of Completion")
-    
-    # Subtitle
-    pdf_canvas.setFont("Helvetica", 16)
-    pdf_canvas.setFillColor(colors.HexColor('#b45309'))
-    pdf_canvas.drawCentredString(11*72/2, 7*72, "SmartFarm Training Hub")
-    
-    # "This certifies that"
-    pdf_canvas.setFont("Helvetica", 12)
-    pdf_canvas.setFillColor(colors.HexColor('#78350f'))
-    pdf_canvas.drawCentredString(11*72/2, 5.5*72, "This is to certify that")
-    
-    # Student name
-    pdf_canvas.setFont("Helvetica-Bold", 36)
-    pdf_canvas.setFillColor(colors.HexColor('#92400e'))
-    pdf_canvas.drawCentredString(11*72/2, 4.8*72, current_user.full_name or current_user.username)
-    
-    # "has successfully completed"
-    pdf_canvas.setFont("Helvetica", 12)
-    pdf_canvas.setFillColor(colors.HexColor('#78350f'))
-    pdf_canvas.drawCentredString(11*72/2, 4.2*72, "has successfully completed the course")
-    
-    # Course title
-    pdf_canvas.setFont("Helvetica-Bold", 18)
-    pdf_canvas.setFillColor(colors.HexColor('#b45309'))
-    pdf_canvas.drawCentredString(11*72/2, 3.6*72, cert.course.title)
-    
-    # Course details
-    pdf_canvas.setFont("Helvetica", 10)
-    pdf_canvas.setFillColor(colors.HexColor('#78350f'))
-    pdf_canvas.drawCentredString(11*72/2, 3.2*72, f"Category: {cert.course.category}")
-    pdf_canvas.drawCentredString(11*72/2, 2.9*72, f"Duration: {cert.course.duration_weeks} weeks")
-    pdf_canvas.drawCentredString(11*72/2, 2.6*72, f"Instructor: {cert.course.instructor or 'SmartFarm'}")
-    
-    # Footer
-    pdf_canvas.setFont("Helvetica", 9)
-    pdf_canvas.setFillColor(colors.HexColor('#92400e'))
-    
-    # Left signature
-    pdf_canvas.drawString(0.5*72, 1.2*72, "_________________")
-    pdf_canvas.drawString(0.5*72, 0.8*72, "SmartFarm Director")
-    
-    # Center certificate code
-    pdf_canvas.drawCentredString(11*72/2, 1.2*72, cert_code)
-    pdf_canvas.drawCentredString(11*72/2, 0.8*72, "Certificate Code")
-    
-    # Right date
-    date_str = cert.issued_at.strftime('%b %d, %Y')
-    pdf_canvas.drawRightString(10.5*72, 1.2*72, date_str)
-    pdf_canvas.drawRightString(10.5*72, 0.8*72, "Date Issued")
-    
-    # Save PDF
-    pdf_canvas.save()
-    
-    # Get PDF from buffer
-    pdf_buffer.seek(0)
-    
-    # Return PDF as download
-    return send_file(
-        pdf_buffer,
+    # Rendered once per certificate and template version, then served from disk.
+    # Rendering happens on the job workers unless they are switched off.
+    if current_app.config['JOB_WORKERS'] > 0:
+        job = queue_certificate_render(cert, user_id=current_user.id)
+        if job is not None:
+            db.session.commit()
+            flash('Your certificate is being prepared. Please try again in a moment.', 'info')
+            return redirect(url_for('dashboard.certificates'))
+    path = certificate_pdf_path(cert)
+    
+    response = send_file(
+        path,
         mimetype='application/pdf',
         as_attachment=True,
-        download_name=f'SmartFarm_Certificate_{cert_code}.pdf'
-    )
\ No newline at end of file
+        download_name=f'SmartFarm_Certificate_{cert_code}.pdf',
+        etag=cache_key(cert_code),
+        conditional=True,
+        max_age=current_app.config['CERTIFICATE_MAX_AGE']
+    )
+    # Only the owner may download it, so shared caches must not keep a copy
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+@dashboard_bp.route('/certificate/<cert_code>/prepare', methods=['POST'])
+@login_required
+def prepare_certificate(cert_code):
+    """Make sure a certificate PDF is rendered, queueing it if needed"""
+    from app.models import Certificate
+    
+    cert = Certificate.query.filter_by(certificate_code=cert_code).first()
+    
+    if not cert or cert.student_id != current_user.id:
+        return jsonify({'error': 'Certificate not found'}), 404
+    
+    download_url = url_for('dashboard.download_certificate', cert_code=cert_code)
+    
+    job = None
+    if current_app.config['JOB_WORKERS'] > 0:
+        job = queue_certificate_render(cert, user_id=current_user.id)
+        db.session.commit()
+    
+    if job is None:
+        return jsonify({'ready': True, 'download_url': download_url})
+    
+    return jsonify({
+        'ready': False,
+        'download_url': download_url,
+        'status_url': url_for('dashboard.job_status', job_id=job.id)
+    }), 202
+
+@dashboard_bp.route('/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    """Poll the status of a background job"""
+    from app.models import Job
+    
+    job = Job.query.get_or_404(job_id)
+    
+    if job.user_id != current_user.id and current_user.role != 'admin':
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    return jsonify(serialize_job(job))
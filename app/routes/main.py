@@ -1,26 +1,60 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from flask_login import current_user
 from app.models import Course, User
+from app.cache import cached
+from app.search import search as run_search
 
 main_bp = Blueprint('main', __name__)
 
 @main_bp.route('/')
 def index():
     """Homepage"""
-    featured_courses = Course.query.filter_by(is_published=True).limit(6).all()
-    mentor_count = User.query.filter_by(role='mentor').count()
-    student_count = User.query.filter_by(role='student').count()
-    
-    stats = {
-        'courses': Course.query.filter_by(is_published=True).count(),
-        'students': student_count,
-        'mentors': mentor_count,
-    }
+    featured_courses = cached('main:index:featured', _featured_courses)
+    stats = cached('main:index:stats', _homepage_stats)
     
     return render_template('main/index.html', 
                          featured_courses=featured_courses,
                          stats=stats)
 
+def _featured_courses():
+    """Fields of the homepage course cards, as plain (cacheable) dicts"""
+    courses = Course.query.filter_by(is_published=True).limit(6).all()
+    return [{
+        'id': course.id,
+        'title': course.title,
+        'description': course.description,
+        'level': course.level,
+        'duration_weeks': course.duration_weeks,
+    } for course in courses]
+
+def _homepage_stats():
+    return {
+        'courses': Course.query.filter_by(is_published=True).count(),
+        'students': User.query.filter_by(role='student').count(),
+        'mentors': User.query.filter_by(role='mentor').count(),
+    }
+
+@main_bp.route('/search')
+def search():
+    """Search courses, modules and mentors"""
+    query = request.args.get('q', '').strip()
+    results = run_search(query, limit=20) if query else None
+    
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'query': query,
+            'courses': [{'id': c.id, 'title': c.title, 'url': url_for('courses.view_course', course_id=c.id)}
+                        for c in results['course']] if results else [],
+            'modules': [{'id': m.id, 'title': m.title, 'course_id': m.course_id,
+                         'url': url_for('courses.view_course', course_id=m.course_id)}
+                        for m in results['module']] if results else [],
+            'mentors': [{'id': u.id, 'name': u.full_name or u.username,
+                         'url': url_for('mentorship.view_mentor', mentor_id=u.id)}
+                        for u in results['mentor']] if results else [],
+        })
+    
+    return render_template('main/search.html', query=query, results=results)
+
 @main_bp.route('/about')
 def about():
     """About page"""
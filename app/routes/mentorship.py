@@ -1,23 +1,59 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from app import db
-from app.models import User, MentorshipRequest, Message
+from app.models import User, MentorshipRequest, Message, Conversation
+from sqlalchemy.orm import joinedload
+from app.pubsub import conversation_channel
+from app.search import search_query
+from app.pagination import keyset_page, offset_page
+from app.cache import cached
+from app.unread import unread_total, forget_unread_total, record_unread, mark_read, read_position, unread_by_partner
 from datetime import datetime
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 mentorship_bp = Blueprint('mentorship', __name__, url_prefix='/mentorship')
 
+@mentorship_bp.app_context_processor
+def inject_unread_messages():
+    """Expose the cached unread total to every template (navbar badge)"""
+    if not current_user.is_authenticated:
+        return {'unread_messages_count': 0}
+    return {'unread_messages_count': unread_total(current_user.id)}
+
+def _active_mentor_count():
+    return User.query.filter_by(role='mentor', is_active=True).count()
+
 @mentorship_bp.route('/browse')
 def browse_mentors():
     """Browse available mentors"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     expertise = request.args.get('expertise', None)
+    q = request.args.get('q', '').strip()
     
-    query = User.query.filter_by(role='mentor', is_active=True)
+    # Free text goes through the search index, ranked by relevance
+    ranked = search_query('mentor', q) if q else None
+    query = ranked if ranked is not None else User.query.filter_by(role='mentor', is_active=True)
     
     if expertise:
         query = query.filter(User.expertise.contains(expertise))
     
-    mentors = query.paginate(page=page, per_page=12)
+    if ranked is not None:
+        mentors = offset_page(query, cursor, per_page=12)
+    else:
+        total = None if expertise else cached('mentorship:browse:count', _active_mentor_count)
+        mentors = keyset_page(query, [(User.id, False)], cursor, per_page=12, total=total)
+    
+    if request.args.get('format') == 'json':
+        return jsonify(mentors.as_dict(lambda mentor: {
+            'id': mentor.id,
+            'name': mentor.full_name or mentor.username,
+            'expertise': mentor.expertise,
+            'url': url_for('mentorship.view_mentor', mentor_id=mentor.id),
+        }))
     
     # Get unique expertise areas
     all_expertise = db.session.query(User.expertise).filter(User.role == 'mentor').distinct().all()
@@ -26,7 +62,8 @@ def browse_mentors():
     return render_template('mentorship/browse.html',
                          mentors=mentors,
                          expertise_list=expertise_list,
-                         selected_expertise=expertise)
+                         selected_expertise=expertise,
+                         q=q)
 
 @mentorship_bp.route('/<int:mentor_id>')
 def view_mentor(mentor_id):
@@ -87,16 +124,20 @@ def request_mentorship(mentor_id):
 def my_requests():
     """View my mentorship requests (for students) or received requests (for mentors)"""
     if current_user.role == 'student':
-        requests = MentorshipRequest.query.filter_by(student_id=current_user.id).all()
+        requests = MentorshipRequest.query.options(
+            joinedload(MentorshipRequest.mentor)
+        ).filter_by(student_id=current_user.id).all()
         template = 'mentorship/my_requests.html'
     elif current_user.role == 'mentor':
-        requests = MentorshipRequest.query.filter_by(mentor_id=current_user.id).all()
+        requests = MentorshipRequest.query.options(
+            joinedload(MentorshipRequest.requester)
+        ).filter_by(mentor_id=current_user.id).all()
         template = 'mentorship/received_requests.html'
     else:
         flash('Access denied.', 'danger')
         return redirect(url_for('main.index'))
     
-    return render_template(template, requests=requests)
+    return render_template(template, requests=requests, unread_by_user=unread_by_partner(current_user.id))
 
 @mentorship_bp.route('/request/<int:request_id>/respond', methods=['POST'])
 @login_required
@@ -121,6 +162,49 @@ def respond_to_request(request_id):
     
     return redirect(url_for('mentorship.my_requests'))
 
+def _has_accepted_mentorship(user_id, other_id):
+    """Check whether two users share an accepted mentorship"""
+    return MentorshipRequest.query.filter(
+        (
+            (MentorshipRequest.student_id == user_id) & 
+            (MentorshipRequest.mentor_id == other_id)
+        ) |
+        (
+            (MentorshipRequest.student_id == other_id) & 
+            (MentorshipRequest.mentor_id == user_id)
+        ),
+        MentorshipRequest.status == 'accepted'
+    ).first() is not None
+
+def _history_page(conversation, before_id, limit):
+    """Up to limit messages older than before_id, returned oldest first.
+
+    Seeks on (conversation_id, id) instead of using OFFSET, so every page
+    costs one index range scan no matter how long the conversation is.
+    """
+    if conversation is None:
+        return [], False
+    
+    query = Message.query.filter_by(conversation_id=conversation.id)
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    
+    # Fetch one extra row to learn whether an older page exists
+    rows = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    messages = rows[:limit]
+    messages.reverse()
+    return messages, has_more
+
+def _serialize_message(message):
+    """JSON payload for a chat message"""
+    return {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'created_at': message.created_at.strftime('%I:%M %p')
+    }
+
 @mentorship_bp.route('/chat/<int:user_id>')
 @login_required
 def chat(user_id):
@@ -128,42 +212,150 @@ def chat(user_id):
     other_user = User.query.get_or_404(user_id)
     
     # Check if mentorship is accepted
-    mentorship = MentorshipRequest.query.filter(
-        (
-            (MentorshipRequest.student_id == current_user.id) & 
-            (MentorshipRequest.mentor_id == user_id)
-        ) |
-        (
-            (MentorshipRequest.student_id == user_id) & 
-            (MentorshipRequest.mentor_id == current_user.id)
-        ),
-        MentorshipRequest.status == 'accepted'
-    ).first()
-    
-    if not mentorship:
+    if not _has_accepted_mentorship(current_user.id, user_id):
         flash('You must have an accepted mentorship to chat.', 'warning')
         return redirect(url_for('mentorship.browse_mentors'))
     
-    # Get conversation history (all messages between these two users)
-    messages = Message.query.filter(
-        (
-            (Message.sender_id == current_user.id) & 
-            (Message.recipient_id == user_id)
-        ) |
-        (
-            (Message.sender_id == user_id) & 
-            (Message.recipient_id == current_user.id)
-        )
-    ).order_by(Message.created_at).all()
+    # Only the newest page is rendered, older messages are fetched from chat_history
+    conversation = Conversation.between(current_user.id, user_id)
+    messages, has_more = _history_page(conversation, None, current_app.config['CHAT_PAGE_SIZE'])
+    
+    # Read receipt: how far the other participant has read
+    read_up_to = read_position(conversation.id, user_id) if conversation else 0
     
-    print(f"Chat between {current_user.id} and {user_id}")
-    print(f"Found {len(messages)} messages")
+    logger.debug('Chat between %s and %s: %s messages', current_user.id, user_id, len(messages))
     
     return render_template('mentorship/chat.html',
                          mentor=other_user,
                          messages=messages,
+                         has_more=has_more,
+                         read_up_to=read_up_to,
                          current_user_id=current_user.id)
 
+@mentorship_bp.route('/chat/<int:user_id>/history')
+@login_required
+def chat_history(user_id):
+    """Page backwards through a conversation, newest first"""
+    if not _has_accepted_mentorship(current_user.id, user_id):
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    before_id = request.args.get('before', None, type=int)
+    limit = request.args.get('limit', current_app.config['CHAT_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['CHAT_MAX_PAGE_SIZE']))
+    
+    conversation = Conversation.between(current_user.id, user_id)
+    messages, has_more = _history_page(conversation, before_id, limit)
+    
+    return jsonify({
+        'messages': [_serialize_message(m) for m in messages],
+        'read_up_to': read_position(conversation.id, user_id) if conversation else 0,
+        'has_more': has_more,
+        # Pass back as ?before= to fetch the next older page
+        'next_cursor': messages[0].id if messages and has_more else None
+    })
+
+@mentorship_bp.route('/chat/<int:user_id>/stream')
+@login_required
+def chat_stream(user_id):
+    """Stream messages newer than a cursor as Server-Sent Events"""
+    if not _has_accepted_mentorship(current_user.id, user_id):
+        return jsonify({'error': 'Not authorized'}), 403
+    
+    # EventSource resends the last delivered id when it reconnects
+    after_id = request.headers.get('Last-Event-ID', type=int) or request.args.get('after', 0, type=int)
+    
+    broker = current_app.extensions['chat_broker']
+    channel = conversation_channel(current_user.id, user_id)
+    own_id = current_user.id
+    duration = current_app.config['CHAT_STREAM_DURATION']
+    poll_interval = current_app.config['CHAT_POLL_INTERVAL']
+    # Each open stream holds a request thread; past the per-worker limit the
+    # client gets one pass and reconnects later, i.e. a slow long-poll
+    slots = current_app.extensions['chat_streams']
+    streaming = slots.acquire(blocking=False)
+    retry = 1000 if streaming else current_app.config['CHAT_BUSY_RETRY'] * 1000
+    
+    def events():
+        state = {'cursor': after_id, 'conversation_id': None, 'read_up_to': None}
+        deadline = time.monotonic() + duration
+        # Read the version before querying so a publish in between is not missed
+        version = broker.version(channel)
+        yield f'retry: {retry}\n\n'
+        
+        while True:
+            chunks = _stream_pass(own_id, user_id, state)
+            # Give the connection back, ending the read transaction, before
+            # writing to the client or waiting: an idle stream holds neither
+            # a pooled connection nor a WAL snapshot
+            db.session.remove()
+            yield from chunks
+            
+            remaining = deadline - time.monotonic()
+            if not streaming or remaining <= 0:
+                break
+            # Woken early by send_message in this worker, otherwise re-check on timeout
+            version = broker.wait(channel, version, min(poll_interval, remaining))
+    
+    response = Response(stream_with_context(events()),
+                        mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    if streaming:
+        # Runs when the server closes the response, even if it never started iterating
+        response.call_on_close(slots.release)
+    return response
+
+def _stream_pass(own_id, user_id, state):
+    """SSE chunks for messages after state['cursor'] and any new read receipt"""
+    if state['conversation_id'] is None:
+        # The conversation row appears with the first message
+        conversation = Conversation.between(own_id, user_id)
+        state['conversation_id'] = conversation.id if conversation else None
+    conversation_id = state['conversation_id']
+    
+    messages = []
+    if conversation_id is not None:
+        messages = Message.query.filter(
+            Message.conversation_id == conversation_id,
+            Message.id > state['cursor']
+        ).order_by(Message.id).all()
+    
+    chunks = []
+    for message in messages:
+        state['cursor'] = message.id
+        chunks.append(f'id: {message.id}\ndata: {json.dumps(_serialize_message(message))}\n\n')
+    
+    # Read receipts for messages the other participant has seen
+    position = read_position(conversation_id, user_id) if conversation_id else 0
+    if position != state['read_up_to']:
+        state['read_up_to'] = position
+        chunks.append(f'event: read\ndata: {json.dumps({"read_up_to": position})}\n\n')
+    elif not messages:
+        chunks.append(': keep-alive\n\n')
+    return chunks
+
+@mentorship_bp.route('/chat/<int:user_id>/read', methods=['POST'])
+@login_required
+def mark_chat_read(user_id):
+    """Mark messages from user_id as read, up to an optional message id"""
+    conversation = Conversation.between(current_user.id, user_id)
+    if conversation is None:
+        return jsonify({'success': True, 'marked': 0, 'unread_total': unread_total(current_user.id)})
+    
+    up_to_id = request.form.get('up_to', type=int)
+    if up_to_id is None:
+        up_to_id = db.session.query(db.func.max(Message.id)).filter(
+            Message.conversation_id == conversation.id
+        ).scalar() or 0
+    
+    marked = mark_read(conversation.id, current_user.id, up_to_id)
+    db.session.commit()
+    
+    forget_unread_total(current_user.id)
+    # Let the sender's open chat update its read receipts
+    current_app.extensions['chat_broker'].publish(conversation_channel(current_user.id, user_id))
+    
+    return jsonify({'success': True, 'marked': marked, 'unread_total': unread_total(current_user.id)})
+
 @mentorship_bp.route('/message/<int:recipient_id>', methods=['POST'])
 @login_required
 def send_message(recipient_id):
@@ -175,30 +367,35 @@ def send_message(recipient_id):
         if not content:
             return jsonify({'error': 'Message cannot be empty'}), 400
         
+        conversation = Conversation.between(current_user.id, recipient_id, create=True)
+        
         # Create message
         message = Message(
+            conversation_id=conversation.id,
             sender_id=current_user.id,
             recipient_id=recipient_id,
             content=content
         )
         
         db.session.add(message)
+        db.session.flush()
+        record_unread(message)
         db.session.commit()
         
-        print(f"Message saved: From {current_user.id} to {recipient_id}: {content}")
+        forget_unread_total(recipient_id)
+        # Wake any listeners streaming this conversation
+        current_app.extensions['chat_broker'].publish(conversation_channel(current_user.id, recipient_id))
+        
+        logger.debug('Message %s saved: from %s to %s', message.id, current_user.id, recipient_id)
         
+        payload = _serialize_message(message)
+        payload['sender'] = current_user.username
         return jsonify({
             'success': True,
-            'message': {
-                'id': message.id,
-                'sender': current_user.username,
-                'sender_id': current_user.id,
-                'content': content,
-                'created_at': message.created_at.strftime('%I:%M %p')
-            }
+            'message': payload
         })
     
     except Exception as e:
         db.session.rollback()
-        print(f"Error sending message: {str(e)}")
+        logger.exception('Error sending message from %s to %s', current_user.id, recipient_id)
         return jsonify({'error': f'Error: {str(e)}'}), 500
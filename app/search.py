@@ -0,0 +1,203 @@
+"""Full-text search over courses, modules and mentors.
+
+On SQLite each kind of record has an FTS5 table whose rowid is the source
+row's id, so results join straight back to it. Rows are kept in step by a
+session hook: whenever a flush inserts, changes or deletes a Course,
+CourseModule or User, the matching index row is rewritten in the same
+transaction. The tables are created, and existing data indexed, by a schema
+migration; ``flask rebuild-search-index`` re-indexes from scratch.
+
+Queries match every word, the last one as a prefix ("irrig" finds
+"irrigation"), and are ranked with BM25 with title hits weighted above body
+hits. Other databases fall back to LIKE matching.
+"""
+import re
+from sqlalchemy import event, inspect, or_, text
+from app import db
+from app.models import Course, CourseModule, User
+
+# kind -> (FTS table, source model)
+INDEXES = {
+    'course': ('course_search', Course),
+    'module': ('module_search', CourseModule),
+    'mentor': ('mentor_search', User),
+}
+
+# Attributes whose changes need the index row rewritten
+INDEXED_ATTRIBUTES = {
+    Course: ('title', 'description', 'category', 'instructor'),
+    CourseModule: ('title', 'description', 'content'),
+    User: ('username', 'full_name', 'expertise', 'bio', 'role'),
+}
+
+TITLE_WEIGHT = 10.0
+BODY_WEIGHT = 1.0
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _document(obj):
+    """(kind, title, body) indexed for obj, or (kind, None, None) if it should not be indexed"""
+    if isinstance(obj, Course):
+        return 'course', obj.title, ' '.join(filter(None, [obj.description, obj.category, obj.instructor]))
+    if isinstance(obj, CourseModule):
+        return 'module', obj.title, ' '.join(filter(None, [obj.description, obj.content]))
+    if obj.role != 'mentor':
+        return 'mentor', None, None
+    return 'mentor', obj.full_name or obj.username, ' '.join(filter(None, [obj.expertise, obj.bio]))
+
+
+def fts_available(engine=None):
+    """Whether the database supports the FTS5 index"""
+    return (engine or db.engine).dialect.name == 'sqlite'
+
+
+def create_search_tables(connection):
+    """Create the FTS5 tables if they do not exist"""
+    for table, _model in INDEXES.values():
+        # Prefix indexes make 2- and 3-letter prefix queries cheap
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"title, body, tokenize='porter unicode61', prefix='2 3')"
+        ))
+
+
+def _write(connection, kind, obj_id, title, body):
+    table = INDEXES[kind][0]
+    connection.execute(text(f'DELETE FROM {table} WHERE rowid = :id'), {'id': obj_id})
+    if title is not None:
+        connection.execute(
+            text(f'INSERT INTO {table} (rowid, title, body) VALUES (:id, :title, :body)'),
+            {'id': obj_id, 'title': title, 'body': body}
+        )
+
+
+def _indexed_changes(obj):
+    state = inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in INDEXED_ATTRIBUTES[type(obj)])
+
+
+def _after_flush(session, flush_context):
+    connection = session.connection()
+    if not fts_available(connection.engine):
+        return
+
+    for obj in session.new:
+        if type(obj) in INDEXED_ATTRIBUTES:
+            kind, title, body = _document(obj)
+            _write(connection, kind, obj.id, title, body)
+    for obj in session.dirty:
+        if type(obj) in INDEXED_ATTRIBUTES and _indexed_changes(obj):
+            kind, title, body = _document(obj)
+            _write(connection, kind, obj.id, title, body)
+    for obj in session.deleted:
+        if type(obj) in INDEXED_ATTRIBUTES:
+            kind = _document(obj)[0]
+            _write(connection, kind, obj.id, None, None)
+
+
+def index_inserted(rows):
+    """Index rows inserted without the ORM (a bulk import), in the current transaction.
+
+    Each row carries the attributes _document reads, e.g. a SimpleNamespace
+    of the inserted values plus the new id.
+    """
+    connection = db.session.connection()
+    if not fts_available(connection.engine):
+        return
+    for row in rows:
+        kind, title, body = _document(row)
+        if title is not None:
+            _write(connection, kind, row.id, title, body)
+
+
+def init_search(app):
+    """Keep the index tables up to date on writes"""
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+
+
+def rebuild_search_index():
+    """Re-index every course, module and mentor; returns the number of rows indexed"""
+    connection = db.session.connection()
+    create_search_tables(connection)
+    indexed = 0
+    for kind, (table, model) in INDEXES.items():
+        connection.execute(text(f'DELETE FROM {table}'))
+        query = model.query
+        if model is User:
+            query = query.filter(User.role == 'mentor')
+        for obj in query.yield_per(1000):
+            _kind, title, body = _document(obj)
+            connection.execute(
+                text(f'INSERT INTO {table} (rowid, title, body) VALUES (:id, :title, :body)'),
+                {'id': obj.id, 'title': title, 'body': body}
+            )
+            indexed += 1
+    db.session.commit()
+    return indexed
+
+
+def match_expression(query):
+    """FTS5 MATCH string for free text: every word must match, the last as a prefix.
+
+    Returns None when the text has no searchable words.
+    """
+    words = _WORD.findall(query.lower())
+    if not words:
+        return None
+    # Quoting each word keeps FTS5 operators (AND, NEAR, -, ...) from being interpreted
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _visible(kind, query):
+    if kind == 'course':
+        return query.filter(Course.is_published.is_(True))
+    if kind == 'module':
+        return query.join(Course, Course.id == CourseModule.course_id).filter(Course.is_published.is_(True))
+    return query.filter(User.role == 'mentor', User.is_active.is_(True))
+
+
+def search_query(kind, query):
+    """Query for visible records of kind matching query, best match first.
+
+    Returns a SQLAlchemy query of model instances, or None if query has no
+    searchable words.
+    """
+    if match_expression(query) is None:
+        return None
+    if fts_available():
+        return fts_query(kind, query)
+    return like_query(kind, query)
+
+
+def fts_query(kind, query):
+    """search_query through the FTS5 index, ranked by BM25"""
+    table, model = INDEXES[kind]
+    index = db.table(table, db.column('rowid'))
+    rank = db.func.bm25(db.literal_column(table), TITLE_WEIGHT, BODY_WEIGHT)
+    matches = db.session.query(
+        index.c.rowid.label('id'), rank.label('rank')
+    ).select_from(index).filter(db.literal_column(table).op('MATCH')(match_expression(query))).subquery()
+    return _visible(kind, model.query.join(matches, matches.c.id == model.id)).order_by(matches.c.rank, model.id)
+
+
+def like_query(kind, query):
+    """Portable search_query: every word must appear in one of the indexed columns"""
+    model = INDEXES[kind][1]
+    columns = [getattr(model, name) for name in INDEXED_ATTRIBUTES[model] if name != 'role']
+    result = model.query
+    for word in _WORD.findall(query.lower()):
+        result = result.filter(or_(*[column.ilike(f'%{word}%') for column in columns]))
+    return _visible(kind, result).order_by(model.id)
+
+
+def search(query, kinds=('course', 'module', 'mentor'), limit=10):
+    """Top matches per kind: {'course': [Course, ...], 'module': [...], 'mentor': [...]}"""
+    results = {}
+    for kind in kinds:
+        matches = search_query(kind, query)
+        results[kind] = matches.limit(limit).all() if matches is not None else []
+    return results
@@ -0,0 +1,12 @@
+/** Tailwind v3 config for the prebuilt bundle (flask build-assets) */
+module.exports = {
+  darkMode: 'class',
+  content: {
+    relative: true,
+    files: ['../templates/**/*.html'],
+  },
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+}
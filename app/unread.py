@@ -0,0 +1,84 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import case, func
+from app import db
+from app.models import Conversation, ConversationMember, Message, insert_ignore
+
+# user_id -> (expires_at, total); per worker, so other workers catch up within the TTL
+_totals = {}
+_totals_lock = threading.Lock()
+
+def unread_total(user_id):
+    """Total unread messages for a user, cached for UNREAD_CACHE_TTL seconds"""
+    now = time.monotonic()
+    with _totals_lock:
+        cached = _totals.get(user_id)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = db.session.query(
+        func.coalesce(func.sum(ConversationMember.unread_count), 0)
+    ).filter(ConversationMember.user_id == user_id).scalar()
+
+    with _totals_lock:
+        _totals[user_id] = (now + current_app.config['UNREAD_CACHE_TTL'], total)
+    return total
+
+def forget_unread_total(user_id):
+    """Drop the cached total so the next page render re-reads it"""
+    with _totals_lock:
+        _totals.pop(user_id, None)
+
+def _member_query(conversation_id, user_id):
+    # Members are created lazily, on the first message or read in a conversation
+    insert_ignore(ConversationMember, conversation_id=conversation_id, user_id=user_id, unread_count=0)
+    return ConversationMember.query.filter_by(conversation_id=conversation_id, user_id=user_id)
+
+def record_unread(message):
+    """Count a newly added message against its recipient"""
+    _member_query(message.conversation_id, message.recipient_id).update(
+        {ConversationMember.unread_count: ConversationMember.unread_count + 1},
+        synchronize_session=False
+    )
+
+def mark_read(conversation_id, user_id, up_to_id):
+    """Mark a user's messages up to up_to_id as read.
+
+    Flips is_read with one UPDATE and subtracts the number of rows it touched
+    from the counter, so a message arriving concurrently stays counted.
+    Returns the number of messages marked.
+    """
+    marked = Message.query.filter(
+        Message.conversation_id == conversation_id,
+        Message.recipient_id == user_id,
+        Message.is_read.is_(False),
+        Message.id <= up_to_id
+    ).update({Message.is_read: True}, synchronize_session=False)
+
+    unread = ConversationMember.unread_count
+    last_read = ConversationMember.last_read_message_id
+    _member_query(conversation_id, user_id).update({
+        unread: case((unread > marked, unread - marked), else_=0),
+        last_read: case((func.coalesce(last_read, 0) < up_to_id, up_to_id), else_=last_read),
+    }, synchronize_session=False)
+    return marked
+
+def read_position(conversation_id, user_id):
+    """Highest message id user_id has read in the conversation, or 0"""
+    last_read = db.session.query(ConversationMember.last_read_message_id).filter_by(
+        conversation_id=conversation_id, user_id=user_id
+    ).scalar()
+    return last_read or 0
+
+def unread_by_partner(user_id):
+    """Map of other participant id -> unread count for a user's conversations"""
+    rows = db.session.query(
+        Conversation.user_low_id, Conversation.user_high_id, ConversationMember.unread_count
+    ).join(
+        ConversationMember, ConversationMember.conversation_id == Conversation.id
+    ).filter(
+        ConversationMember.user_id == user_id,
+        ConversationMember.unread_count > 0
+    ).all()
+    return {(high if low == user_id else low): count for low, high, count in rows}
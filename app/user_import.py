@@ -0,0 +1,271 @@
+"""Bulk import of users and their course enrollments.
+
+Admins upload a CSV file (with a header row) or a JSON Lines file with one
+user per row, e.g. for a whole cooperative or school:
+
+    username,email,password,full_name,role,expertise,courses
+    wanjiru,wanjiru@coop.example,Shamba2024,Wanjiru Kamau,student,,3;7
+
+``role`` is student (the default) or mentor, and ``courses`` lists course
+ids to enroll the user in, separated by ``;`` (a list in JSON Lines).
+
+The file is read as a stream and handled ``IMPORT_BATCH_SIZE`` rows at a
+time. Each batch is validated, checked for usernames and emails already
+taken (earlier in the file, or in the database with one IN query per batch),
+its passwords are hashed on a process pool, and users and enrollments are
+written with executemany inserts in one transaction. A bad row never stops
+the import: it goes into a CSV error report with its line number and the
+reason.
+
+Passwords are hashed with ``IMPORT_PASSWORD_HASH_METHOD``, which is cheaper
+than the login policy by default so large files finish in minutes.
+``User.check_password`` upgrades each hash when its owner first logs in.
+"""
+import csv
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from itertools import repeat
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from app import db
+from app.cache import invalidate
+from app.course_stats import bump_course_stats
+from app.jobs import job_handler, keep_alive
+from app.models import Course, CourseEnrollment, User
+from app.passwords import get_hasher
+from app.processes import process_pool
+from app.search import index_inserted
+
+FORMATS = ('csv', 'jsonl')
+ROLES = ('student', 'mentor')
+REQUIRED = ('username', 'email', 'password')
+REPORT_FIELDS = ('line', 'username', 'email', 'error')
+
+# Column lengths from the User model
+MAX_LENGTHS = {'username': 80, 'email': 120, 'full_name': 120, 'expertise': 255}
+
+
+def import_dir():
+    """Directory holding uploaded files and error reports"""
+    return current_app.config['IMPORT_DIR'] or os.path.join(current_app.instance_path, 'imports')
+
+
+def report_path(upload_path):
+    return os.path.splitext(upload_path)[0] + '.errors.csv'
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, row dict, error) for each record in a text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = [name for name in REQUIRED if name not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f'CSV header is missing {", ".join(missing)}')
+        for row in reader:
+            yield reader.line_num, row, None
+    elif fmt == 'jsonl':
+        for line, text in enumerate(stream, 1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                yield line, {}, f'Invalid JSON: {e}'
+                continue
+            if isinstance(row, dict):
+                yield line, row, None
+            else:
+                yield line, {}, 'Expected a JSON object'
+    else:
+        raise ValueError(f'Unsupported format {fmt!r}; expected one of {", ".join(FORMATS)}')
+
+
+def clean_row(row, course_ids):
+    """Validated values of a row; raises ValueError with the reason"""
+    values = {name: str(row.get(name) or '').strip() for name in ('username', 'email', 'full_name', 'expertise')}
+    values['password'] = str(row.get('password') or '')
+    values['role'] = str(row.get('role') or 'student').strip().lower()
+
+    missing = [name for name in REQUIRED if not values[name]]
+    if missing:
+        raise ValueError(f'Missing {", ".join(missing)}')
+    for name, length in MAX_LENGTHS.items():
+        if len(values[name]) > length:
+            raise ValueError(f'{name} is longer than {length} characters')
+    if '@' not in values['email']:
+        raise ValueError('Invalid email address')
+    if values['role'] not in ROLES:
+        raise ValueError(f'Role must be one of {", ".join(ROLES)}')
+
+    courses = row.get('courses') or []
+    if isinstance(courses, str):
+        courses = [course for course in courses.split(';') if course.strip()]
+    try:
+        values['courses'] = sorted({int(course) for course in courses})
+    except (TypeError, ValueError):
+        raise ValueError('courses must be course ids')
+    unknown = [course for course in values['courses'] if course not in course_ids]
+    if unknown:
+        raise ValueError(f'Unknown course ids: {", ".join(map(str, unknown))}')
+
+    values['full_name'] = values['full_name'] or None
+    values['expertise'] = values['expertise'] or None
+    return values
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _Import:
+    """State of one import run"""
+
+    def __init__(self, report, pool, hash_method, salt_length):
+        self.report = csv.writer(report)
+        self.report.writerow(REPORT_FIELDS)
+        self.pool = pool
+        self.hash_method = hash_method
+        self.salt_length = salt_length
+        self.course_ids = {course_id for (course_id,) in db.session.query(Course.id)}
+        self.usernames = set()
+        self.emails = set()
+        self.totals = {'rows': 0, 'created': 0, 'enrollments': 0, 'failed': 0}
+        self.failures = []
+
+    def fail(self, line, row, error):
+        self.failures.append((line, row.get('username', ''), row.get('email', ''), error))
+        self.totals['failed'] += 1
+
+    def run_batch(self, batch):
+        try:
+            self._run_batch(batch)
+        finally:
+            # Rows fail at different stages; report them in file order
+            self.report.writerows(sorted(self.failures))
+            self.failures.clear()
+
+    def _run_batch(self, batch):
+        valid = []
+        for line, row, error in batch:
+            self.totals['rows'] += 1
+            if error is None:
+                try:
+                    valid.append((line, clean_row(row, self.course_ids)))
+                    continue
+                except ValueError as e:
+                    error = str(e)
+            self.fail(line, row, error)
+
+        valid = self._unclaimed(valid) if valid else []
+        if not valid:
+            return
+        passwords = [values['password'] for _line, values in valid]
+        hashes = self.pool.map(generate_password_hash, passwords, repeat(self.hash_method), repeat(self.salt_length),
+                               chunksize=max(1, len(passwords) // 32))
+        self._write(valid, list(hashes))
+
+    def _unclaimed(self, valid):
+        """Rows whose username and email are not taken yet, claiming them for this import"""
+        usernames = [values['username'] for _line, values in valid]
+        emails = [values['email'] for _line, values in valid]
+        taken_usernames = {name for (name,) in db.session.query(User.username).filter(User.username.in_(usernames))}
+        taken_emails = {email for (email,) in db.session.query(User.email).filter(User.email.in_(emails))}
+
+        unclaimed = []
+        for line, values in valid:
+            if values['username'] in self.usernames or values['username'] in taken_usernames:
+                self.fail(line, values, 'Username already exists')
+            elif values['email'] in self.emails or values['email'] in taken_emails:
+                self.fail(line, values, 'Email already registered')
+            else:
+                self.usernames.add(values['username'])
+                self.emails.add(values['email'])
+                unclaimed.append((line, values))
+        return unclaimed
+
+    def _write(self, valid, hashes):
+        """Insert a batch of users and their enrollments in one transaction"""
+        now = datetime.utcnow()
+        users = [
+            {
+                'username': values['username'], 'email': values['email'], 'password_hash': password_hash,
+                'full_name': values['full_name'], 'role': values['role'], 'expertise': values['expertise'],
+                'created_at': now,
+            }
+            for (_line, values), password_hash in zip(valid, hashes)
+        ]
+        try:
+            db.session.execute(User.__table__.insert(), users)
+            ids = dict(db.session.query(User.username, User.id).filter(User.username.in_([u['username'] for u in users])))
+            enrollments = [
+                {'student_id': ids[values['username']], 'course_id': course_id, 'enrolled_at': now}
+                for _line, values in valid for course_id in values['courses']
+            ]
+            if enrollments:
+                db.session.execute(CourseEnrollment.__table__.insert(), enrollments)
+                for course_id, count in Counter(e['course_id'] for e in enrollments).items():
+                    bump_course_stats(course_id, enrolled_count=count)
+            index_inserted(SimpleNamespace(id=ids[u['username']], bio=None, **u) for u in users if u['role'] == 'mentor')
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            if len(valid) == 1:
+                # Taken by someone else between the check and the insert
+                self.fail(valid[0][0], valid[0][1], 'Username or email already exists')
+                return
+            for item, password_hash in zip(valid, hashes):
+                self._write([item], [password_hash])
+            return
+
+        self.totals['created'] += len(users)
+        self.totals['enrollments'] += len(enrollments)
+
+
+def import_users(stream, fmt, report, processes=None, batch_size=None, progress=None):
+    """Import users from a CSV or JSONL text stream, writing failed rows to report.
+
+    progress, if given, is called with the running totals after each batch.
+    Returns the totals: rows, created, enrollments, failed.
+    """
+    config = current_app.config
+    processes = processes or config['IMPORT_HASH_PROCESSES']
+    batch_size = batch_size or config['IMPORT_BATCH_SIZE']
+    hash_method = config['IMPORT_PASSWORD_HASH_METHOD'] or get_hasher().method
+
+    with process_pool(processes) as pool:
+        run = _Import(report, pool, hash_method, config['PASSWORD_SALT_LENGTH'])
+        try:
+            for batch in _batches(read_rows(stream, fmt), batch_size):
+                run.run_batch(batch)
+                if progress:
+                    progress(run.totals)
+        finally:
+            if run.totals['created']:
+                invalidate('users', 'enrollments')
+    return run.totals
+
+
+@job_handler('import_users')
+def import_users_job(payload):
+    """Job: import an uploaded file, leaving an error report next to it"""
+    path = payload['path']
+    def progress(totals):
+        keep_alive(totals)
+        db.session.commit()
+
+    with open(path, encoding='utf-8-sig', newline='') as source, \
+            open(report_path(path), 'w', encoding='utf-8', newline='') as report:
+        totals = import_users(source, payload['format'], report, progress=progress)
+    os.remove(path)
+    return totals
@@ -0,0 +1,77 @@
+"""Throughput of the admin certificate ZIP export.
+
+Issues N certificates, then streams /admin/certificates/export with a cold
+cache (every PDF rendered) and a warm cache (every PDF read from disk), for
+one process and for the configured process pool.
+
+    python -m benchmarks.certificate_export [--count 500] [--processes 4]
+"""
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+from benchmarks.common import make_app, create_user, login, print_table
+
+
+def stream_export(client, processes, app):
+    """Stream the export without keeping it in memory; return (seconds, bytes)"""
+    app.config['CERTIFICATE_EXPORT_PROCESSES'] = processes
+    start = time.perf_counter()
+    response = client.get('/admin/certificates/export', buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return time.perf_counter() - start, size
+
+
+def clear_cache(directory):
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            os.remove(os.path.join(root, name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=500)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix='smartfarm-bench-certs-')
+    app = make_app(CERTIFICATE_CACHE_DIR=cache_dir)
+
+    from app import db
+    from app.models import Course, Certificate
+
+    with app.app_context():
+        create_user('bench_admin', role='admin')
+        students = [create_user(f'bench_student_{i}') for i in range(50)]
+        course = Course(title='Bench Course', description='Benchmark course', category='Crop Farming',
+                        is_published=True)
+        db.session.add(course)
+        db.session.commit()
+        rows = [{
+            'student_id': students[i % len(students)].id,
+            'course_id': course.id,
+            'certificate_code': f'SF-BENCH{i:06d}',
+        } for i in range(args.count)]
+        db.session.execute(Certificate.__table__.insert(), rows)
+        db.session.commit()
+
+    client = login(app, 'bench_admin')
+
+    results = []
+    for processes in sorted({1, args.processes}):
+        clear_cache(cache_dir)
+        cold, size = stream_export(client, processes, app)
+        warm, _ = stream_export(client, processes, app)
+        results.append((processes, f'{args.count / cold:.1f}', f'{args.count / warm:.1f}',
+                        f'{size / 1024 / 1024:.1f}'))
+
+    print_table(('processes', 'cold certs/s', 'warm certs/s', 'zip MB'), results)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'Peak RSS of the web process: {peak:.0f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Chat history latency as a conversation grows.
+
+Grows a single mentor/student thread from 100 to 100k messages and times the
+first chat page, the newest history page and a page from the middle of the
+thread. With seek pagination the numbers should stay roughly flat.
+
+Before timing anything it checks the SQLite query plans of the hot chat
+queries and exits non-zero if one of them scans the messages table.
+
+    python -m benchmarks.chat_history [--sizes 100,1000,10000,100000]
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, create_user, login, time_calls, print_table
+
+
+def add_messages(db, Message, conversation_id, sender_id, recipient_id, start, count):
+    """Bulk insert count alternating messages into a conversation"""
+    base = datetime(2024, 1, 1)
+    rows = []
+    for i in range(start, start + count):
+        outgoing = i % 2 == 0
+        rows.append({
+            'conversation_id': conversation_id,
+            'sender_id': sender_id if outgoing else recipient_id,
+            'recipient_id': recipient_id if outgoing else sender_id,
+            'content': f'Message {i} about planting and soil preparation',
+            'is_read': False,
+            'created_at': base + timedelta(seconds=i),
+        })
+        if len(rows) == 5000:
+            db.session.execute(Message.__table__.insert(), rows)
+            rows = []
+    if rows:
+        db.session.execute(Message.__table__.insert(), rows)
+    db.session.commit()
+
+
+def check_query_plans(db, Message, conversation_id, recipient_id):
+    """Return the hot chat queries whose plan is not an index range scan"""
+    queries = {
+        'history page': Message.query.filter(
+            Message.conversation_id == conversation_id, Message.id < 1000
+        ).order_by(Message.id.desc()).limit(51),
+        'stream poll': Message.query.filter(
+            Message.conversation_id == conversation_id, Message.id > 1000
+        ).order_by(Message.id),
+        'unread lookup': Message.query.filter(
+            Message.recipient_id == recipient_id, Message.is_read.is_(False)
+        ),
+    }
+
+    failures = []
+    for name, query in queries.items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = ' | '.join(row[-1] for row in db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')))
+        print(f'{name:>14}: {plan}')
+        if 'SCAN messages' in plan or 'TEMP B-TREE' in plan:
+            failures.append(name)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',')]
+
+    app = make_app()
+    from app import db
+    from app.models import Message, MentorshipRequest, Conversation
+
+    with app.app_context():
+        mentor = create_user('bench_mentor', role='mentor')
+        student = create_user('bench_student')
+        other = create_user('bench_other')
+        db.session.commit()
+        db.session.add(MentorshipRequest(student_id=student.id, mentor_id=mentor.id, status='accepted'))
+        db.session.commit()
+        ids = (mentor.id, student.id, other.id,
+               Conversation.between(student.id, mentor.id, create=True).id,
+               Conversation.between(other.id, mentor.id, create=True).id)
+        db.session.commit()
+
+    mentor_id, student_id, other_id, thread_id, other_thread_id = ids
+
+    with app.app_context():
+        failures = check_query_plans(db, Message, thread_id, mentor_id)
+    if failures:
+        print(f"Full table scan in: {', '.join(failures)}")
+        sys.exit(1)
+    client = login(app, 'bench_student')
+
+    rows = []
+    inserted = 0
+    for size in sizes:
+        with app.app_context():
+            # Grow the measured thread plus an unrelated one of the same size
+            add_messages(db, Message, thread_id, student_id, mentor_id, inserted, size - inserted)
+            add_messages(db, Message, other_thread_id, other_id, mentor_id, inserted, size - inserted)
+            middle_id = db.session.query(db.func.max(Message.id)).scalar() // 2
+        inserted = size
+
+        chat_page = time_calls(lambda: client.get(f'/mentorship/chat/{mentor_id}'), repeat=args.repeat)
+        newest = time_calls(lambda: client.get(f'/mentorship/chat/{mentor_id}/history'), repeat=args.repeat)
+        middle = time_calls(lambda: client.get(f'/mentorship/chat/{mentor_id}/history?before={middle_id}'),
+                            repeat=args.repeat)
+        rows.append((size,
+                     f"{chat_page['p50']:.2f}", f"{newest['p50']:.2f}", f"{middle['p50']:.2f}",
+                     f"{middle['p99']:.2f}"))
+
+    print_table(('messages', 'chat p50 ms', 'newest p50 ms', 'middle p50 ms', 'middle p99 ms'), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Shared helpers for the benchmark scripts.
+
+Each benchmark builds its own throwaway SQLite database so results do not
+depend on (or damage) the development database. Run them from the project
+root, e.g. ``python -m benchmarks.chat_history``.
+"""
+import contextlib
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import event
+
+from config import Config
+
+
+def make_app(db_path=None, **overrides):
+    """Create an app bound to a fresh database file"""
+    from app import create_app
+    from app.migrations import upgrade
+
+    if db_path is None:
+        fd, db_path = tempfile.mkstemp(prefix='smartfarm-bench-', suffix='.db')
+        os.close(fd)
+        os.remove(db_path)
+
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+        'TESTING': True,
+        'SCHEMA_CHECK': 'off',  # Migrated right after creation
+    }
+    settings.update(overrides)
+    config_class = type('BenchmarkConfig', (Config,), settings)
+
+    app = create_app(config_class)
+    with app.app_context():
+        upgrade()
+    app.bench_db_path = db_path
+    return app
+
+
+def create_user(username, role='student', password='Bench123456'):
+    """Add a user to the current session and return it"""
+    from app import db
+    from app.models import User
+
+    user = User(username=username, email=f'{username}@bench.local', full_name=username.title(), role=role)
+    user.set_password(password)
+    db.session.add(user)
+    return user
+
+
+def login(app, username, password='Bench123456'):
+    """Test client logged in as username"""
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': username, 'password': password})
+    assert response.status_code == 302, f'login failed for {username}'
+    return client
+
+
+@contextlib.contextmanager
+def count_queries(app):
+    """Collect the SQL statements the app runs inside the block"""
+    from app import db
+
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def time_calls(func, repeat=50, warmup=3):
+    """Call func repeatedly and return latency percentiles in milliseconds"""
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    return {
+        'p50': statistics.median(samples),
+        'p99': samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        'mean': statistics.fmean(samples),
+    }
+
+
+def print_table(headers, rows):
+    """Print rows as a fixed-width table"""
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    line = '  '.join(str(h).rjust(w) for h, w in zip(headers, widths))
+    print(line)
+    print('-' * len(line))
+    for row in rows:
+        print('  '.join(str(c).rjust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,91 @@
+"""Concurrency check for courses.complete_module.
+
+Many threads complete the modules of one course for the same students at
+the same time, each module several times over. Afterwards every enrollment
+must show exactly one completion row per module, a modules_completed count
+equal to the module count and exactly one certificate. Exits non-zero on
+any mismatch.
+
+    python -m benchmarks.complete_module_concurrency [--threads 16] [--repeats 5]
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+from benchmarks.common import make_app, create_user, login
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--students', type=int, default=4)
+    parser.add_argument('--modules', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=5, help='Times each module is completed per thread.')
+    args = parser.parse_args()
+
+    app = make_app(JOB_WORKERS=0)
+    from app import db
+    from app.models import Course, CourseModule, CourseEnrollment, Certificate, ModuleCompletion
+
+    with app.app_context():
+        students = [create_user(f'bench_student_{i}') for i in range(args.students)]
+        course = Course(title='Bench Course', description='Benchmark course', category='Crop Farming',
+                        is_published=True)
+        db.session.add(course)
+        db.session.commit()
+        for order in range(1, args.modules + 1):
+            db.session.add(CourseModule(course_id=course.id, title=f'Module {order}', order=order))
+        for student in students:
+            db.session.add(CourseEnrollment(student_id=student.id, course_id=course.id))
+        db.session.commit()
+        course_id = course.id
+        module_ids = [m.id for m in CourseModule.query.filter_by(course_id=course_id)]
+        usernames = [s.username for s in students]
+
+    errors = []
+
+    def hammer(username):
+        client = login(app, username)
+        work = module_ids * args.repeats
+        random.shuffle(work)
+        for module_id in work:
+            response = client.post(f'/courses/{course_id}/module/{module_id}/complete')
+            if response.status_code != 200:
+                errors.append(f'{username} module {module_id}: HTTP {response.status_code} {response.get_data(as_text=True)}')
+
+    threads = [threading.Thread(target=hammer, args=(usernames[i % len(usernames)],)) for i in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    requests = args.threads * args.modules * args.repeats
+    print(f'{requests} requests from {args.threads} threads in {elapsed:.2f}s ({requests / elapsed:.0f} req/s)')
+
+    with app.app_context():
+        for enrollment in CourseEnrollment.query.filter_by(course_id=course_id):
+            completions = ModuleCompletion.query.filter_by(enrollment_id=enrollment.id).count()
+            certificates = Certificate.query.filter_by(student_id=enrollment.student_id, course_id=course_id).count()
+            if completions != args.modules:
+                errors.append(f'enrollment {enrollment.id}: {completions} completion rows, expected {args.modules}')
+            if enrollment.modules_completed != args.modules:
+                errors.append(f'enrollment {enrollment.id}: modules_completed={enrollment.modules_completed}')
+            if enrollment.progress_percentage != 100.0 or not enrollment.is_completed:
+                errors.append(f'enrollment {enrollment.id}: progress={enrollment.progress_percentage} '
+                              f'completed={enrollment.is_completed}')
+            if certificates != 1:
+                errors.append(f'enrollment {enrollment.id}: {certificates} certificates')
+
+    if errors:
+        print(f'{len(errors)} problems:')
+        for error in errors[:20]:
+            print(f'  {error}')
+        sys.exit(1)
+    print('All counts exact.')
+
+
+if __name__ == '__main__':
+    main()
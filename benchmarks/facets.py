@@ -0,0 +1,69 @@
+"""Catalog facet counts from the facet table against GROUP BY over courses.
+
+    python -m benchmarks.facets [--rows 50000]
+"""
+import argparse
+import random
+
+from sqlalchemy import func
+
+from benchmarks.common import make_app, print_table, time_calls
+
+CATEGORIES = ['Crops', 'Livestock', 'Poultry', 'Aquaculture', 'Agribusiness', 'Horticulture', 'Dairy', 'Soil']
+LEVELS = ['beginner', 'intermediate', 'advanced']
+
+
+def seed(app, rows):
+    from app import db
+    from app.facets import rebuild_course_facets
+    from app.models import Course
+
+    rng = random.Random(7)
+    with app.app_context():
+        for start in range(0, rows, 5000):
+            db.session.execute(Course.__table__.insert(), [{
+                'title': f'Course {i}',
+                'description': 'Benchmark course',
+                'category': rng.choice(CATEGORIES),
+                'level': rng.choice(LEVELS),
+                'is_published': rng.random() < 0.9,
+            } for i in range(start, min(start + 5000, rows))])
+        db.session.commit()
+        # Bulk inserts bypass the ORM hooks, so count once up front
+        rebuild_course_facets()
+
+
+def group_by_counts(category, level):
+    """What the facets would cost computed from the courses table"""
+    from app import db
+    from app.models import Course
+
+    published = db.session.query(Course.category, Course.level, func.count(Course.id)).filter(
+        Course.is_published.is_(True)
+    ).group_by(Course.category, Course.level)
+    return published.all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    app = make_app(JOB_WORKERS=0)
+    seed(app, args.rows)
+
+    from app.facets import facet_counts
+
+    rows = []
+    with app.app_context():
+        for category, level in [(None, None), ('Crops', None), ('Crops', 'advanced')]:
+            table = time_calls(lambda: facet_counts(category, level))
+            scan = time_calls(lambda: group_by_counts(category, level), repeat=10)
+            rows.append((category or '-', level or '-', facet_counts(category, level)['total'],
+                         f"{table['p50']:.2f}", f"{scan['p50']:.2f}"))
+
+    print_table(['category', 'level', 'matching', 'facet table p50 ms', 'group by p50 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
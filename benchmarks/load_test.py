@@ -0,0 +1,198 @@
+"""Load test of the main routes against production-sized generated data.
+
+Builds a database with seed.generate() (or reuses one given with --db),
+logs in as a student, a mentor and an admin, and drives each route in
+ROUTES through the Flask test client from --threads threads. Every
+request runs the full WSGI stack in-process, so SQL statements can be
+counted per request. Reports p50/p99 latency, throughput and queries per
+request for each route; --json writes the same figures to a file.
+
+    python -m benchmarks.load_test [--users 5000] [--mentors 100] [--courses 200] [--requests 200] [--threads 4]
+    python -m benchmarks.load_test --db /tmp/load.db   # reuse data from an earlier run
+"""
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import make_app, print_table
+
+# (name, who, url template); who is None for anonymous requests
+ROUTES = [
+    ('home', None, '/'),
+    ('catalog', None, '/courses/'),
+    ('catalog filtered', None, '/courses/?category={category}&level=beginner'),
+    ('course', None, '/courses/{course_id}'),
+    ('search', None, '/search?q=maize+irrigation'),
+    ('mentor list', None, '/mentorship/browse'),
+    ('mentor profile', None, '/mentorship/{mentor_id}'),
+    ('dashboard', 'student', '/dashboard/'),
+    ('certificates', 'student', '/dashboard/certificates'),
+    ('module', 'student', '/courses/{course_id}/module/{module_id}'),
+    ('requests', 'student', '/mentorship/requests'),
+    ('chat', 'student', '/mentorship/chat/{mentor_id}'),
+    ('chat history', 'student', '/mentorship/chat/{mentor_id}/history'),
+    ('mentor requests', 'mentor', '/mentorship/requests'),
+    ('admin dashboard', 'admin', '/admin/'),
+    ('admin users', 'admin', '/admin/users'),
+    ('admin courses', 'admin', '/admin/courses'),
+    ('admin mentors', 'admin', '/admin/mentors'),
+]
+
+PASSWORD = 'Load123456'
+
+
+def build(args):
+    """App on a database holding generated data"""
+    from seed import generate
+
+    fresh = not (args.db and os.path.exists(args.db))
+    # Failing requests become 500s counted as errors instead of aborting the run
+    app = make_app(args.db, JOB_WORKERS=0, PROPAGATE_EXCEPTIONS=False)
+    if fresh:
+        with app.app_context():
+            generate(args.users, args.mentors, args.courses, args.modules_per_course,
+                     args.enrollments_per_student, args.conversations_per_student,
+                     args.messages_per_conversation, password=PASSWORD)
+            _add_admin()
+    return app
+
+
+def _add_admin():
+    from app import db
+    from app.models import User
+
+    admin = User(username='load_admin', email='load_admin@load.smartfarm', role='admin')
+    admin.set_password(PASSWORD, 'pbkdf2:sha256:1000')
+    db.session.add(admin)
+    db.session.commit()
+
+
+def sample_ids(app):
+    """A student with enrollments and an accepted mentor, plus one of their courses and modules"""
+    from app import db
+    from app.models import CourseEnrollment, CourseModule, Course, MentorshipRequest, User
+
+    with app.app_context():
+        student_id, mentor_id = db.session.query(MentorshipRequest.student_id, MentorshipRequest.mentor_id).join(
+            User, User.id == MentorshipRequest.student_id
+        ).filter(User.is_active.is_(True), MentorshipRequest.status == 'accepted').order_by(
+            MentorshipRequest.id.desc()).first()
+        enrollment = CourseEnrollment.query.filter_by(student_id=student_id).first()
+        module = CourseModule.query.filter_by(course_id=enrollment.course_id).order_by(CourseModule.order).first()
+        return {
+            'student': User.query.get(student_id).username,
+            'mentor': User.query.get(mentor_id).username,
+            'admin': 'load_admin',
+            'mentor_id': mentor_id,
+            'course_id': enrollment.course_id,
+            'module_id': module.id,
+            'category': Course.query.get(enrollment.course_id).category,
+        }
+
+
+def login(app, username):
+    client = app.test_client()
+    response = client.post('/auth/login', data={'username': username, 'password': PASSWORD})
+    assert response.status_code == 302 and '/auth/login' not in response.headers['Location'], \
+        f'login failed for {username}'
+    return client
+
+
+def run_route(app, clients, url, requests, threads, counter):
+    """Latencies (ms), query counts and status codes for requests spread over threads"""
+    latencies, queries, statuses = [], [], []
+    lock = threading.Lock()
+    per_thread = max(1, requests // threads)
+
+    def worker(client):
+        mine = []
+        for _ in range(per_thread):
+            counter.count = 0
+            start = time.perf_counter()
+            response = client.get(url)
+            mine.append(((time.perf_counter() - start) * 1000, counter.count, response.status_code))
+        with lock:
+            for latency, count, status in mine:
+                latencies.append(latency)
+                queries.append(count)
+                statuses.append(status)
+
+    pool = [threading.Thread(target=worker, args=(clients[i % len(clients)],)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return latencies, queries, statuses, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=None, help='SQLite file to create or reuse (default: a temporary file).')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--mentors', type=int, default=100)
+    parser.add_argument('--courses', type=int, default=200)
+    parser.add_argument('--modules-per-course', type=int, default=8)
+    parser.add_argument('--enrollments-per-student', type=int, default=3)
+    parser.add_argument('--conversations-per-student', type=int, default=2)
+    parser.add_argument('--messages-per-conversation', type=int, default=40)
+    parser.add_argument('--requests', type=int, default=200, help='Requests per route.')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this file.')
+    args = parser.parse_args()
+
+    from app import db
+
+    app = build(args)
+    ids = sample_ids(app)
+    with app.app_context():
+        engine = db.engine
+
+    # Statements are counted per thread; the test client runs a request on the calling thread
+    counter = threading.local()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.count = getattr(counter, 'count', 0) + 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    sessions = {who: [login(app, ids[who]) for _ in range(args.threads)] for who in ('student', 'mentor', 'admin')}
+    sessions[None] = [app.test_client() for _ in range(args.threads)]
+
+    rows, results = [], {}
+    for name, who, template in ROUTES:
+        url = template.format(**ids)
+        clients = sessions[who]
+        for client in clients:
+            client.get(url)  # warm caches and connections
+        latencies, queries, statuses, elapsed = run_route(app, clients, url, args.requests, args.threads, counter)
+        latencies.sort()
+        result = {
+            'url': url,
+            'user': who or 'anonymous',
+            'requests': len(latencies),
+            'errors': sum(status >= 400 for status in statuses),
+            'p50_ms': statistics.median(latencies),
+            'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            'requests_per_second': len(latencies) / elapsed,
+            'queries_per_request': statistics.fmean(queries),
+            'max_queries': max(queries),
+        }
+        results[name] = result
+        rows.append((name, result['user'], f"{result['p50_ms']:.1f}", f"{result['p99_ms']:.1f}",
+                     f"{result['requests_per_second']:.0f}", f"{result['queries_per_request']:.1f}",
+                     result['max_queries'], result['errors']))
+
+    print_table(['route', 'as', 'p50 ms', 'p99 ms', 'req/s', 'queries/req', 'max queries', 'errors'], rows)
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({'settings': vars(args), 'routes': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Deep pages of the admin user list: OFFSET against keyset cursors.
+
+    python -m benchmarks.pagination [--rows 200000]
+"""
+import argparse
+
+from benchmarks.common import make_app, print_table, time_calls
+
+ROLES = ['student', 'student', 'student', 'mentor']
+PER_PAGE = 20
+
+
+def seed(app, rows):
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        for start in range(0, rows, 10000):
+            db.session.execute(User.__table__.insert(), [{
+                'username': f'user{i}',
+                'email': f'user{i}@bench.local',
+                'password_hash': 'x',
+                'role': ROLES[i % len(ROLES)],
+                'is_active': True,
+            } for i in range(start, min(start + 10000, rows))])
+        db.session.commit()
+
+
+def offset_page(role, page):
+    """What paginate() ran per page: COUNT(*) plus LIMIT/OFFSET"""
+    from app.models import User
+
+    query = User.query.filter_by(role=role).order_by(User.id)
+    query.order_by(None).count()
+    return query.limit(PER_PAGE).offset((page - 1) * PER_PAGE).all()
+
+
+def cursor_for(role, page):
+    """Cursor a client holds after walking to page"""
+    from app.models import User
+    from app.pagination import encode_cursor
+
+    if page == 1:
+        return None
+    last = User.query.filter_by(role=role).order_by(User.id).offset((page - 1) * PER_PAGE - 1).first()
+    return encode_cursor({'after': [last.id]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    app = make_app(JOB_WORKERS=0)
+    seed(app, args.rows)
+
+    from app.models import User
+    from app.pagination import keyset_page
+
+    rows = []
+    with app.app_context():
+        pages = args.rows * ROLES.count('student') // len(ROLES) // PER_PAGE
+        for page in [1, 100, pages // 2, pages]:
+            cursor = cursor_for('student', page)
+            query = User.query.filter_by(role='student')
+            keyset = time_calls(lambda: keyset_page(query, [(User.id, False)], cursor, PER_PAGE))
+            offset = time_calls(lambda: offset_page('student', page), repeat=10)
+            assert [u.id for u in keyset_page(query, [(User.id, False)], cursor, PER_PAGE).items] == \
+                [u.id for u in offset_page('student', page)]
+            rows.append((page, f"{offset['p50']:.2f}", f"{keyset['p50']:.2f}",
+                         f"{offset['p50'] / keyset['p50']:.1f}x"))
+
+    print_table(['page', 'offset + count p50 ms', 'keyset p50 ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
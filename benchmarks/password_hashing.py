@@ -0,0 +1,152 @@
+"""Password verification cost per policy and login throughput under a spike.
+
+First, each candidate PASSWORD_HASH_METHOD is timed on one thread, giving
+logins per second per core (hash verification is the dominant cost of a
+login). Then a burst of concurrent logins is sent through the real login
+route while another client keeps loading a cheap page, all of it through
+WEB_THREADS request threads as in one gunicorn worker: once with hashing on
+the request threads (PASSWORD_HASH_WORKERS=0) and once on the bounded pool.
+The page latency shows whether a login spike starves other requests; logins
+turned away with "try again" are counted separately.
+
+Exits non-zero if the configured policy verifies fewer than
+--min-logins-per-core passwords per second, so a cost increase that would
+not survive a workshop's worth of logins is caught before it ships:
+
+    python -m benchmarks.password_hashing [--logins 100] [--threads 16] [--min-logins-per-core 0]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import make_app, create_user, print_table
+from config import Config
+
+POLICIES = ['scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000', 'pbkdf2:sha256:200000']
+
+
+def verify_rate(method, seconds=2.0):
+    """Verifications per second of one password hashed with method, on one thread"""
+    from werkzeug.security import check_password_hash, generate_password_hash
+
+    pwhash = generate_password_hash('Bench123456', method)
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        check_password_hash(pwhash, 'Bench123456')
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def login_spike(workers, args):
+    """Send args.logins logins from args.threads clients through WEB_THREADS request threads.
+
+    As in a gunicorn gthread worker, every request (logins and the page
+    loads alike) needs one of Config.WEB_THREADS threads, and page latency is
+    measured from when the request arrives, queueing included. Returns
+    (completed logins/s, page latencies in ms, "try again" responses, errors);
+    turned-away clients retry after args.retry_after seconds.
+    """
+    from app import db
+
+    app = make_app(JOB_WORKERS=0, PASSWORD_HASH_WORKERS=workers)
+    with app.app_context():
+        for i in range(args.threads):
+            create_user(f'bench_login_{i}')
+        db.session.commit()
+
+    request_threads = ThreadPoolExecutor(Config.WEB_THREADS, thread_name_prefix='request')
+    remaining = iter(range(args.logins))
+    lock = threading.Lock()
+    statuses = []
+    done = threading.Event()
+
+    def log_in(i):
+        client = app.test_client()
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            while True:
+                response = request_threads.submit(
+                    client.post, '/auth/login', data={'username': f'bench_login_{i}', 'password': 'Bench123456'}
+                ).result()
+                statuses.append(response.status_code)
+                if response.status_code != 503:
+                    break
+                time.sleep(args.retry_after)  # "Try again in a moment"
+            if response.status_code == 302:
+                request_threads.submit(client.get, '/auth/logout').result()
+
+    latencies = []
+
+    def browse():
+        client = app.test_client()
+        while not done.is_set():
+            start = time.perf_counter()
+            request_threads.submit(client.get, '/courses/').result()
+            latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)  # A visitor clicking around, not a tight loop
+
+    browser = threading.Thread(target=browse)
+    browser.start()
+    clients = [threading.Thread(target=log_in, args=(i,)) for i in range(args.threads)]
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    browser.join()
+    request_threads.shutdown()
+    app.extensions['password_hasher'].shutdown()
+    busy = statuses.count(503)
+    errors = len(statuses) - statuses.count(302) - busy
+    return statuses.count(302) / elapsed, sorted(latencies), busy, errors
+
+
+def percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] if samples else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--threads', type=int, default=16, help='Clients logging in at once.')
+    parser.add_argument('--retry-after', type=float, default=0.5, help='Seconds a turned-away client waits to retry.')
+    parser.add_argument('--min-logins-per-core', type=float, default=0,
+                        help='Fail when the configured policy verifies fewer passwords per core per second (0: no limit).')
+    args = parser.parse_args()
+
+    configured = Config.PASSWORD_HASH_METHOD
+    rates = {}
+    rows = []
+    for method in dict.fromkeys([configured] + POLICIES):
+        rates[method] = verify_rate(method)
+        label = method + (' (configured)' if method == configured else '')
+        rows.append((label, f'{1000 / rates[method]:.1f}', f'{rates[method]:.1f}'))
+    print_table(['policy', 'ms/verify', 'logins/s/core'], rows)
+    print()
+
+    cores = os.cpu_count() or 1
+    rows = []
+    for label, workers in [('request threads', 0), ('hash pool', Config.PASSWORD_HASH_WORKERS)]:
+        rate, latencies, busy, errors = login_spike(workers, args)
+        rows.append((f'{label} ({workers or Config.WEB_THREADS} hashing)', f'{rate:.1f}', f'{rate / cores:.1f}', busy,
+                     f'{percentile(latencies, 0.5):.1f}', f'{percentile(latencies, 0.95):.1f}', errors))
+    print(f'{args.logins} logins from {args.threads} clients through {Config.WEB_THREADS} request threads, '
+          f'{configured}, {cores} core(s)')
+    print_table(['hashing on', 'logins/s', 'logins/s/core', 'turned away', 'page p50 ms', 'page p95 ms', 'errors'],
+                rows)
+
+    if args.min_logins_per_core and rates[configured] < args.min_logins_per_core:
+        print(f'\n{configured} verifies {rates[configured]:.1f} passwords/s per core, '
+              f'below the budget of {args.min_logins_per_core:.1f}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
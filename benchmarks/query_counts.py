@@ -0,0 +1,88 @@
+"""Per-request SQL query budgets for list pages.
+
+Seeds a student and a mentor with a few rows, then with many, and counts the
+statements each page runs. A page passes when it stays within its budget and
+runs the same number of queries at both sizes, so a reintroduced N+1 (a lazy
+load per row) fails. Exits non-zero on any failure so it can gate CI:
+
+    python -m benchmarks.query_counts
+"""
+import sys
+import uuid
+
+from benchmarks.common import count_queries, create_user, login, make_app, print_table
+
+# (page, user, maximum queries per request)
+BUDGETS = [
+    ('/dashboard/', 'student', 5),
+    ('/dashboard/', 'mentor', 5),
+    ('/dashboard/certificates', 'student', 5),
+    ('/mentorship/requests', 'student', 5),
+    ('/mentorship/requests', 'mentor', 5),
+]
+
+
+def seed(app, rows):
+    """Give the student rows enrollments, certificates and mentorship requests"""
+    from app import db
+    from app.models import Certificate, Course, CourseEnrollment, MentorshipRequest
+
+    with app.app_context():
+        student = create_user('student')
+        mentor = create_user('mentor', role='mentor')
+        db.session.flush()
+        for i in range(rows):
+            course = Course(title=f'Course {i}', description='Bench course', category='Crops', is_published=True)
+            # Each request has its own mentor so the mentor side is exercised too
+            other = mentor if i == 0 else create_user(f'mentor{i}', role='mentor')
+            db.session.add(course)
+            db.session.flush()
+            db.session.add(CourseEnrollment(student_id=student.id, course_id=course.id))
+            db.session.add(Certificate(student_id=student.id, course_id=course.id,
+                                       certificate_code=uuid.uuid4().hex[:12].upper()))
+            db.session.add(MentorshipRequest(student_id=student.id, mentor_id=other.id, status='pending'))
+            if i:
+                requester = create_user(f'student{i}')
+                db.session.flush()
+                db.session.add(MentorshipRequest(student_id=requester.id, mentor_id=mentor.id, status='pending'))
+        db.session.commit()
+
+
+def measure(rows):
+    """Query count per budgeted page with rows of data per list"""
+    app = make_app(JOB_WORKERS=0)
+    seed(app, rows)
+    clients = {'student': login(app, 'student'), 'mentor': login(app, 'mentor')}
+
+    counts = []
+    for page, user, _budget in BUDGETS:
+        client = clients[user]
+        # Warm per-worker caches (unread totals) so both sizes start equal
+        client.get(page)
+        with count_queries(app) as statements:
+            response = client.get(page)
+        assert response.status_code == 200, f'{page} returned {response.status_code}'
+        counts.append(len(statements))
+    return counts
+
+
+def main():
+    small = measure(1)
+    large = measure(25)
+
+    rows = []
+    failures = []
+    for (page, user, budget), few, many in zip(BUDGETS, small, large):
+        ok = few == many and many <= budget
+        rows.append((page, user, few, many, budget, 'ok' if ok else 'FAIL'))
+        if not ok:
+            failures.append(f'{page} ({user})')
+
+    print_table(['page', 'user', '1 row', '25 rows', 'budget', ''], rows)
+    if failures:
+        print(f'\nQuery budget exceeded or N+1 detected on: {", ".join(failures)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,258 @@
+"""Route benchmark suite with stored baselines and a regression check.
+
+Runs the routes in ROUTES one request at a time against a fixture database
+of the chosen --size (see SIZES), built with seed.generate() on first use
+and kept in --fixtures-dir keyed on the size and schema version. Each run
+works on a copy, so the POST routes never change the fixture.
+
+Results are compared with benchmarks/baselines/routes-<size>.json when it
+exists. A route regresses when its queries per request go up, or when its
+p50 latency is more than --threshold percent (and --min-delta-ms) slower.
+Latency is only compared when the baseline was recorded on a machine like
+this one (same platform, CPU count and Python); query counts always are.
+Exits with status 1 on any regression.
+
+    python -m benchmarks.routes [--size small|medium|large] [--requests 200] [--threshold 25]
+    python -m benchmarks.routes --size medium --save-baseline   # record new baselines
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from benchmarks.common import make_app, print_table
+from benchmarks.load_test import PASSWORD, login, sample_ids, _add_admin
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+# seed.generate() arguments per fixture size
+SIZES = {
+    'small': {'users': 500, 'mentors': 20, 'courses': 40, 'modules_per_course': 6,
+              'enrollments_per_student': 3, 'conversations_per_student': 1, 'messages_per_conversation': 20},
+    'medium': {'users': 5000, 'mentors': 100, 'courses': 200, 'modules_per_course': 8,
+               'enrollments_per_student': 3, 'conversations_per_student': 2, 'messages_per_conversation': 40},
+    'large': {'users': 20000, 'mentors': 300, 'courses': 500, 'modules_per_course': 10,
+              'enrollments_per_student': 4, 'conversations_per_student': 2, 'messages_per_conversation': 60},
+}
+
+CERTIFICATE_CODE = 'BENCH-ROUTES-0001'
+
+# (name, method, url template, form data); every route runs as the sample student
+ROUTES = [
+    ('courses.browse', 'GET', '/courses/', None),
+    ('courses.view_module', 'GET', '/courses/{course_id}/module/{module_id}', None),
+    ('courses.complete_module', 'POST', '/courses/{course_id}/module/{module_id}/complete', None),
+    ('mentorship.chat', 'GET', '/mentorship/chat/{mentor_id}', None),
+    ('mentorship.send_message', 'POST', '/mentorship/message/{mentor_id}', {'content': 'How deep should I plant maize?'}),
+    ('dashboard.index', 'GET', '/dashboard/', None),
+    ('dashboard.download_certificate', 'GET', '/dashboard/certificate/{cert_code}/download', None),
+]
+
+
+def fixture_path(size, fixtures_dir):
+    """Cached fixture file for a size; a new schema or size preset gets a new file"""
+    from app.migrations import latest_version
+
+    settings = json.dumps({'size': SIZES[size], 'schema': latest_version()}, sort_keys=True)
+    digest = hashlib.sha256(settings.encode()).hexdigest()[:12]
+    return os.path.join(fixtures_dir, f'routes-{size}-{digest}.db')
+
+
+def build_fixture(size, path):
+    """Generate the fixture database for size at path"""
+    from seed import generate
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + '.partial'
+    if os.path.exists(partial):
+        os.remove(partial)
+    app = make_app(partial, JOB_WORKERS=0)
+    with app.app_context():
+        from app import db
+        from app.models import Certificate, User
+
+        generate(password=PASSWORD, **SIZES[size])
+        _add_admin()
+        # The generator issues no certificates; give the sample student one to download
+        ids = sample_ids(app)
+        student = User.query.filter_by(username=ids['student']).first()
+        db.session.add(Certificate(student_id=student.id, course_id=ids['course_id'],
+                                   certificate_code=CERTIFICATE_CODE))
+        db.session.commit()
+        db.session.remove()
+        # Closing the last connection checkpoints the WAL into the main file
+        db.engine.dispose()
+    os.replace(partial, path)
+
+
+def working_copy(size, fixtures_dir, rebuild=False):
+    """Path of a throwaway copy of the fixture for size, building it first if needed"""
+    path = fixture_path(size, fixtures_dir)
+    if rebuild or not os.path.exists(path):
+        print(f'Building the {size} fixture database at {path}...')
+        build_fixture(size, path)
+    fd, copy = tempfile.mkstemp(prefix=f'smartfarm-routes-{size}-', suffix='.db')
+    os.close(fd)
+    shutil.copyfile(path, copy)
+    return copy
+
+
+def machine():
+    """What latency figures depend on, to tell whether two runs are comparable"""
+    return {'platform': platform.platform(), 'processor': platform.machine(),
+            'cpus': os.cpu_count(), 'python': platform.python_version()}
+
+
+def measure(client, method, url, data, requests, counter):
+    """Latencies (ms), query counts and status codes of requests sequential calls"""
+    send = client.post if method == 'POST' else client.get
+    latencies, queries, statuses = [], [], []
+    for _ in range(requests):
+        counter.count = 0
+        start = time.perf_counter()
+        response = send(url, data=data)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        statuses.append(response.status_code)
+        response.close()
+    return latencies, queries, statuses
+
+
+def run_suite(app, requests, warmup):
+    """Results per route name"""
+    from app import db
+
+    ids = dict(sample_ids(app), cert_code=CERTIFICATE_CODE)
+    with app.app_context():
+        engine = db.engine
+
+    counter = threading.local()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.count = getattr(counter, 'count', 0) + 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    client = login(app, ids['student'])
+    results = {}
+    for name, method, template, data in ROUTES:
+        url = template.format(**ids)
+        # Warm-up requests fill caches and render the certificate once, as in production
+        measure(client, method, url, data, warmup, counter)
+        latencies, queries, statuses = measure(client, method, url, data, requests, counter)
+        latencies.sort()
+        results[name] = {
+            'method': method,
+            'url': url,
+            'requests': requests,
+            'errors': sum(status >= 400 for status in statuses),
+            'p50_ms': round(statistics.median(latencies), 3),
+            'p90_ms': round(latencies[min(requests - 1, int(requests * 0.9))], 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'queries_per_request': round(statistics.fmean(queries), 2),
+            'max_queries': max(queries),
+        }
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms, compare_latency):
+    """Status and baseline p50 per route, and whether any route regressed"""
+    verdicts, regressed = {}, False
+    for name, result in results.items():
+        base = baseline['routes'].get(name) if baseline else None
+        if base is None:
+            verdicts[name] = ('new', None)
+            continue
+        problems = []
+        if result['errors'] > base['errors']:
+            problems.append('errors')
+        if result['queries_per_request'] > base['queries_per_request'] + 0.5:
+            problems.append('queries')
+        slower = result['p50_ms'] - base['p50_ms']
+        if compare_latency and slower > min_delta_ms and slower > base['p50_ms'] * threshold / 100:
+            problems.append('latency')
+        regressed = regressed or bool(problems)
+        verdicts[name] = ('REGRESSED: ' + ', '.join(problems) if problems else 'ok', base['p50_ms'])
+    return verdicts, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', choices=sorted(SIZES), default='small')
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per route.')
+    parser.add_argument('--warmup', type=int, default=10, help='Unmeasured requests per route first.')
+    parser.add_argument('--threshold', type=float, default=25.0,
+                        help='Percent a p50 latency may grow over the baseline before it counts as a regression.')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore latency changes smaller than this, however large in percent.')
+    parser.add_argument('--baseline', default=None,
+                        help='Baseline file (default: benchmarks/baselines/routes-<size>.json).')
+    parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline.')
+    parser.add_argument('--fixtures-dir', default=os.path.join(tempfile.gettempdir(), 'smartfarm-bench-fixtures'),
+                        help='Where fixture databases are cached between runs.')
+    parser.add_argument('--rebuild-fixture', action='store_true', help='Generate the fixture database again.')
+    parser.add_argument('--json', dest='json_path', default=None, help='Also write the results to this file.')
+    args = parser.parse_args()
+
+    baseline_path = args.baseline or os.path.join(BASELINE_DIR, f'routes-{args.size}.json')
+    baseline = None
+    if os.path.exists(baseline_path) and not args.save_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+
+    db_path = working_copy(args.size, args.fixtures_dir, args.rebuild_fixture)
+    certificates = tempfile.mkdtemp(prefix='smartfarm-routes-certificates-')
+    try:
+        app = make_app(db_path, JOB_WORKERS=0, PROPAGATE_EXCEPTIONS=False, CERTIFICATE_CACHE_DIR=certificates)
+        results = run_suite(app, args.requests, args.warmup)
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        shutil.rmtree(certificates, ignore_errors=True)
+
+    report = {'size': args.size, 'settings': SIZES[args.size], 'requests': args.requests,
+              'machine': machine(), 'routes': results}
+    compare_latency = baseline is not None and baseline.get('machine') == report['machine']
+    verdicts, regressed = compare(results, baseline, args.threshold, args.min_delta_ms, compare_latency)
+
+    rows = []
+    for name, result in results.items():
+        status, base_p50 = verdicts[name]
+        change = f"{(result['p50_ms'] / base_p50 - 1) * 100:+.0f}%" if base_p50 else '-'
+        rows.append((name, f"{result['p50_ms']:.1f}", f"{result['p90_ms']:.1f}",
+                     f'{base_p50:.1f}' if base_p50 is not None else '-', change,
+                     f"{result['queries_per_request']:.1f}", result['errors'], status))
+    print_table(['route', 'p50 ms', 'p90 ms', 'baseline p50', 'change', 'queries/req', 'errors', 'status'], rows)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f'Baseline written to {baseline_path}')
+    elif baseline is None:
+        print(f'No baseline at {baseline_path}; record one with --save-baseline.')
+    elif not compare_latency:
+        print('Baseline was recorded on a different machine; only query counts and errors were compared.')
+
+    if regressed:
+        print(f'Regression against {baseline_path}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Full-text search against the LIKE scan it replaces.
+
+Fills a database with 100k published courses whose titles and descriptions
+draw words Zipf-style from a farming vocabulary followed by a long tail of
+rarer terms, builds the FTS5 index and times the first page of results for a
+few kinds of query through both paths.
+
+LIKE returns the first ten matches in id order, so for words found in a
+large share of rows it stops early; FTS ranks every match. The more selective
+the query, the more FTS pulls ahead, and a miss costs LIKE a full scan.
+
+    python -m benchmarks.search [--rows 100000]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.common import make_app, print_table, time_calls
+
+VOCABULARY = (
+    'irrigation drip sprinkler maize cassava sorghum millet rice beans soybean poultry broiler layer '
+    'dairy goat sheep pig fish pond aquaculture beekeeping honey compost manure fertilizer organic '
+    'pest disease weed harvest storage drying market cooperative credit tractor tillage seed nursery '
+    'greenhouse tomato onion cabbage pepper banana mango citrus avocado coffee cocoa tea cotton soil '
+    'erosion terrace agroforestry rainwater borehole solar pump feed vaccine hatchery record budget'
+).split()
+
+# Rarer words beyond the farming vocabulary (product names, places, ...)
+LONG_TAIL = [f'term{i}' for i in range(20000)]
+
+QUERIES = [
+    ('common word', 'maize'),
+    ('two words', 'drip irrigation'),
+    ('prefix', 'aqua'),
+    ('rare word', 'term4000'),
+    ('three words', 'hatchery vaccine broiler'),
+    ('no match', 'hydroponics'),
+]
+
+
+def seed(app, rows):
+    from app import db
+    from app.models import Course
+
+    rng = random.Random(42)
+    levels = ['beginner', 'intermediate', 'advanced']
+    words = VOCABULARY + LONG_TAIL
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    with app.app_context():
+        batch = []
+        for i in range(rows):
+            batch.append({
+                'title': ' '.join(rng.choices(words, weights, k=3)).title(),
+                'description': ' '.join(rng.choices(words, weights, k=40)),
+                'category': rng.choice(['Crops', 'Livestock', 'Aquaculture', 'Agribusiness']),
+                'level': rng.choice(levels),
+                'is_published': True,
+            })
+            if len(batch) == 5000:
+                db.session.execute(Course.__table__.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(Course.__table__.insert(), batch)
+        db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app(JOB_WORKERS=0)
+    seed(app, args.rows)
+
+    from app.search import fts_query, like_query, rebuild_search_index
+
+    with app.app_context():
+        start = time.perf_counter()
+        indexed = rebuild_search_index()
+        print(f'Indexed {indexed} rows in {time.perf_counter() - start:.1f}s\n')
+
+        rows = []
+        for label, text in QUERIES:
+            fts = time_calls(lambda: fts_query('course', text).limit(10).all(), repeat=args.repeat)
+            like = time_calls(lambda: like_query('course', text).limit(10).all(), repeat=max(args.repeat // 4, 3))
+            hits = fts_query('course', text).count()
+            rows.append((label, repr(text), hits, f"{fts['p50']:.2f}", f"{like['p50']:.2f}",
+                         f"{like['p50'] / fts['p50']:.1f}x"))
+
+    print_table(['query', 'text', 'fts hits', 'fts p50 ms', 'like p50 ms', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Worker boot cost: import time, app creation, first request and memory.
+
+Each run starts a fresh interpreter, as a new gunicorn worker would, and
+records how long importing the app package, create_app() and the first
+request to the homepage take, plus the process's peak RSS. Runs are repeated
+with ReportLab preloaded to show what lazy loading saves.
+
+Exits non-zero if any module in HEAVY_MODULES is loaded by boot plus a first
+request (a regression back to an eager import), or if boot exceeds
+--max-boot-ms, so it can gate CI:
+
+    python -m benchmarks.startup [--runs 5] [--max-boot-ms 0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.common import make_app, print_table
+
+# Optional subsystems that must only load when they are used
+HEAVY_MODULES = ['reportlab', 'PIL']
+
+PROBE = '''
+import json, resource, sys, time
+preload = sys.argv[1] == 'eager'
+start = time.perf_counter()
+if preload:
+    import reportlab.pdfgen.canvas
+import app
+imported = time.perf_counter()
+from config import Config
+application = app.create_app(type('StartupConfig', (Config,), {'JOB_WORKERS': 0}))
+created = time.perf_counter()
+response = application.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({
+    'status': response.status_code,
+    'import_ms': (imported - start) * 1000,
+    'create_ms': (created - imported) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'boot_ms': (served - start) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'loaded': sorted(name for name in %r if name in sys.modules),
+}))
+''' % (HEAVY_MODULES,)
+
+
+def probe(db_path, mode):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', PROBE, mode], cwd=root, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-boot-ms', type=float, default=0, help='Fail when median boot exceeds this (0: no limit).')
+    args = parser.parse_args()
+
+    # A migrated database, so the probes measure boot and not schema warnings
+    db_path = make_app(JOB_WORKERS=0).bench_db_path
+
+    rows = []
+    results = {}
+    for mode, label in [('lazy', 'lazy (current)'), ('eager', 'reportlab preloaded')]:
+        runs = [probe(db_path, mode) for _ in range(args.runs)]
+        results[mode] = runs
+        median = {key: statistics.median(run[key] for run in runs)
+                  for key in ['import_ms', 'create_ms', 'first_request_ms', 'boot_ms', 'rss_mb']}
+        rows.append((label, f"{median['import_ms']:.0f}", f"{median['create_ms']:.0f}",
+                     f"{median['first_request_ms']:.0f}", f"{median['boot_ms']:.0f}", f"{median['rss_mb']:.1f}"))
+        results[mode + '_median'] = median
+
+    print_table(['worker', 'import ms', 'create_app ms', 'first request ms', 'boot ms', 'peak RSS MB'], rows)
+
+    failures = []
+    loaded = sorted({name for run in results['lazy'] for name in run['loaded']})
+    if loaded:
+        failures.append(f'heavy modules loaded at boot: {", ".join(loaded)}')
+    if any(run['status'] != 200 for run in results['lazy']):
+        failures.append('first request did not return 200')
+    if args.max_boot_ms and results['lazy_median']['boot_ms'] > args.max_boot_ms:
+        failures.append(f"median boot {results['lazy_median']['boot_ms']:.0f} ms exceeds {args.max_boot_ms:.0f} ms")
+    if failures:
+        print('\n' + '\n'.join(failures))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
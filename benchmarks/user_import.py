@@ -0,0 +1,118 @@
+"""Bulk user import throughput against creating users one at a time.
+
+Generates a CSV of --rows users (a few percent of them duplicates or
+invalid, each enrolled in two courses) and imports it with
+app/user_import.py. The one-at-a-time figure replays what auth.register and
+courses.enroll do per user (two uniqueness queries, a hash under the login
+policy, a commit per user and per enrollment) on a sample of --baseline-rows.
+
+Hashing dominates both; rows/s scales with --processes up to the number of
+cores.
+
+    python -m benchmarks.user_import [--rows 20000] [--processes N] [--baseline-rows 200] [--hash-method M]
+"""
+import argparse
+import csv
+import io
+import os
+import time
+
+from benchmarks.common import make_app, print_table
+
+
+def generate_csv(rows, course_ids):
+    """CSV text for rows users; every 50th row repeats an earlier username and every 97th is invalid"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['username', 'email', 'password', 'full_name', 'role', 'expertise', 'courses'])
+    for i in range(rows):
+        username = f'farmer_{i // 2}' if i % 50 == 49 else f'farmer_{i}'
+        email = f'farmer_{i}@coop.example' if i % 97 != 96 else 'not-an-email'
+        role = 'mentor' if i % 20 == 0 else 'student'
+        courses = ';'.join(str(c) for c in course_ids[i % len(course_ids):][:2])
+        writer.writerow([username, email, f'Shamba{i:06d}', f'Farmer {i}', role,
+                         'Maize' if role == 'mentor' else '', courses])
+    output.seek(0)
+    return output
+
+
+def seed_courses(count=5):
+    from app import db
+    from app.models import Course
+
+    courses = [Course(title=f'Course {i}', description='Bench course', category='Crops', is_published=True)
+               for i in range(count)]
+    db.session.add_all(courses)
+    db.session.commit()
+    return [course.id for course in courses]
+
+
+def bulk(args):
+    from app.user_import import import_users
+
+    overrides = {'IMPORT_PASSWORD_HASH_METHOD': args.hash_method} if args.hash_method else {}
+    app = make_app(JOB_WORKERS=0, **overrides)
+    with app.app_context():
+        course_ids = seed_courses()
+        source = generate_csv(args.rows, course_ids)
+        report = io.StringIO()
+        start = time.perf_counter()
+        totals = import_users(source, 'csv', report, processes=args.processes)
+        return totals, time.perf_counter() - start
+
+
+def one_at_a_time(args):
+    """Per-user ORM writes, as the register and enroll routes do"""
+    from app import db
+    from app.course_stats import bump_course_stats
+    from app.models import CourseEnrollment, User
+
+    app = make_app(JOB_WORKERS=0, PASSWORD_HASH_WORKERS=0)
+    with app.app_context():
+        course_ids = seed_courses()
+        rows = list(csv.DictReader(generate_csv(args.baseline_rows, course_ids)))
+        start = time.perf_counter()
+        created = 0
+        for row in rows:
+            if User.query.filter_by(username=row['username']).first() or \
+                    User.query.filter_by(email=row['email']).first():
+                continue
+            user = User(username=row['username'], email=row['email'], full_name=row['full_name'], role=row['role'])
+            user.set_password(row['password'])
+            db.session.add(user)
+            db.session.commit()
+            created += 1
+            for course_id in row['courses'].split(';'):
+                db.session.add(CourseEnrollment(student_id=user.id, course_id=int(course_id)))
+                bump_course_stats(int(course_id), enrolled_count=1)
+                db.session.commit()
+        return created, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--baseline-rows', type=int, default=200)
+    parser.add_argument('--hash-method', default=None,
+                        help='Override IMPORT_PASSWORD_HASH_METHOD, e.g. pbkdf2:sha256:1 to see the cost without hashing.')
+    args = parser.parse_args()
+
+    totals, elapsed = bulk(args)
+    created, baseline_elapsed = one_at_a_time(args)
+    bulk_rate = totals['rows'] / elapsed
+    baseline_rate = args.baseline_rows / baseline_elapsed
+
+    print_table(
+        ['method', 'rows', 'created', 'rejected', 'seconds', 'rows/s', '100k rows (min)'],
+        [
+            ('one at a time', args.baseline_rows, created, args.baseline_rows - created,
+             f'{baseline_elapsed:.1f}', f'{baseline_rate:.1f}', f'{100000 / baseline_rate / 60:.1f}'),
+            (f'bulk import ({args.processes} proc)', totals['rows'], totals['created'], totals['failed'],
+             f'{elapsed:.1f}', f'{bulk_rate:.1f}', f'{100000 / bulk_rate / 60:.1f}'),
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
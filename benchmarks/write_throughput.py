@@ -0,0 +1,112 @@
+"""Concurrent write throughput with and without the database engine profile.
+
+Several worker processes (like gunicorn workers), each with several threads,
+send chat messages and read chat history against one SQLite file for a fixed
+time. Runs once with driver defaults (DB_TUNING off) and once with the
+profile from app/database.py, each on a fresh database.
+
+    python -m benchmarks.write_throughput [--processes 2] [--threads 8] [--seconds 10]
+"""
+import argparse
+import multiprocessing
+import threading
+import time
+
+from benchmarks.common import make_app, create_user, login, print_table
+
+
+def seed(db_path, users, tuning):
+    from app import db
+    from app.models import MentorshipRequest
+
+    app = make_app(db_path, JOB_WORKERS=0, DB_TUNING=tuning)
+    with app.app_context():
+        created = [create_user(f'bench_user_{i}') for i in range(users)]
+        db.session.commit()
+        # Each user chats with the next one, which needs an accepted mentorship
+        for student, mentor in zip(created, created[1:]):
+            db.session.add(MentorshipRequest(student_id=student.id, mentor_id=mentor.id, status='accepted'))
+        db.session.commit()
+        return [(user.username, user.id) for user in created]
+
+
+def worker(db_path, tuning, users, threads, seconds, barrier, results):
+    """One process: log in its threads, wait for every process, then write until time is up"""
+    app = make_app(db_path, JOB_WORKERS=0, DB_TUNING=tuning)
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    clients = [(login(app, users[i][0]), users[i + 1][1]) for i in range(threads)]
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+
+    def run(client, peer_id):
+        sent = read = errors = 0
+        while time.perf_counter() < deadline:
+            response = client.post(f'/mentorship/message/{peer_id}', data={'content': 'benchmark message'})
+            if response.status_code == 200:
+                sent += 1
+            else:
+                errors += 1
+            if client.get(f'/mentorship/chat/{peer_id}/history').status_code == 200:
+                read += 1
+            else:
+                errors += 1
+        with lock:
+            counts['writes'] += sent
+            counts['reads'] += read
+            counts['errors'] += errors
+
+    pool = [threading.Thread(target=run, args=client) for client in clients]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def measure(tuning, args):
+    import os
+    import tempfile
+
+    fd, db_path = tempfile.mkstemp(prefix='smartfarm-bench-', suffix='.db')
+    os.close(fd)
+    os.remove(db_path)
+    users = seed(db_path, args.processes * args.threads + 1, tuning)
+
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(args.processes)
+    results = context.Queue()
+    processes = [
+        context.Process(target=worker, args=(db_path, tuning, users[n * args.threads:], args.threads,
+                                             args.seconds, barrier, results))
+        for n in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    totals = {'writes': 0, 'reads': 0, 'errors': 0}
+    for _ in processes:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in processes:
+        process.join()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    for label, tuning in [('driver defaults', False), ('engine profile', True)]:
+        totals = measure(tuning, args)
+        rows.append((label, totals['writes'], f"{totals['writes'] / args.seconds:.1f}",
+                     f"{totals['reads'] / args.seconds:.1f}", totals['errors']))
+
+    print_table(['profile', 'messages', 'writes/s', 'reads/s', 'errors'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -9,6 +9,78 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-this')
     REMEMBER_COOKIE_DURATION = 7 * 24 * 60 * 60  # 7 days
+    
+    # Database engine (see app/database.py)
+    DB_TUNING = os.getenv('DB_TUNING', 'true').lower() == 'true'  # Off: driver defaults, no pool or pragmas
+    WEB_THREADS = int(os.getenv('WEB_THREADS', 8))  # Request threads per gunicorn worker; gunicorn_config.py reads the same variable
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # Connections kept open per worker; match gunicorn threads
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))  # Extra connections allowed during bursts
+    DB_POOL_TIMEOUT = 30  # Seconds a request waits for a free connection
+    DB_POOL_RECYCLE = 1800  # Seconds before a server connection is replaced (not SQLite)
+    SQLITE_JOURNAL_MODE = 'WAL'  # Readers and the writer stop blocking each other
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))  # Wait this long for the write lock
+    SQLITE_SYNCHRONOUS = 'NORMAL'  # No fsync per commit; safe against corruption in WAL mode
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # Bytes of the file read through mmap
+    SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'error')  # Refuse to start with migrations pending; 'warn' only logs, 'off' skips
+    
+    # Password hashing (see app/passwords.py)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')  # Werkzeug method; existing hashes are upgraded at login
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 2) // 2)))  # Hashes at once per process; 0 hashes inline
+    PASSWORD_HASH_MAX_WAITING = None  # Logins queued behind the workers; None: what WEB_THREADS leaves after hashing, chat streams and 2 threads for pages
+    PASSWORD_HASH_QUEUE_TIMEOUT = 0  # Seconds a login waits for a slot before getting "try again"; it holds a request thread meanwhile
+    SEED_PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # Cheap hashes for seed.py demo users; upgraded on first login
+    
+    # Bulk user import (see app/user_import.py)
+    IMPORT_DIR = os.getenv('IMPORT_DIR')  # Uploads and error reports; defaults to <instance>/imports
+    IMPORT_BATCH_SIZE = 1000  # Rows validated, hashed and inserted per transaction
+    IMPORT_HASH_PROCESSES = int(os.getenv('IMPORT_HASH_PROCESSES', os.cpu_count() or 1))
+    IMPORT_PASSWORD_HASH_METHOD = os.getenv('IMPORT_PASSWORD_HASH_METHOD', 'scrypt:4096:8:1')  # Upgraded to PASSWORD_HASH_METHOD at first login; empty uses it directly
+    
+    # Chat delivery
+    CHAT_BROKER = 'app.pubsub.LocalBroker'  # Any class with publish/version/wait
+    CHAT_STREAM_DURATION = 55  # Seconds before the browser reconnects a stream
+    CHAT_POLL_INTERVAL = 5  # Seconds between database re-checks while streaming
+    CHAT_MAX_STREAMS = int(os.getenv('CHAT_MAX_STREAMS', 3))  # Open streams per worker; keep well below gunicorn threads
+    CHAT_BUSY_RETRY = 5  # Seconds before a client turned away from streaming polls again
+    CHAT_PAGE_SIZE = 50  # Messages rendered with the chat page and per history page
+    CHAT_MAX_PAGE_SIZE = 200
+    UNREAD_CACHE_TTL = 30  # Seconds the navbar unread total is reused per worker
+    
+    # Certificates
+    CERTIFICATE_CACHE_DIR = os.getenv('CERTIFICATE_CACHE_DIR')  # Defaults to <instance>/certificates
+    CERTIFICATE_MAX_AGE = 24 * 60 * 60  # Browser cache lifetime for downloaded PDFs
+    CERTIFICATE_EXPORT_PROCESSES = int(os.getenv('CERTIFICATE_EXPORT_PROCESSES', os.cpu_count() or 1))
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'  # Let the front server send cached PDFs
+    
+    # Background jobs
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))  # Threads per process; 0 runs slow work inline
+    JOB_POLL_INTERVAL = 1  # Seconds an idle worker waits before checking the queue again
+    JOB_LEASE_SECONDS = 300  # A running job is retried if its worker is silent this long
+    JOB_RETRY_BACKOFF = 5  # Seconds before the first retry, doubled on each attempt
+    
+    # Application cache (homepage and admin statistics)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'app.cache.MemoryCache')  # or app.cache.SQLiteCache to share across workers
+    CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH')  # Defaults to <instance>/cache.sqlite3
+    CACHE_DEFAULT_TTL = 300  # Seconds; also the longest another worker can lag an invalidation
+    CACHE_MAX_ENTRIES = 1024
+    PAGE_CACHE_TTL = 60  # Seconds anonymous catalog pages are served from cache
+    
+    # Static assets (flask build-assets; see app/assets.py)
+    TAILWIND_CLI = os.getenv('TAILWIND_CLI', 'tailwindcss')  # Tailwind v3 CLI, e.g. "npx tailwindcss@3"
+    FONTAWESOME_DIR = os.getenv('FONTAWESOME_DIR')  # Font Awesome Free 6 package; defaults to the fontawesomefree pip package
+    ASSET_MAX_AGE = 365 * 24 * 60 * 60  # Fingerprinted files never change, so browsers keep them a year
+    
+    # Logged-in user identities (see app/identity.py)
+    USER_CACHE_TTL = 60  # Seconds a worker keeps a user's identity
+    USER_CACHE_RECHECK = 5  # Seconds between identity version checks; other workers see user changes this late
+    USER_CACHE_MAX_ENTRIES = 10000
+    
+    # Profiling (admin metrics page)
+    PROFILER_ENABLED = os.getenv('PROFILER_ENABLED', 'false').lower() == 'true'  # Off: no hooks are installed
+    PROFILER_SLOW_QUERY_MS = int(os.getenv('PROFILER_SLOW_QUERY_MS', 100))  # Statements slower than this are logged
+    PROFILER_KEEP_SLOWEST = 20  # Slowest statements listed on the metrics page
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Bearer token for scraping the Prometheus export
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -1,3 +1,24 @@
+import os
+
 bind = "0.0.0.0:10000"
 workers = 2
-timeout = 120
\ No newline at end of file
+# Threads let long-lived chat streams share a worker with normal requests;
+# CHAT_MAX_STREAMS caps how many of the threads streams may hold
+worker_class = "gthread"
+# Also read by config.py to budget threads for logins and chat streams
+threads = int(os.getenv("WEB_THREADS", 8))
+timeout = 120
+
+def on_starting(server):
+    """Apply pending migrations once in the master, before any worker loads the app"""
+    from app import db
+    from app.migrations import create_upgraded_app
+    app = create_upgraded_app()
+    with app.app_context():
+        # Workers open their own connections
+        db.engine.dispose()
+
+def post_worker_init(worker):
+    """Start the background job threads in each worker process"""
+    from app.jobs import start_workers
+    start_workers(worker.wsgi)
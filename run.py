@@ -1,11 +1,17 @@
 import os
-from app import create_app, db
-
-app = create_app()
+from app import create_app
+from app.migrations import create_upgraded_app
+from app.jobs import start_workers
 
 if __name__ == '__main__':
-    with app.app_context():
-        # Create tables if they don't exist
-        db.create_all()
+    # Bring the development database up to date (production runs "flask db upgrade" on deploy)
+    app = create_upgraded_app()
+    
+    # With the reloader on, only the serving child process runs jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_workers(app)
     
-    app.run(debug=True, host='127.0.0.1', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='127.0.0.1', port=5000)
+else:
+    # gunicorn (whose on_starting hook has already upgraded) and the flask CLI
+    app = create_app()
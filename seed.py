@@ -1,14 +1,24 @@
-from app import create_app, db
-from app.models import User, Course, CourseModule, CourseEnrollment
+"""Fill the database with demo accounts and courses.
 
-app = create_app()
+With size options it also generates production-scale data (thousands of
+users, courses, enrollments and chat messages) for load testing:
 
-with app.app_context():
-    # Clear existing data
-    print("Clearing database...")
-    db.drop_all()
-    db.create_all()
-    
+    python seed.py
+    python seed.py --users 20000 --mentors 200 --courses 300 --modules-per-course 8 \\
+        --enrollments-per-student 3 --conversations-per-student 2 --messages-per-conversation 40
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+from app import db
+from app.migrations import create_upgraded_app, upgrade
+from app.models import (User, Course, CourseModule, CourseEnrollment, ModuleCompletion, MentorshipRequest,
+                        Conversation, ConversationMember, Message)
+
+
+def seed_demo(seed_hash):
+    """Demo accounts, three courses and a sample enrollment"""
     # Create admin user
     print("Creating admin user...")
     admin = User(
@@ -17,7 +27,7 @@ with app.app_context():
         full_name='Admin User',
         role='admin'
     )
-    admin.set_password('Admin123456')
+    admin.set_password('Admin123456', seed_hash)
     db.session.add(admin)
     
     # Create mentor users
@@ -30,7 +40,7 @@ with app.app_context():
         expertise='Crop Farming - Maize & Beans',
         bio='10+ years experience in sustainable crop farming. Passionate about helping young farmers succeed.'
     )
-    mentor1.set_password('Mentor123456')
+    mentor1.set_password('Mentor123456', seed_hash)
     db.session.add(mentor1)
     
     mentor2 = User(
@@ -41,7 +51,7 @@ with app.app_context():
         expertise='Dairy Farming & Animal Husbandry',
         bio='Certified dairy farmer with expertise in modern livestock management and profitability.'
     )
-    mentor2.set_password('Mentor123456')
+    mentor2.set_password('Mentor123456', seed_hash)
     db.session.add(mentor2)
     
     # Create student users
@@ -53,7 +63,7 @@ with app.app_context():
         role='student',
         bio='Passionate about modern agriculture'
     )
-    student1.set_password('Student123456')
+    student1.set_password('Student123456', seed_hash)
     db.session.add(student1)
     
     student2 = User(
@@ -62,7 +72,7 @@ with app.app_context():
         full_name='Bob Mutua',
         role='student'
     )
-    student2.set_password('Student123456')
+    student2.set_password('Student123456', seed_hash)
     db.session.add(student2)
     
     db.session.commit()
@@ -129,9 +139,229 @@ with app.app_context():
     )
     db.session.add(enrollment)
     db.session.commit()
-    
-    print("✅ Database seeded successfully!")
-    print("\n📝 Test Credentials:")
-    print("Admin: username='admin', password='Admin123456'")
-    print("Mentor: username='mentor_john', password='Mentor123456'")
-    print("Student: username='student_alice', password='Student123456'")
\ No newline at end of file
+
+
+# ============ GENERATED DATA ============
+# Enough rows to surface table scans and N+1 queries that the demo data hides.
+# Rows go in with executemany inserts, CHUNK_SIZE per transaction; counters,
+# facets and the search index are rebuilt once at the end.
+
+CHUNK_SIZE = 5000
+
+FIRST_NAMES = ['Achieng', 'Baraka', 'Chebet', 'Daudi', 'Esther', 'Faith', 'Gitau', 'Halima', 'Imani', 'Juma',
+               'Kamau', 'Lilian', 'Mwangi', 'Njeri', 'Otieno', 'Pendo', 'Rehema', 'Sifa', 'Tumaini', 'Wanjiku']
+LAST_NAMES = ['Kariuki', 'Odhiambo', 'Mutua', 'Wambui', 'Kiptoo', 'Nyambura', 'Omondi', 'Chege', 'Atieno', 'Kimani']
+TOPICS = ['Maize', 'Beans', 'Dairy', 'Poultry', 'Irrigation', 'Soil Health', 'Agroforestry', 'Beekeeping',
+          'Greenhouse Vegetables', 'Fish Farming', 'Coffee', 'Tea', 'Post-Harvest Storage', 'Farm Finance']
+CATEGORIES = ['Crop Farming', 'Animal Husbandry', 'Soil & Water', 'Agribusiness', 'Horticulture']
+LEVELS = ['beginner', 'intermediate', 'advanced']
+WORDS = ('planting harvest yield compost mulch seedling fertilizer irrigation drip pest disease rotation '
+         'market price storage drying livestock feed vaccine milk egg hive pond soil water rain season').split()
+
+
+def _insert(model, rows):
+    """executemany-insert rows (any iterable of dicts) CHUNK_SIZE at a time; returns the count"""
+    table = model.__table__
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            db.session.commit()
+            count += len(chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        count += len(chunk)
+    return count
+
+
+def _new_ids(model, after, *criteria):
+    """Ids of model rows above after (the max id before an insert), oldest first"""
+    query = db.session.query(model.id).filter(model.id > after, *criteria).order_by(model.id)
+    return [id_ for (id_,) in query]
+
+
+def _max_id(model):
+    return db.session.query(db.func.max(model.id)).scalar() or 0
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def generate(users=0, mentors=0, courses=0, modules_per_course=5, enrollments_per_student=3,
+             conversations_per_student=1, messages_per_conversation=20, password='Load123456',
+             password_method=None, seed=1):
+    """Add generated students, mentors, courses, modules, enrollments and chats.
+
+    Generated users are student_<n> and mentor_<n>, all with the same
+    password. Returns the number of rows inserted per table.
+    """
+    from app.course_stats import rebuild_course_stats
+    from app.facets import rebuild_course_facets
+    from app.search import rebuild_search_index
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    counts = {}
+    # One hash for every generated account: they share a password anyway
+    password_hash = generate_password_hash(password, password_method or 'pbkdf2:sha256:1000')
+
+    def person(i):
+        return f'{FIRST_NAMES[i % len(FIRST_NAMES)]} {LAST_NAMES[(i // len(FIRST_NAMES)) % len(LAST_NAMES)]}'
+
+    print(f"Generating {mentors} mentors and {users} students...")
+    users_before = _max_id(User)
+    counts['mentors'] = _insert(User, (
+        {'username': f'mentor_{i}', 'email': f'mentor_{i}@load.smartfarm', 'password_hash': password_hash,
+         'full_name': person(i), 'role': 'mentor', 'is_active': rng.random() > 0.02,
+         'expertise': ', '.join(rng.sample(TOPICS, 2)), 'bio': _text(rng, 20),
+         'created_at': now - timedelta(days=rng.randint(0, 720))}
+        for i in range(mentors)
+    ))
+    counts['students'] = _insert(User, (
+        {'username': f'student_{i}', 'email': f'student_{i}@load.smartfarm', 'password_hash': password_hash,
+         'full_name': person(i + 7), 'role': 'student', 'is_active': rng.random() > 0.02,
+         'created_at': now - timedelta(days=rng.randint(0, 365))}
+        for i in range(users)
+    ))
+    mentor_ids = _new_ids(User, users_before, User.role == 'mentor')
+    student_ids = _new_ids(User, users_before, User.role == 'student')
+
+    print(f"Generating {courses} courses with {modules_per_course} modules each...")
+    courses_before = _max_id(Course)
+    counts['courses'] = _insert(Course, (
+        {'title': f'{rng.choice(TOPICS)} {rng.choice(["Basics", "in Practice", "for Smallholders", "Masterclass"])} {i}',
+         'description': _text(rng, 40), 'category': rng.choice(CATEGORIES), 'level': rng.choice(LEVELS),
+         'duration_weeks': rng.randint(2, 12), 'instructor': person(rng.randrange(max(mentors, 1))),
+         'is_published': rng.random() > 0.1, 'created_at': now - timedelta(days=rng.randint(0, 720))}
+        for i in range(courses)
+    ))
+    course_ids = _new_ids(Course, courses_before)
+    counts['modules'] = _insert(CourseModule, (
+        {'course_id': course_id, 'title': f'Module {j}: {rng.choice(TOPICS)}', 'description': _text(rng, 12),
+         'order': j, 'content': _text(rng, 150)}
+        for course_id in course_ids for j in range(1, modules_per_course + 1)
+    ))
+
+    print(f"Enrolling each student in {enrollments_per_student} courses...")
+    published = _new_ids(Course, courses_before, Course.is_published.is_(True))
+    enrollments_before = _max_id(CourseEnrollment)
+
+    def enrollment_rows():
+        for student_id in student_ids:
+            for course_id in rng.sample(published, min(enrollments_per_student, len(published))):
+                completed = rng.randint(0, modules_per_course)
+                done = modules_per_course > 0 and completed == modules_per_course
+                yield {'student_id': student_id, 'course_id': course_id, 'modules_completed': completed,
+                       'progress_percentage': completed / modules_per_course * 100 if modules_per_course else 0.0,
+                       'is_completed': done, 'enrolled_at': now - timedelta(days=rng.randint(30, 365)),
+                       'completed_at': now - timedelta(days=rng.randint(0, 29)) if done else None}
+
+    counts['enrollments'] = _insert(CourseEnrollment, enrollment_rows()) if published else 0
+
+    modules_by_course = {}
+    for module_id, course_id in db.session.query(CourseModule.id, CourseModule.course_id).filter(
+            CourseModule.course_id > courses_before).order_by(CourseModule.course_id, CourseModule.order):
+        modules_by_course.setdefault(course_id, []).append(module_id)
+    completed_enrollments = db.session.query(
+        CourseEnrollment.id, CourseEnrollment.course_id, CourseEnrollment.modules_completed, CourseEnrollment.enrolled_at
+    ).filter(CourseEnrollment.id > enrollments_before, CourseEnrollment.modules_completed > 0)
+    counts['module_completions'] = _insert(ModuleCompletion, (
+        {'enrollment_id': enrollment_id, 'module_id': module_id, 'completed_at': enrolled_at + timedelta(days=n + 1)}
+        for enrollment_id, course_id, completed, enrolled_at in completed_enrollments.all()
+        for n, module_id in enumerate(modules_by_course[course_id][:completed])
+    ))
+
+    print(f"Generating {conversations_per_student} conversations per student, "
+          f"{messages_per_conversation} messages each...")
+    pairs = sorted({(student_id, mentor_id) for student_id in student_ids
+                    for mentor_id in rng.sample(mentor_ids, min(conversations_per_student, len(mentor_ids)))})
+    counts['mentorship_requests'] = _insert(MentorshipRequest, (
+        {'student_id': student_id, 'mentor_id': mentor_id, 'status': 'accepted', 'message': _text(rng, 10),
+         'created_at': now - timedelta(days=60), 'responded_at': now - timedelta(days=59)}
+        for student_id, mentor_id in pairs
+    ))
+    conversations_before = _max_id(Conversation)
+    counts['conversations'] = _insert(Conversation, (
+        {'user_low_id': min(pair), 'user_high_id': max(pair), 'created_at': now - timedelta(days=59)}
+        for pair in pairs
+    ))
+    conversation_ids = {(low, high): id_ for id_, low, high in db.session.query(
+        Conversation.id, Conversation.user_low_id, Conversation.user_high_id).filter(Conversation.id > conversations_before)}
+
+    unread = {}
+
+    def message_rows():
+        for student_id, mentor_id in pairs:
+            conversation_id = conversation_ids[min(student_id, mentor_id), max(student_id, mentor_id)]
+            sent_at = now - timedelta(days=59)
+            for n in range(messages_per_conversation):
+                sender, recipient = (student_id, mentor_id) if n % 2 == 0 else (mentor_id, student_id)
+                sent_at += timedelta(minutes=rng.randint(1, 600))
+                # The newest few messages are still unread
+                is_read = n < messages_per_conversation - rng.randint(0, 3)
+                if not is_read:
+                    unread[conversation_id, recipient] = unread.get((conversation_id, recipient), 0) + 1
+                yield {'conversation_id': conversation_id, 'sender_id': sender, 'recipient_id': recipient,
+                       'content': _text(rng, rng.randint(3, 30)), 'is_read': is_read, 'created_at': sent_at}
+
+    counts['messages'] = _insert(Message, message_rows())
+    counts['conversation_members'] = _insert(ConversationMember, (
+        {'conversation_id': conversation_ids[min(pair), max(pair)], 'user_id': user_id,
+         'unread_count': unread.get((conversation_ids[min(pair), max(pair)], user_id), 0)}
+        for pair in pairs for user_id in pair
+    ))
+
+    print("Rebuilding course counters, facets and the search index...")
+    rebuild_course_stats()
+    rebuild_course_facets()
+    rebuild_search_index()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reset the database and fill it with demo data.')
+    parser.add_argument('--users', type=int, default=0, help='Generated students.')
+    parser.add_argument('--mentors', type=int, default=0, help='Generated mentors.')
+    parser.add_argument('--courses', type=int, default=0, help='Generated courses.')
+    parser.add_argument('--modules-per-course', type=int, default=5)
+    parser.add_argument('--enrollments-per-student', type=int, default=3)
+    parser.add_argument('--conversations-per-student', type=int, default=1, help='Chats with distinct mentors.')
+    parser.add_argument('--messages-per-conversation', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1, help='Random seed; the same options give the same data.')
+    args = parser.parse_args()
+
+    app = create_upgraded_app()
+
+    # Demo accounts get cheap hashes; the first login upgrades them to PASSWORD_HASH_METHOD
+    seed_hash = app.config['SEED_PASSWORD_HASH_METHOD']
+
+    with app.app_context():
+        # Clear existing data
+        print("Clearing database...")
+        db.drop_all()
+        upgrade()
+
+        seed_demo(seed_hash)
+        if args.users or args.mentors or args.courses:
+            counts = generate(args.users, args.mentors, args.courses, args.modules_per_course,
+                              args.enrollments_per_student, args.conversations_per_student,
+                              args.messages_per_conversation, password_method=seed_hash, seed=args.seed)
+            for table, count in counts.items():
+                print(f"  {table}: {count}")
+
+        print("✅ Database seeded successfully!")
+        print("\n📝 Test Credentials:")
+        print("Admin: username='admin', password='Admin123456'")
+        print("Mentor: username='mentor_john', password='Mentor123456'")
+        print("Student: username='student_alice', password='Student123456'")
+        if args.users or args.mentors:
+            print("Generated users: username='student_<n>' or 'mentor_<n>', password='Load123456'")
+
+
+if __name__ == '__main__':
+    main()
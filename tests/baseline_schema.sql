@@ -0,0 +1,101 @@
+-- Schema of a database created by db.create_all() before versioned migrations
+
+CREATE TABLE users (
+	id INTEGER NOT NULL,
+	username VARCHAR(80) NOT NULL,
+	email VARCHAR(120) NOT NULL,
+	password_hash VARCHAR(255) NOT NULL,
+	full_name VARCHAR(120),
+	profile_picture VARCHAR(255),
+	bio TEXT,
+	role VARCHAR(20),
+	expertise VARCHAR(255),
+	is_active BOOLEAN,
+	theme VARCHAR(10),
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (username),
+	UNIQUE (email)
+);
+
+CREATE TABLE courses (
+	id INTEGER NOT NULL,
+	title VARCHAR(200) NOT NULL,
+	description TEXT NOT NULL,
+	category VARCHAR(100) NOT NULL,
+	level VARCHAR(20),
+	duration_weeks INTEGER,
+	instructor VARCHAR(120),
+	video_url VARCHAR(500),
+	thumbnail VARCHAR(255),
+	is_published BOOLEAN,
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE course_modules (
+	id INTEGER NOT NULL,
+	course_id INTEGER NOT NULL,
+	title VARCHAR(200) NOT NULL,
+	description TEXT,
+	"order" INTEGER,
+	video_url VARCHAR(500),
+	content TEXT,
+	quiz_questions TEXT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(course_id) REFERENCES courses (id)
+);
+
+CREATE TABLE course_enrollments (
+	id INTEGER NOT NULL,
+	student_id INTEGER NOT NULL,
+	course_id INTEGER NOT NULL,
+	progress_percentage FLOAT,
+	modules_completed INTEGER,
+	is_completed BOOLEAN,
+	certificate_earned BOOLEAN,
+	enrolled_at DATETIME,
+	completed_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(student_id) REFERENCES users (id),
+	FOREIGN KEY(course_id) REFERENCES courses (id)
+);
+
+CREATE TABLE mentorship_requests (
+	id INTEGER NOT NULL,
+	student_id INTEGER NOT NULL,
+	mentor_id INTEGER NOT NULL,
+	message TEXT,
+	status VARCHAR(20),
+	created_at DATETIME,
+	responded_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(student_id) REFERENCES users (id),
+	FOREIGN KEY(mentor_id) REFERENCES users (id)
+);
+
+CREATE TABLE messages (
+	id INTEGER NOT NULL,
+	sender_id INTEGER NOT NULL,
+	recipient_id INTEGER NOT NULL,
+	content TEXT NOT NULL,
+	is_read BOOLEAN,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(sender_id) REFERENCES users (id),
+	FOREIGN KEY(recipient_id) REFERENCES users (id)
+);
+
+CREATE TABLE certificates (
+	id INTEGER NOT NULL,
+	student_id INTEGER NOT NULL,
+	course_id INTEGER NOT NULL,
+	certificate_code VARCHAR(50) NOT NULL,
+	issued_at DATETIME,
+	PRIMARY KEY (id),
+	FOREIGN KEY(student_id) REFERENCES users (id),
+	FOREIGN KEY(course_id) REFERENCES courses (id),
+	UNIQUE (certificate_code)
+);
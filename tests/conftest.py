@@ -0,0 +1,54 @@
+import pytest
+
+from app import create_app, db
+from app.migrations import upgrade
+from config import TestingConfig
+
+PASSWORD = 'Test123456'
+
+
+def make_config(tmp_path, **overrides):
+    """TestingConfig on a database file in tmp_path, with cheap hashes and no job threads"""
+    settings = {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "test.db"}',
+        'SCHEMA_CHECK': 'off',  # Tests migrate the database themselves
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'JOB_WORKERS': 0,
+        'CERTIFICATE_CACHE_DIR': str(tmp_path / 'certificates'),
+        'IMPORT_DIR': str(tmp_path / 'imports'),
+    }
+    settings.update(overrides)
+    return type('TestConfig', (TestingConfig,), settings)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(make_config(tmp_path))
+    with app.app_context():
+        upgrade(echo=lambda message: None)
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_user(username, role='student', password=PASSWORD):
+    """Add and commit a user; returns its id"""
+    from app.models import User
+
+    user = User(username=username, email=f'{username}@test.local', full_name=username.title(), role=role)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def login(client, username, password=PASSWORD):
+    response = client.post('/auth/login', data={'username': username, 'password': password})
+    assert response.status_code == 302, f'login failed for {username}'
+    return client
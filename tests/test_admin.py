@@ -0,0 +1,13 @@
+from tests.conftest import add_user, login
+
+
+def test_manage_mentors_lists_mentors(app, client):
+    with app.app_context():
+        add_user('admin', role='admin')
+        add_user('grace', role='mentor')
+        add_user('henry')
+    login(client, 'admin')
+    response = client.get('/admin/mentors')
+    assert response.status_code == 200
+    assert b'Grace' in response.data
+    assert b'Henry' not in response.data
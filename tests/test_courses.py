@@ -0,0 +1,30 @@
+from app import db
+from app.models import Certificate, Course, CourseEnrollment, CourseModule
+from tests.conftest import add_user, login
+
+
+def test_complete_every_module_finishes_course_once(app, client):
+    with app.app_context():
+        add_user('frank')
+        course = Course(title='Maize basics', description='Maize', category='Crop Farming',
+                        level='beginner', is_published=True)
+        db.session.add(course)
+        db.session.flush()
+        modules = [CourseModule(course_id=course.id, title=f'Module {i}', order=i) for i in range(2)]
+        db.session.add_all(modules)
+        db.session.commit()
+        course_id, module_ids = course.id, [module.id for module in modules]
+    login(client, 'frank')
+    assert client.post(f'/courses/{course_id}/enroll').status_code == 302
+
+    progress = []
+    for module_id in module_ids + module_ids[:1]:
+        response = client.post(f'/courses/{course_id}/module/{module_id}/complete')
+        assert response.status_code == 200
+        progress.append(response.get_json()['progress'])
+    assert progress == [50.0, 100.0, 100.0]
+
+    with app.app_context():
+        enrollment = CourseEnrollment.query.filter_by(course_id=course_id).one()
+        assert (enrollment.modules_completed, enrollment.is_completed) == (2, True)
+        assert Certificate.query.filter_by(course_id=course_id).count() == 1
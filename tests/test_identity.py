@@ -0,0 +1,70 @@
+from sqlalchemy import event, text
+
+from app import db
+from app.models import User
+from tests.conftest import add_user, login
+
+
+class StatementLog:
+    """SQL statements the engine runs while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self.statements
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+def users_queries(statements):
+    return [s for s in statements if 'FROM users' in s]
+
+
+def test_warm_identity_makes_no_users_query(app, client):
+    with app.app_context():
+        add_user('alice')
+        engine = db.engine
+    login(client, 'alice')
+    client.get('/dashboard/settings')
+
+    with StatementLog(engine) as statements:
+        response = client.get('/dashboard/settings')
+    assert response.status_code == 200
+    assert users_queries(statements) == []
+
+
+def test_identity_rechecks_version_after_interval(app, client):
+    app.config['USER_CACHE_RECHECK'] = 0
+    with app.app_context():
+        user_id = add_user('bob')
+        engine = db.engine
+    login(client, 'bob')
+    client.get('/dashboard/settings')
+
+    # Another worker deactivates the account: only the database stamp changes here
+    with engine.begin() as conn:
+        conn.execute(text('UPDATE users SET is_active = 0, identity_version = identity_version + 1 WHERE id = :id'),
+                     {'id': user_id})
+    with StatementLog(engine) as statements:
+        response = client.get('/dashboard/settings')
+    assert response.status_code == 302
+    assert users_queries(statements)
+
+
+def test_own_worker_sees_user_change_at_once(app, client):
+    with app.app_context():
+        user_id = add_user('carol')
+    login(client, 'carol')
+    client.get('/dashboard/settings')
+
+    with app.app_context():
+        User.query.get(user_id).full_name = 'Carol Changed'
+        db.session.commit()
+    assert b'Carol Changed' in client.get('/dashboard/profile').data
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.jobs import enqueue, job_handler, run_job
+from app.models import Job
+
+
+@job_handler('test.echo')
+def echo(payload):
+    return payload
+
+
+@job_handler('test.overrun')
+def overrun(payload):
+    # Another worker takes the job over once this one's lease has expired
+    with db.engine.begin() as conn:
+        conn.execute(text('UPDATE jobs SET attempts = attempts + 1 WHERE id = :id'), {'id': payload['id']})
+    if payload.get('fail'):
+        raise RuntimeError('late failure')
+    return {'late': True}
+
+
+def test_run_job_records_result(app):
+    with app.app_context():
+        job_id = enqueue('test.echo', {'answer': 42}).id
+        db.session.commit()
+        assert run_job(job_id)
+        job = db.session.get(Job, job_id)
+        assert (job.status, job.result, job.locked_until) == ('done', '{"answer": 42}', None)
+
+
+@pytest.mark.parametrize('fail', [False, True])
+def test_outcome_after_lost_lease_is_not_recorded(app, fail):
+    with app.app_context():
+        job = enqueue('test.overrun')
+        db.session.flush()
+        job.payload = json.dumps({'id': job.id, 'fail': fail})
+        db.session.commit()
+        job_id = job.id
+        assert run_job(job_id)
+        db.session.expire_all()
+        job = db.session.get(Job, job_id)
+        # Still leased to the worker that took it over
+        assert (job.status, job.attempts, job.result, job.error) == ('running', 2, None, None)
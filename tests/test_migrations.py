@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+from sqlalchemy import inspect, text
+
+from app import create_app, db
+from app.migrations import current_version, latest_version, upgrade
+from tests.conftest import make_config
+
+BASELINE_SCHEMA = os.path.join(os.path.dirname(__file__), 'baseline_schema.sql')
+
+
+def baseline_database(path):
+    """A database as create_all() built it before migrations, with a little data"""
+    connection = sqlite3.connect(path)
+    with open(BASELINE_SCHEMA) as f:
+        connection.executescript(f.read())
+    connection.executescript('''
+        INSERT INTO users (id, username, email, password_hash, full_name, role, expertise, is_active)
+        VALUES (1, 'mentor', 'mentor@test.local', 'x', 'Maize Mentor', 'mentor', 'Maize', 1),
+               (2, 'student', 'student@test.local', 'x', 'Student', 'student', NULL, 1);
+        INSERT INTO courses (id, title, description, category, level, is_published)
+        VALUES (1, 'Maize basics', 'Planting maize', 'Crop Farming', 'beginner', 1);
+        INSERT INTO course_modules (id, course_id, title, "order") VALUES (1, 1, 'Soil', 1), (2, 1, 'Seed', 2);
+        INSERT INTO course_enrollments (student_id, course_id, progress_percentage, modules_completed, is_completed)
+        VALUES (2, 1, 50.0, 1, 0);
+        INSERT INTO messages (sender_id, recipient_id, content, is_read, created_at)
+        VALUES (2, 1, 'Hello', 0, '2024-01-01 00:00:00'), (1, 2, 'Hi', 1, '2024-01-01 00:01:00');
+    ''')
+    connection.commit()
+    connection.close()
+
+
+def test_upgrade_baseline_database_to_head(tmp_path):
+    baseline_database(str(tmp_path / 'test.db'))
+    app = create_app(make_config(tmp_path))
+    with app.app_context():
+        upgrade(echo=lambda message: None)
+
+        assert current_version() == latest_version()
+        assert 'identity_version' in [c['name'] for c in inspect(db.engine).get_columns('users')]
+        with db.engine.connect() as conn:
+            assert conn.execute(text('SELECT COUNT(*) FROM messages WHERE conversation_id IS NULL')).scalar() == 0
+            assert conn.execute(text(
+                'SELECT module_count, enrolled_count FROM course_stats WHERE course_id = 1'
+            )).one() == (2, 1)
+            assert conn.execute(text("SELECT rowid FROM mentor_search WHERE mentor_search MATCH 'maize'")).all() == [(1,)]
+        db.session.remove()
+        db.engine.dispose()
+
+
+def test_upgrade_is_idempotent(app):
+    with app.app_context():
+        assert upgrade() == []
@@ -0,0 +1,35 @@
+from app import db
+from app.models import Course, User
+from app.pagination import encode_cursor
+from tests.conftest import add_user, login
+
+
+def add_courses(count):
+    for i in range(count):
+        db.session.add(Course(title=f'Course {i}', description='Maize', category='Crop Farming',
+                              level='beginner', is_published=True))
+    db.session.commit()
+
+
+def test_course_cursor_out_of_int64_range_starts_over(app, client):
+    with app.app_context():
+        add_courses(3)
+    for value in (10 ** 30, -10 ** 30):
+        response = client.get('/courses/', query_string={'format': 'json', 'cursor': encode_cursor({'after': [value]})})
+        assert response.status_code == 200
+        assert len(response.get_json()['items']) == 3
+
+
+def test_search_offset_out_of_int64_range_starts_over(app, client):
+    with app.app_context():
+        add_user('student')
+        for i in range(3):
+            db.session.add(User(username=f'mentor{i}', email=f'mentor{i}@test.local', password_hash='x',
+                                role='mentor', expertise='Maize'))
+        db.session.commit()
+    login(client, 'student')
+    response = client.get('/mentorship/browse', query_string={
+        'q': 'maize', 'format': 'json', 'cursor': encode_cursor({'offset': 10 ** 30}),
+    })
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == 3
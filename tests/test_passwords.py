@@ -0,0 +1,36 @@
+import pytest
+
+from app import db
+from app.models import User
+from app.passwords import HashingBusy
+from tests.conftest import PASSWORD, add_user, login
+
+
+def busy(*args, **kwargs):
+    raise HashingBusy('Too many password checks in progress')
+
+
+def test_register_when_hashing_busy(app, client, monkeypatch):
+    monkeypatch.setattr(app.extensions['password_hasher'], 'hash', busy)
+    response = client.post('/auth/register', data={
+        'username': 'dana', 'email': 'dana@test.local', 'password': PASSWORD, 'confirm_password': PASSWORD,
+    })
+    assert response.status_code == 503
+    with app.app_context():
+        assert User.query.filter_by(username='dana').count() == 0
+
+
+@pytest.mark.parametrize('step', ['verify', 'hash'])
+def test_change_password_when_hashing_busy(app, client, monkeypatch, step):
+    with app.app_context():
+        user_id = add_user('erin')
+        old_hash = db.session.get(User, user_id).password_hash
+    login(client, 'erin')
+
+    monkeypatch.setattr(app.extensions['password_hasher'], step, busy)
+    response = client.post('/dashboard/password/change', data={
+        'old_password': PASSWORD, 'new_password': 'New123456', 'confirm_password': 'New123456',
+    })
+    assert response.status_code == 503
+    with app.app_context():
+        assert db.session.get(User, user_id).password_hash == old_hash